@@ -0,0 +1,169 @@
+"""
+Голосование настоящего зала для подсказки «ЗАЛ»
+
+Голоса приходят из потоков программы (submit) или по локальному сокету:
+клиент шлет поток байтов A/B/C/D, по байту на голос, пробелы и переводы
+строк пропускаются. Счетчики разбиты по потокам, поэтому на приеме нет
+блокировок. Каждый новый вопрос открывает новый раунд голосования.
+
+Запуск сервера голосов отдельно: python audience_votes.py --port 8766
+"""
+
+import argparse
+import asyncio
+import threading
+
+
+OPTION_BYTES = (b'A', b'B', b'C', b'D')
+
+
+class VoteCounter:
+    """Счетчики голосов одного раунда, свой набор на каждый поток
+
+    В набор пишет только поток-владелец, сумма собирается при чтении.
+    """
+
+    def __init__(self):
+        self.shards = []
+        self._local = threading.local()
+
+    def _shard(self):
+        shard = getattr(self._local, 'counts', None)
+        if shard is None:
+            shard = self._local.counts = [0, 0, 0, 0]
+            # list.append атомарен, новый набор виден всем читателям
+            self.shards.append(shard)
+        return shard
+
+    def add(self, index, count=1):
+        """Добавить голоса за вариант index"""
+        self._shard()[index] += count
+
+    def add_counts(self, counts):
+        """Добавить готовые количества голосов за четыре варианта"""
+        shard = self._shard()
+        for index, count in enumerate(counts):
+            shard[index] += count
+
+    def totals(self):
+        """Сумма голосов по вариантам"""
+        totals = [0, 0, 0, 0]
+        for shard in list(self.shards):
+            for index, count in enumerate(shard):
+                totals[index] += count
+        return totals
+
+
+def vote_percentages(totals):
+    """Голоса в проценты {индекс: процент}, в сумме ровно 100
+
+    Остатки от округления достаются вариантам с наибольшей дробной частью.
+    """
+    total = sum(totals)
+    if total == 0:
+        return None
+    percents = [count * 100 // total for count in totals]
+    remainders = sorted(range(4), key=lambda i: totals[i] * 100 % total,
+                        reverse=True)
+    for index in remainders[:100 - sum(percents)]:
+        percents[index] += 1
+    return dict(enumerate(percents))
+
+
+class AudienceVotes:
+    """Прием голосов зала и итог в формате use_hint_audience"""
+
+    def __init__(self):
+        self.counter = VoteCounter()
+        self.loop = None
+        self.server = None
+        self.address = None
+        self._thread = None
+
+    def start_round(self):
+        """Начать голосование за новый вопрос"""
+        # Опоздавшие голоса попадут в старый счетчик и не будут учтены
+        self.counter = VoteCounter()
+
+    def submit(self, index):
+        """Голос за вариант index (0-3) из любого потока"""
+        self.counter.add(index)
+
+    def totals(self):
+        return self.counter.totals()
+
+    def percentages(self):
+        """Итог раунда {индекс: процент} или None, если голосов нет"""
+        return vote_percentages(self.counter.totals())
+
+    def ingest(self, data):
+        """Учесть голоса из байтов A/B/C/D, прочие байты пропускаются"""
+        self.counter.add_counts([data.count(option) for option in OPTION_BYTES])
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                self.ingest(data)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _start_server(self, host, port, unix_path):
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_client,
+                                                          path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client,
+                                                     host, port)
+        self.address = self.server.sockets[0].getsockname()
+
+    def start_server(self, host='127.0.0.1', port=8766, unix_path=None):
+        """Запустить прием голосов по сокету в фоновом потоке"""
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self._start_server(host, port, unix_path))
+        self._thread = threading.Thread(target=self.loop.run_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self.address
+
+    def stop(self):
+        """Остановить прием голосов по сокету"""
+        if self.loop is None:
+            return
+
+        async def close():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Прием голосов зала")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--unix', help="путь к Unix-сокету вместо TCP")
+    args = parser.parse_args()
+
+    votes = AudienceVotes()
+    print("Голоса принимаются на {}".format(
+        votes.start_server(args.host, args.port, args.unix)))
+    try:
+        while True:
+            input("Enter — итог и новый раунд: ")
+            print(votes.totals(), votes.percentages())
+            votes.start_round()
+    except (KeyboardInterrupt, EOFError):
+        votes.stop()
+
+
+if __name__ == "__main__":
+    main()
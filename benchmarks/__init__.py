@@ -0,0 +1,3 @@
+"""
+Бенчмарки игры 'Кто хочет стать миллионером'
+"""
@@ -0,0 +1,98 @@
+"""
+Нагрузка на прием голосов зала: скорость приема и время до итога
+
+Клиенты-процессы шлют голоса по TCP, потоки программы — через submit().
+Время до итога — от отправки последнего голоса до момента, когда итог
+раунда учитывает все голоса.
+
+Запуск: python -m benchmarks.bench_audience_votes [--clients 8] [--votes 2000000]
+"""
+
+import argparse
+import multiprocessing
+import random
+import socket
+import threading
+import time
+
+from audience_votes import AudienceVotes
+
+
+def send_votes(address, votes, chunk_size, seed):
+    rng = random.Random(seed)
+    chunk = bytes(rng.choice(b'ABCD') for _ in range(chunk_size))
+    with socket.create_connection(address) as sock:
+        for sent in range(0, votes, chunk_size):
+            sock.sendall(chunk[:min(chunk_size, votes - sent)])
+
+
+def wait_for(votes, expected):
+    while sum(votes.totals()) < expected:
+        time.sleep(0.0005)
+    return time.perf_counter()
+
+
+def bench_socket(votes, clients, per_client, chunk_size):
+    votes.start_round()
+    expected = clients * per_client
+    processes = [
+        multiprocessing.Process(target=send_votes,
+                                args=(votes.address, per_client, chunk_size, i))
+        for i in range(clients)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    sent = time.perf_counter()
+    counted = wait_for(votes, expected)
+
+    result_started = time.perf_counter()
+    votes.percentages()
+    result_ms = (time.perf_counter() - result_started) * 1000
+    print("TCP, {} клиентов: {:,.0f} голосов/с, до итога {:.1f} мс "
+          "(подсчет итога {:.3f} мс)".format(
+              clients, expected / (counted - started),
+              (counted - sent) * 1000, result_ms))
+
+
+def bench_threads(votes, threads, per_thread):
+    votes.start_round()
+
+    def producer(seed):
+        rng = random.Random(seed)
+        submit = votes.submit
+        for _ in range(per_thread):
+            submit(rng.randrange(4))
+
+    workers = [threading.Thread(target=producer, args=(i,))
+               for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    assert sum(votes.totals()) == threads * per_thread
+    print("submit(), {} потоков: {:,.0f} голосов/с".format(
+        threads, threads * per_thread / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузка на голосование зала")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--votes', type=int, default=2000000)
+    parser.add_argument('--chunk', type=int, default=512,
+                        help="голосов в одной отправке клиента")
+    args = parser.parse_args()
+
+    votes = AudienceVotes()
+    votes.start_server(port=0)
+    bench_socket(votes, args.clients, args.votes // args.clients, args.chunk)
+    bench_threads(votes, 4, 250000)
+    votes.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Задержка start_new_game под всплесками запросов: выбор вопросов
+на каждом уровне против готовых колод из DeckPool
+
+Запуск: python -m benchmarks.bench_deck_pool [количество вопросов] [всплеск]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_bank import write_bank
+from game_logic import GameBank, GameState
+from question_decks import DeckPool
+from question_selector import PlayerHistory
+
+
+BURSTS = 20
+# Пауза между всплесками, за нее фоновый поток пополняет запас
+PAUSE = 0.1
+
+
+def run_bursts(name, make_game, burst):
+    games = [make_game() for _ in range(burst)]
+    latencies = []
+    for _ in range(BURSTS):
+        for game in games:
+            started = time.perf_counter()
+            game.start_new_game()
+            latencies.append(time.perf_counter() - started)
+        time.sleep(PAUSE)
+
+    latencies.sort()
+    count = len(latencies)
+    print("  {:<26} p50 {:>7.1f} мкс  p99 {:>7.1f} мкс  max {:>8.1f} мкс".format(
+        name, latencies[count // 2] * 1e6,
+        latencies[min(int(count * 0.99), count - 1)] * 1e6,
+        latencies[-1] * 1e6))
+
+
+def bench_bank(bank, burst):
+    run_bursts("выбор по уровням",
+               lambda: GameState(bank=bank), burst)
+    history = PlayerHistory()
+    run_bursts("выбор, один игрок",
+               lambda: GameState(bank=bank, player_id='bench',
+                                 history=history), burst)
+
+    for capacity in (burst // 4, burst * 2):
+        pool = DeckPool(bank, capacity=capacity, seed=1)
+        pool.fill()
+        pool.start()
+        try:
+            run_bursts("DeckPool({})".format(capacity),
+                       lambda: GameState(bank=bank, decks=pool), burst)
+        finally:
+            pool.close()
+        stats = pool.stats()
+        print("    запас: мин. {min_depth}/{capacity}, попаданий {hits}, "
+              "промахов {misses}, pop p99 {pop_p99_us:.1f} мкс".format(**stats))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    burst = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'questions.json')
+        write_bank(path, count)
+        print("Синтетический банк, {} вопросов, всплески по {} игр".format(
+            count, burst))
+        bench_bank(GameBank.load(path), burst)
+
+
+if __name__ == "__main__":
+    main()
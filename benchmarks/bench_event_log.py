@@ -0,0 +1,92 @@
+"""
+Журнал событий: скорость записи с групповым fsync и скорость разбора
+журнала на миллион игр
+
+Запуск: python -m benchmarks.bench_event_log [игр в журнале]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from game_events import (EVENT_ADVANCE, EVENT_ANSWER, EVENT_GAME_OVER,
+                         EVENT_QUESTION, EVENT_START, EventLog,
+                         aggregate_events, event_dtype, read_events,
+                         replay_session)
+from game_logic import GameBank
+
+
+def measure_record(path, events, batch_size):
+    log = EventLog(path, batch_size=batch_size)
+    started = time.perf_counter()
+    for i in range(events):
+        log.record(1, EVENT_ANSWER, i % 15, i, 1, 1)
+    log.close()
+    return events / (time.perf_counter() - started)
+
+
+def synthetic_events(games, levels=15, seed=0):
+    """События игр, каждая из которых обрывается неверным ответом"""
+    rng = np.random.default_rng(seed)
+    reached = np.minimum(rng.geometric(0.15, games) - 1, levels - 1)
+    # START, по три события на пройденный уровень, вопрос, ответ, конец игры
+    per_game = 4 + 3 * reached
+    events = np.zeros(int(per_game.sum()), event_dtype())
+    game_of = np.repeat(np.arange(games), per_game)
+    step = np.arange(events.size) - np.repeat(np.cumsum(per_game) - per_game,
+                                              per_game)
+    last = per_game[game_of] - 1
+
+    events['session'] = game_of + 1
+    events['question'] = 1 + np.maximum(step - 1, 0) // 3
+    events['level'] = np.maximum(step - 1, 0) // 3 + (step % 3 == 0) * (step > 0)
+    kind = np.choose(np.maximum(step - 1, 0) % 3,
+                     [EVENT_QUESTION, EVENT_ANSWER, EVENT_ADVANCE])
+    kind[step == 0] = EVENT_START
+    kind[step == last] = EVENT_GAME_OVER
+    events['question'][step == 0] = 0
+    events['level'][step == last] = reached
+    events['kind'] = kind
+    events['data'][kind == EVENT_ANSWER] = 1
+    events['data'][(kind == EVENT_ANSWER) & (step == last - 1)] = 0
+    events['answer'] = -1
+    return events
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'games.events')
+        print("Запись, fsync на каждое событие: {:>12,.0f} событий/с".format(
+            measure_record(path, 2000, batch_size=1)))
+        os.remove(path)
+        print("Запись, fsync пачками:           {:>12,.0f} событий/с".format(
+            measure_record(path, 1000000, batch_size=4096)))
+        os.remove(path)
+
+        EventLog(path).close()
+        with open(path, 'ab') as f:
+            f.write(synthetic_events(games).tobytes())
+        print("\nЖурнал: {:,} игр, {:.1f} МБ".format(
+            games, os.path.getsize(path) / 2 ** 20))
+
+        started = time.perf_counter()
+        events = read_events(path)
+        stats = aggregate_events(events)
+        elapsed = time.perf_counter() - started
+        print("Статистика: {:.0f} мс, {:,.0f} событий/с, {:,.0f} игр/с".format(
+            elapsed * 1000, len(events) / elapsed, stats['games'] / elapsed))
+
+        bank = GameBank.load('questions.json')
+        started = time.perf_counter()
+        game = replay_session(events, games // 2, bank)
+        print("Восстановление одной сессии: {:.1f} мс (уровень {})".format(
+            (time.perf_counter() - started) * 1000, game.current_level))
+        del events
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Масштабирование game_cluster.py по числу процессов-обработчиков:
+сессий в секунду при 1, 2, 4... процессах
+
+Нагрузку дают --load-processes процессов по --clients клиентов в каждом
+(клиенты из bench_game_server). Для честного замера ядер должно хватать
+и на обработчики, и на нагрузку.
+
+Запуск: python -m benchmarks.bench_game_cluster [--workers 1 2 4] [--seconds 10]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_game_server import load, percentile
+
+
+def run_load(task):
+    args, seed = task
+    stats, elapsed = asyncio.run(load(args, seed))
+    latencies = stats['latencies']
+    return (stats['sessions'], len(latencies), elapsed,
+            percentile(latencies, 0.99))
+
+
+def measure(args, workers):
+    command = [sys.executable, 'game_cluster.py', '--questions', args.questions,
+               '--workers', str(workers), '--host', args.host,
+               '--port', str(args.port)]
+    cluster = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        with multiprocessing.Pool(args.load_processes) as pool:
+            results = pool.map(run_load, [(args, seed)
+                                          for seed in range(args.load_processes)])
+    finally:
+        cluster.terminate()
+        cluster.wait()
+
+    elapsed = max(result[2] for result in results)
+    sessions = sum(result[0] for result in results)
+    answers = sum(result[1] for result in results)
+    p99 = max(result[3] for result in results)
+    return sessions / elapsed, answers / elapsed, p99
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Масштабирование game_cluster")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8775)
+    parser.add_argument('--unix', help=argparse.SUPPRESS)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cores}))
+    parser.add_argument('--load-processes', type=int, default=max(cores // 2, 1))
+    parser.add_argument('--clients', type=int, default=32,
+                        help="клиентов в каждом процессе нагрузки")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--questions', default='questions.json')
+    args = parser.parse_args()
+
+    print("Ядер: {}, процессов нагрузки: {}".format(cores, args.load_processes))
+    baseline = None
+    for workers in args.workers:
+        sessions, answers, p99 = measure(args, workers)
+        baseline = baseline or sessions
+        print("{:>3} обработчиков: {:>8.0f} сессий/с, {:>8.0f} ответов/с, "
+              "p99 {:.1f} мс, ускорение x{:.2f}".format(
+                  workers, sessions, answers, p99 * 1000, sessions / baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Журнал итогов игр (game_results): скорость записи через ResultLog,
+свертка сегментов в SQLite и задержка запросов к сводке
+
+Для масштаба сегменты с миллионами итогов пишутся сразу массивами NumPy
+в формате ResultLog, без вызова record на каждую игру.
+
+Запуск: python -m benchmarks.bench_game_results [игр] [игроков]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_bank import DEFAULT_PRIZE_LADDER
+from game_results import (_HEADER, OUTCOME_LOST, OUTCOME_TOOK_MONEY,
+                          OUTCOME_WON, RESULTS_MAGIC, RESULTS_VERSION,
+                          SEGMENT_RECORDS, SEGMENT_SUFFIX, ResultLog,
+                          ResultSummary, player_key, result_dtype)
+
+
+WRITES = 200000
+WRITER_THREADS = 4
+QUERIES = 200
+
+
+def write_through_log(directory):
+    """Итоги через ResultLog из нескольких потоков, как в сервере"""
+    log = ResultLog(directory)
+    per_thread = WRITES // WRITER_THREADS
+
+    def write(thread):
+        for i in range(per_thread):
+            log.record('player{}'.format(i % 1000), i % 3, i % 16, 1000 * (i % 16),
+                       5000, thread & 7, 12.5)
+
+    threads = [threading.Thread(target=write, args=(thread,))
+               for thread in range(WRITER_THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+    return time.perf_counter() - started
+
+
+def make_segment(rng, count, players):
+    """Итоги игр, похожие на настоящие: чаще проигрыш на ранних уровнях"""
+    amounts = np.array([0] + [prize['amount'] for prize in DEFAULT_PRIZE_LADDER],
+                       np.uint32)
+    havens = np.maximum.accumulate(np.array(
+        [0] + [prize['amount'] if prize['safe_haven'] else 0
+               for prize in DEFAULT_PRIZE_LADDER], np.uint32))
+    results = np.zeros(count, result_dtype())
+    level = np.minimum(rng.geometric(0.15, count) - 1, 15)
+    outcome = np.where(level == 15, OUTCOME_WON,
+                       np.where(rng.random(count) < 0.3, OUTCOME_TOOK_MONEY,
+                                OUTCOME_LOST))
+    results['level'] = level
+    results['outcome'] = outcome
+    results['safe_haven'] = havens[level]
+    results['prize'] = np.where(outcome == OUTCOME_LOST, havens[level],
+                                amounts[level])
+    results['hints'] = rng.integers(0, 8, count)
+    results['duration'] = rng.integers(10000, 600000, count)
+    results['time'] = int(time.time())
+    keys = np.array([player_key('player{}'.format(i)) for i in range(players)])
+    player = rng.zipf(1.2, count) % (players + 1)
+    results['player'] = np.where(player == 0, 0, keys[player - 1])
+    return results
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20000000
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        elapsed = write_through_log(os.path.join(tmp_dir, 'writes'))
+        print("ResultLog: {:,} итогов из {} потоков за {:.2f} с "
+              "({:,.0f} итогов/с)".format(WRITES, WRITER_THREADS, elapsed,
+                                          WRITES / elapsed))
+
+        directory = os.path.join(tmp_dir, 'games.results')
+        os.makedirs(directory)
+        started = time.perf_counter()
+        for number, start in enumerate(range(0, games, SEGMENT_RECORDS)):
+            results = make_segment(rng, min(SEGMENT_RECORDS, games - start),
+                                   players)
+            path = os.path.join(directory, '{:019d}-0{}'.format(number,
+                                                               SEGMENT_SUFFIX))
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(RESULTS_MAGIC, RESULTS_VERSION,
+                                     results.dtype.itemsize))
+                f.write(results.tobytes())
+        print("Сегменты: {:,} итогов за {:.1f} с".format(
+            games, time.perf_counter() - started))
+
+        summary = ResultSummary(directory)
+        started = time.perf_counter()
+        count = summary.compact()
+        elapsed = time.perf_counter() - started
+        print("Свертка: {:,} итогов за {:.1f} с ({:,.0f} итогов/с), "
+              "сводка {:.1f} МБ".format(
+                  count, elapsed, count / elapsed,
+                  os.path.getsize(os.path.join(directory, 'summary.sqlite')) /
+                  2 ** 20))
+
+        for name, query in (
+                ("лидеры по сумме", lambda: summary.leaderboard(10)),
+                ("лидеры по лучшей игре", lambda: summary.leaderboard(10, 'best')),
+                ("распределение выигрышей", summary.payout_distribution),
+                ("итоги", summary.totals)):
+            started = time.perf_counter()
+            for _ in range(QUERIES):
+                query()
+            print("  {:<24} {:.2f} мс".format(
+                name, (time.perf_counter() - started) / QUERIES * 1000))
+        print(summary.totals())
+        summary.close()
+
+
+if __name__ == "__main__":
+    main()
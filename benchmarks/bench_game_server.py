@@ -0,0 +1,129 @@
+"""
+Нагрузочный клиент для game_server.py: сессий в секунду и p99 задержки ответа
+
+Запуск: python -m benchmarks.bench_game_server [--clients 50] [--seconds 10]
+Без --connect сервер запускается отдельным процессом на --port.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def open_connection(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def wait_for_server(args, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await open_connection(args)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def client(args, deadline, stats, rng):
+    """Играет игры подряд, отвечая случайно и иногда используя подсказки"""
+    reader, writer = await open_connection(args)
+
+    async def call(request):
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    while time.monotonic() < deadline:
+        started = await call({'op': 'start'})
+        session = started['session']
+        while True:
+            if rng.random() < 0.1:
+                await call({'op': 'hint', 'session': session,
+                            'hint': rng.choice(['5050', 'call', 'audience'])})
+            if rng.random() < 0.05:
+                await call({'op': 'take_money', 'session': session})
+                break
+
+            sent = time.perf_counter()
+            result = await call({'op': 'answer', 'session': session,
+                                 'answer': rng.randrange(4)})
+            stats['latencies'].append(time.perf_counter() - sent)
+            if result.get('finished'):
+                break
+        stats['sessions'] += 1
+
+    writer.close()
+
+
+async def load(args, seed=0):
+    """Нагрузка из args.clients клиентов, возвращает статистику и время"""
+    await wait_for_server(args)
+    stats = {'sessions': 0, 'latencies': []}
+    started = time.monotonic()
+    deadline = started + args.seconds
+    await asyncio.gather(*(
+        client(args, deadline, stats, random.Random(seed * args.clients + i))
+        for i in range(args.clients)
+    ))
+    return stats, time.monotonic() - started
+
+
+async def run(args):
+    stats, elapsed = await load(args)
+    latencies = stats['latencies']
+    print("Клиентов: {}, время: {:.1f} с".format(args.clients, elapsed))
+    print("Сессий: {} ({:.0f} сессий/с)".format(
+        stats['sessions'], stats['sessions'] / elapsed))
+    print("Ответов: {} ({:.0f} ответов/с)".format(
+        len(latencies), len(latencies) / elapsed))
+    print("Задержка ответа: p50 {:.3f} мс, p99 {:.3f} мс".format(
+        percentile(latencies, 0.50) * 1000, percentile(latencies, 0.99) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера игры")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="путь к Unix-сокету сервера")
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--connect', action='store_true',
+                        help="подключиться к уже запущенному серверу")
+    parser.add_argument('--questions', default='questions.json')
+    args = parser.parse_args()
+
+    server = None
+    if not args.connect:
+        command = [sys.executable, 'game_server.py', '--questions', args.questions]
+        if args.unix:
+            command += ['--unix', args.unix]
+        else:
+            command += ['--host', args.host, '--port', str(args.port)]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Сохранение и восстановление партии: GameState.to_bytes/from_bytes
+поверх общего банка вопросов
+
+Запуск: python -m benchmarks.bench_game_state_save [количество вопросов]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_bank import write_bank
+from game_logic import GameBank, GameState
+
+
+def measure(name, action, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    elapsed = time.perf_counter() - started
+    print("  {:<30} {:>10,.0f} в секунду, {:>6.2f} мкс".format(
+        name, repeat / elapsed, elapsed / repeat * 1e6))
+
+
+def bench_bank(bank, repeat):
+    game = GameState(bank=bank, seed=1)
+    game.start_new_game()
+    for _ in range(7):
+        game.advance_level()
+    game.use_hint_5050()
+
+    state = game.to_bytes()
+    state_rng = game.to_bytes(include_rng=True)
+    print("  размер: {} байт, с генератором {} байт".format(
+        len(state), len(state_rng)))
+
+    measure("to_bytes", game.to_bytes, repeat)
+    measure("to_bytes(include_rng)", lambda: game.to_bytes(include_rng=True),
+            repeat // 4)
+    measure("from_bytes", lambda: GameState.from_bytes(state, bank), repeat)
+    measure("from_bytes с генератором",
+            lambda: GameState.from_bytes(state_rng, bank), repeat // 4)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeat = 100000
+
+    print("questions.json")
+    bench_bank(GameBank.load('questions.json'), repeat)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'questions.json')
+        write_bank(path, count)
+        print("Синтетический банк, {} вопросов".format(count))
+        bench_bank(GameBank.load(path), repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Пропускная способность подсказок: прежний код на общем модуле random,
+методы GameState с генератором сессии и пакетный HintBatch
+
+Запуск: python -m benchmarks.bench_hints [подсказок]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from game_logic import GameState, Question
+from hint_batch import HintBatch
+
+
+def legacy_hints(correct_index):
+    """Прежние 50/50, звонок и зал: глобальный random и списки на каждый вызов"""
+    wrong_indices = [i for i in range(4) if i != correct_index]
+    sorted([correct_index, random.choice(wrong_indices)])
+
+    if random.random() >= 0.8:
+        wrong_indices = [i for i in range(4) if i != correct_index]
+        random.choice(wrong_indices)
+
+    percentages = {correct_index: random.randint(40, 60)}
+    remaining = 100 - percentages[correct_index]
+    wrong_indices = [i for i in range(4) if i != correct_index]
+    for i, idx in enumerate(wrong_indices):
+        if i == len(wrong_indices) - 1:
+            percentages[idx] = remaining
+        else:
+            percent = random.randint(5, remaining - (len(wrong_indices) - i - 1) * 5)
+            percentages[idx] = percent
+            remaining -= percent
+
+
+def game_state_hints(game, question):
+    game.current_question = question
+    game.hint_5050_used = game.hint_call_used = game.hint_audience_used = False
+    game.use_hint_5050()
+    game.use_hint_call_friend()
+    game.use_hint_audience()
+
+
+def report(name, hints, elapsed):
+    print("{:<28} {:>14,.0f} подсказок/с".format(name, hints / elapsed))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    questions = [Question(i, 1, "?", ["a", "b", "c", "d"], rng.randrange(4), "easy")
+                 for i in range(1000)]
+    rounds = max(count // 3 // len(questions), 1)
+    hints = rounds * len(questions) * 3
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for question in questions:
+            legacy_hints(question.correct)
+    report("random модуля (было)", hints, time.perf_counter() - started)
+
+    game = GameState(seed=0)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for question in questions:
+            game_state_hints(game, question)
+    report("GameState, генератор сессии", hints, time.perf_counter() - started)
+
+    batch = HintBatch(seed=0)
+    correct = np.random.default_rng(0).integers(0, 4, count)
+    started = time.perf_counter()
+    batch.fifty_fifty(correct)
+    batch.call_friend(correct)
+    batch.audience(correct)
+    report("HintBatch", count * 3, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
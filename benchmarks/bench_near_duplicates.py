@@ -0,0 +1,104 @@
+"""
+Индекс почти одинаковых вопросов (MinHash/LSH) на синтетическом банке:
+время подписей и пополнения индекса, полнота на вставленных
+переформулировках и ложные объединения
+
+Запуск: python -m benchmarks.bench_near_duplicates [вопросов] [доля копий]
+"""
+
+import random
+import sys
+import time
+
+from near_duplicates import NearDuplicateIndex
+
+
+BATCH = 100000
+# Слов в словаре: пересечения словаря как у настоящих вопросов, а не
+# как у 20 слов synthetic_bank, где похожи все вопросы
+VOCABULARY = 50000
+
+
+def make_vocabulary(rng):
+    syllables = ['ка', 'ро', 'ми', 'на', 'ле', 'то', 'вус', 'гра', 'пол', 'сти',
+                 'бер', 'дон', 'жа', 'зе', 'ку', 'лан', 'мор', 'пе', 'ри', 'сол']
+    return [''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+            for _ in range(VOCABULARY)]
+
+
+def reword(text, options, rng, words):
+    """Переформулировка: другой регистр, вставленное слово, варианты по кругу"""
+    text_words = text.rstrip('?').split()
+    text_words.insert(rng.randrange(len(text_words) + 1), rng.choice(words))
+    shift = rng.randrange(4)
+    return (' '.join(text_words).upper() + ' ?',
+            options[shift:] + options[:shift])
+
+
+def generate(count, copy_share, seed=0):
+    """Пары (текст, варианты) и список (позиция оригинала, позиция копии)"""
+    rng = random.Random(seed)
+    words = make_vocabulary(rng)
+    items = []
+    copies = []
+    while len(items) < count:
+        text = ' '.join(rng.sample(words, rng.randint(6, 10))).capitalize() + '?'
+        options = [rng.choice(words) for _ in range(3)] + \
+            [str(rng.randint(1, 2000))]
+        items.append((text, options))
+        if rng.random() < copy_share and len(items) < count:
+            copies.append((len(items) - 1, len(items)))
+            items.append(reword(text, options, rng, words))
+    return items, copies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    copy_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+
+    started = time.perf_counter()
+    items, copies = generate(count, copy_share)
+    print("Банк: {:,} вопросов, {:,} переформулировок, {:.1f} с".format(
+        len(items), len(copies), time.perf_counter() - started))
+
+    index = NearDuplicateIndex()
+    signature_time = index_time = 0.0
+    for start in range(0, len(items), BATCH):
+        batch = items[start:start + BATCH]
+        started = time.perf_counter()
+        keys, low_bytes = index.hasher.signatures(batch)
+        signature_time += time.perf_counter() - started
+        started = time.perf_counter()
+        index.add_signatures(range(start, start + len(batch)), keys, low_bytes)
+        index_time += time.perf_counter() - started
+
+    started = time.perf_counter()
+    clusters = index.clusters()
+    cluster_time = time.perf_counter() - started
+
+    print("Подписи MinHash: {:.1f} с ({:,.0f} вопросов/с)".format(
+        signature_time, len(items) / signature_time))
+    print("Пополнение индекса: {:.1f} с ({:,.0f} вопросов/с)".format(
+        index_time, len(items) / index_time))
+    print("Кластеры: {:.2f} с, {:,} кластеров".format(cluster_time, len(clusters)))
+
+    found = sum(index._find(a) == index._find(b) for a, b in copies)
+    linked = sum(len(cluster) - 1 for cluster in clusters)
+    print("Полнота: {:.1%} ({:,} из {:,}), лишних объединений: {:,}".format(
+        found / len(copies) if copies else 1.0, found, len(copies),
+        linked - found))
+
+    band_bytes = sum(keys.nbytes + positions.nbytes
+                     for runs in index.band_runs for keys, positions in runs)
+    print("Память индекса: {:.0f} байт на вопрос".format(
+        (band_bytes + index._low_bytes[:len(index)].nbytes +
+         len(index) * 8 * 3) / len(index)))
+
+    started = time.perf_counter()
+    for text, options in items[:1000]:
+        index.query(text, options)
+    print("query: {:.0f} мкс".format((time.perf_counter() - started) * 1000))
+
+
+if __name__ == "__main__":
+    main()
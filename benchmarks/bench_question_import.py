@@ -0,0 +1,72 @@
+"""
+Импорт выгрузок CSV и JSONL через question_import: строк в секунду
+по этапам конвейера и пиковая память главного процесса
+
+После каждого десятого вопроса идет его копия с другим регистром,
+пробелами и порядком вариантов, чтобы было что отбрасывать как дубли.
+
+Запуск: python -m benchmarks.bench_question_import [строк] [процессов]
+"""
+
+import csv
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_bank import DEFAULT_PRIZE_LADDER, generate_questions
+from question_import import import_questions
+
+
+def write_dumps(tmp_dir, rows):
+    """Вопросы поровну в CSV и JSONL, уровни не заданы; возвращает пути"""
+    csv_path = os.path.join(tmp_dir, 'dump.csv')
+    jsonl_path = os.path.join(tmp_dir, 'dump.jsonl')
+    with open(csv_path, 'w', encoding='utf-8', newline='') as csv_file, \
+            open(jsonl_path, 'w', encoding='utf-8') as jsonl_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['text', 'option1', 'option2', 'option3', 'option4',
+                         'correct', 'difficulty'])
+        def write(q_data, to_csv):
+            if to_csv:
+                writer.writerow([q_data['text'], *q_data['options'],
+                                 'ABCD'[q_data['correct']], q_data['difficulty']])
+            else:
+                jsonl_file.write(json.dumps(q_data, ensure_ascii=False) + '\n')
+
+        for q_data in generate_questions(rows * 10 // 11):
+            del q_data['level']
+            write(q_data, q_data['id'] & 1)
+            if q_data['id'] % 10 == 0:
+                copy = dict(q_data, text="  " + q_data['text'].upper(),
+                            options=q_data['options'][::-1],
+                            correct=3 - q_data['correct'])
+                write(copy, not q_data['id'] & 1)
+    return [csv_path, jsonl_path]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        started = time.perf_counter()
+        sources = write_dumps(tmp_dir, rows)
+        print("Выгрузки, {:,} строк: {:.1f} с, {:.0f} МБ".format(
+            rows, time.perf_counter() - started,
+            sum(os.path.getsize(path) for path in sources) / 2 ** 20))
+
+        output = os.path.join(tmp_dir, 'questions.json')
+        stats = import_questions(sources, output,
+                                 prize_ladder=DEFAULT_PRIZE_LADDER,
+                                 workers=workers)
+        print(stats.report())
+        print("Выход {:.0f} МБ, пик памяти главного процесса {:.0f} МБ".format(
+            os.path.getsize(output) / 2 ** 20,
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Сравнение памяти под вопросы: старый Question с __dict__,
+Question со __slots__ и колоночная QuestionTable
+
+Запуск: python -m benchmarks.bench_question_memory [количество]
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.synthetic_bank import generate_questions
+from game_logic import Question
+from question_table import QuestionTable
+
+
+class LegacyQuestion:
+    """Прежнее представление вопроса: __dict__ и свой список вариантов"""
+
+    def __init__(self, question_id, level, text, options, correct, difficulty):
+        self.id = question_id
+        self.level = level
+        self.text = text
+        self.options = options
+        self.correct = correct
+        self.difficulty = difficulty
+
+
+def build_objects(lines, question_class):
+    result = []
+    for line in lines:
+        q_data = json.loads(line)
+        result.append(question_class(
+            q_data['id'], q_data['level'], q_data['text'],
+            q_data['options'], q_data['correct'], q_data['difficulty']
+        ))
+    return result
+
+
+def build_table(lines):
+    return QuestionTable.from_questions(json.loads(line) for line in lines)
+
+
+def measure(name, build, lines):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    layout = build(lines)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_question = current / len(lines)
+    print("{:<22} {:>10.1f} МБ {:>8.1f} Б/вопрос {:>10.1f} МБ пик {:>7.2f} с".format(
+        name, current / 2 ** 20, per_question, peak / 2 ** 20, elapsed
+    ))
+    del layout
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    # Каждый вопрос разбирается из своих байтов, как при загрузке файла
+    lines = [json.dumps(q, ensure_ascii=False).encode('utf-8')
+             for q in generate_questions(count)]
+    print("Вопросов: {}".format(count))
+
+    measure("Question (__dict__)", lambda ls: build_objects(ls, LegacyQuestion), lines)
+    measure("Question (__slots__)", lambda ls: build_objects(ls, Question), lines)
+    measure("QuestionTable", build_table, lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Полнотекстовый поиск (question_search) на синтетическом банке:
+время построения, размер индекса и задержка запросов разных видов
+
+Частоты слов — по закону Ципфа, как в настоящем тексте: частые слова
+встречаются в сотнях тысяч вопросов, редкие — в единицах.
+
+Запуск: python -m benchmarks.bench_question_search [вопросов]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_near_duplicates import make_vocabulary
+from question_search import QuestionSearchIndex
+
+
+COMMON = ['какой', 'какая', 'каком', 'году', 'кто', 'сколько', 'где', 'был',
+          'является', 'самый', 'город', 'страна', 'автор', 'столица', 'планета']
+DIFFICULTIES = ['easy', 'medium', 'hard']
+QUERIES = 200
+
+
+def generate(count, seed=0):
+    """Вопросы (текст, варианты, уровень, сложность)"""
+    rng = random.Random(seed)
+    words = COMMON + make_vocabulary(rng)
+    np_rng = np.random.default_rng(seed)
+    # Номера слов по Ципфу, сразу для всех вопросов
+    picks = (np_rng.zipf(1.1, count * 14) - 1) % len(words)
+    cursor = 0
+    for i in range(count):
+        text_words = [words[int(k)] for k in picks[cursor:cursor + 10]]
+        option_words = [words[int(k)] for k in picks[cursor + 10:cursor + 14]]
+        cursor += 14
+        level = i % 15 + 1
+        yield (' '.join(text_words).capitalize() + '?', option_words, level,
+               DIFFICULTIES[(level - 1) // 5])
+
+
+def timed_queries(index, name, queries, **filters):
+    latencies = []
+    found = 0
+    for query in queries:
+        started = time.perf_counter()
+        found += len(index.search(query, **filters))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print("  {:<28} p50 {:>7.2f} мс  p99 {:>7.2f} мс  найдено в среднем {:.1f}".format(
+        name, latencies[len(latencies) // 2] * 1000,
+        latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000,
+        found / len(queries)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+
+    index = QuestionSearchIndex()
+    sample = []
+    rng = random.Random(1)
+    started = time.perf_counter()
+    for question_id, (text, options, level, difficulty) in enumerate(
+            generate(count), 1):
+        index.add(question_id, text, options, level, difficulty)
+        if rng.random() < QUERIES * 4 / count:
+            sample.append(text.rstrip('?').lower().split())
+    print("Построение: {:,} вопросов за {:.1f} с".format(
+        count, time.perf_counter() - started))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'questions.search')
+        started = time.perf_counter()
+        index.save(path)
+        print("save: {:.1f} с, {:.0f} МБ".format(
+            time.perf_counter() - started, os.path.getsize(path) / 2 ** 20))
+        started = time.perf_counter()
+        index = QuestionSearchIndex.load(path)
+        print("load: {:.1f} с".format(time.perf_counter() - started))
+
+    sample = sample[:QUERIES]
+    print("Запросы:")
+    timed_queries(index, "частое слово", ['какой'] * 20)
+    timed_queries(index, "редкое слово", [words[-1] for words in sample])
+    timed_queries(index, "два слова", [' '.join(words[1:3]) for words in sample])
+    timed_queries(index, "фраза", ['"{}"'.format(' '.join(words[2:5]))
+                                   for words in sample])
+    timed_queries(index, "начало слова", [words[-1][:4] + '*' for words in sample])
+    timed_queries(index, "два слова, уровень 7",
+                  [' '.join(words[1:3]) for words in sample], level=7)
+    timed_queries(index, "частое слово, hard", ['какой'] * 20,
+                  difficulty='hard')
+
+    for text, options, level, difficulty in generate(10000, seed=1):
+        index.add(0, text, options, level, difficulty)
+    timed_queries(index, "после пополнения (10 тыс.)",
+                  [' '.join(words[1:3]) for words in sample])
+
+
+if __name__ == "__main__":
+    main()
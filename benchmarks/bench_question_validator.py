@@ -0,0 +1,79 @@
+"""
+Проверка банка (question_validator) на синтетическом банке: время
+поиска границ вопросов и всей проверки, вопросов в секунду
+
+В банк вставляется по одной ошибке каждого вида, чтобы проверить, что
+отчет их находит.
+
+Запуск: python -m benchmarks.bench_question_validator [вопросов] [процессов]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_bank import DEFAULT_PRIZE_LADDER, generate_questions
+from question_validator import question_spans, validate_bank
+
+
+def write_broken_bank(path, count):
+    """Банк из count вопросов с ошибками в начале; возвращает их коды"""
+    broken = {
+        10: ('correct_range', lambda q: q.update(correct=4)),
+        20: ('options_count', lambda q: q['options'].pop()),
+        30: ('duplicate_id', lambda q: q.update(id=1)),
+        40: ('empty_text', lambda q: q.update(text=' ')),
+        50: ('missing_field', lambda q: q.pop('difficulty')),
+        60: ('level_not_in_ladder', lambda q: q.update(level=99)),
+        70: ('type', lambda q: q.update(correct="1")),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"questions": [\n')
+        for i, q_data in enumerate(generate_questions(count)):
+            if i in broken:
+                broken[i][1](q_data)
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(q_data, ensure_ascii=False))
+        f.write('\n], "prize_ladder": ')
+        json.dump(DEFAULT_PRIZE_LADDER, f, ensure_ascii=False)
+        f.write('}\n')
+    return [code for code, _ in broken.values()]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'questions.json')
+        started = time.perf_counter()
+        expected = write_broken_bank(path, count)
+        print("Банк: {:,} вопросов, {:.0f} МБ, {:.1f} с".format(
+            count, os.path.getsize(path) / 2 ** 20, time.perf_counter() - started))
+
+        with open(path, 'rb') as f:
+            data = np.fromfile(f, np.uint8)
+        started = time.perf_counter()
+        spans = sum(1 for _ in question_spans(data))
+        elapsed = time.perf_counter() - started
+        print("Границы вопросов: {:.2f} с ({:.0f} МБ/с), {} кусков".format(
+            elapsed, len(data) / 2 ** 20 / elapsed, spans - 1))
+        del data
+
+        report = validate_bank(path, workers)
+        print("Проверка: {:.2f} с ({:,.0f} вопросов/с), процессов {}".format(
+            report['seconds'], report['questions'] / report['seconds'],
+            workers or os.cpu_count()))
+        # duplicate_options бывают и в самом синтетическом банке
+        print("Ошибки: {}".format(report['counts']))
+        print("Все вставленные ошибки найдены: {}".format(
+            set(expected) <= set(report['counts'])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Память и время создания на одну сессию GameState:
+прежний разбор questions.json в каждой сессии против общего GameBank
+
+Запуск: python -m benchmarks.bench_sessions [сессий] [файл вопросов]
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from game_logic import GameBank, GameState, Question
+
+
+def legacy_session(questions_file):
+    """Прежний конструктор: каждая сессия читает и разбирает весь файл"""
+    with open(questions_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    questions = [
+        Question(q['id'], q['level'], q['text'], q['options'],
+                 q['correct'], q['difficulty'])
+        for q in data['questions']
+    ]
+    prize_ladder = data['prize_ladder']
+    safe_haven_amounts = [p['amount'] for p in prize_ladder if p['safe_haven']]
+    return questions, prize_ladder, safe_haven_amounts
+
+
+def measure(name, factory, sessions):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    alive = [factory() for _ in range(sessions)]
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("{:<26} {:>8} сессий {:>10.1f} КБ/сессию {:>8.1f} мкс/сессию".format(
+        name, len(alive), current / sessions / 1024, elapsed / sessions * 1e6
+    ))
+    return alive
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    questions_file = sys.argv[2] if len(sys.argv) > 2 else 'questions.json'
+
+    measure("json.load на сессию", lambda: legacy_session(questions_file), sessions)
+
+    # Первый банк разбирается до замера, как при старте сервера
+    bank = GameBank.load(questions_file)
+    measure("GameState(bank=...)", lambda: GameState(bank=bank), sessions)
+    measure("GameState() с кэшем", lambda: GameState(questions_file), sessions)
+
+    alive = measure("GameState + start_new_game",
+                    lambda: GameState(bank=bank), sessions)
+    started = time.perf_counter()
+    for game in alive:
+        game.start_new_game()
+    elapsed = time.perf_counter() - started
+    print("start_new_game: {:.1f} мкс/сессию".format(elapsed / sessions * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Скорость симуляции игр: цикл по GameState против пакетного GameSimulator
+
+Запуск: python -m benchmarks.bench_simulator [игр для GameSimulator]
+"""
+
+import random
+import sys
+import time
+
+from game_logic import GameState
+from game_simulator import GameSimulator, linear_accuracy
+
+
+def play_game_state(game, accuracy, rng):
+    """Одна игра через GameState: подсказки, когда игрок не знает ответа"""
+    game.start_new_game()
+    while not game.is_game_won():
+        question = game.current_question
+        if rng.random() < accuracy[game.current_level]:
+            answer = question.correct
+        elif not game.hint_5050_used:
+            answer = rng.choice(game.use_hint_5050())
+        elif not game.hint_call_used:
+            answer = game.use_hint_call_friend()
+        elif not game.hint_audience_used:
+            votes = game.use_hint_audience()
+            answer = max(votes, key=votes.get)
+        else:
+            answer = rng.randrange(4)
+
+        if not game.check_answer(answer):
+            return game.get_safe_haven_prize()
+        game.advance_level()
+    return game.get_current_prize()
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    game = GameState()
+    accuracy = linear_accuracy(0.95, 0.4, len(game.prize_ladder))
+
+    rng = random.Random(0)
+    python_games = 100000
+    started = time.perf_counter()
+    total = sum(play_game_state(game, accuracy, rng) for _ in range(python_games))
+    elapsed = time.perf_counter() - started
+    print("{:<16} {:>12,.0f} игр/с, средняя выплата {:>10,.0f}".format(
+        "GameState", python_games / elapsed, total / python_games))
+
+    simulator = GameSimulator(game.prize_ladder, accuracy, seed=0)
+    report = simulator.run(games)
+    print("{:<16} {:>12,.0f} игр/с, средняя выплата {:>10,.0f}".format(
+        "GameSimulator", report['games_per_second'], report['expected_cost']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Время точного решения StrategySolver для длинных призовых лестниц
+
+Таблицы исходов подсказок считаются один раз на процесс и в замер
+не входят.
+
+Запуск: python -m benchmarks.bench_solver
+"""
+
+import time
+
+from strategy_solver import StrategySolver
+
+
+def make_ladder(levels, growth=1.02, safe_every=10):
+    """Лестница с геометрически растущими суммами"""
+    return [{'level': level, 'amount': int(500 * growth ** (level - 1)),
+             'safe_haven': level % safe_every == 0}
+            for level in range(1, levels + 1)]
+
+
+def main():
+    started = time.perf_counter()
+    StrategySolver(make_ladder(1))
+    print("Таблицы исходов подсказок: {:.0f} мс".format(
+        (time.perf_counter() - started) * 1000))
+
+    for levels in (15, 100, 300, 1000):
+        ladder = make_ladder(levels)
+        started = time.perf_counter()
+        solver = StrategySolver(ladder, accuracy=0.97).solve()
+        elapsed = time.perf_counter() - started
+        print("{:>5} уровней: {:>8.1f} мс, ожидание {:,.0f}".format(
+            levels, elapsed * 1000, solver.expected_value()))
+
+
+if __name__ == "__main__":
+    main()
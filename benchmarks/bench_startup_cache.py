@@ -0,0 +1,79 @@
+"""
+Холодный и теплый старт банка вопросов: json.load, индекс QuestionBank
+и двоичный кэш с mmap
+
+Холодный старт — кэша/индекса еще нет и его нужно собрать,
+теплый — кэш уже лежит рядом с файлом вопросов.
+
+Запуск: python -m benchmarks.bench_startup_cache [количество вопросов]
+"""
+
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_bank import write_bank
+from game_logic import Question
+from question_bank import INDEX_SUFFIX, QuestionBank
+from question_cache import CACHE_SUFFIX, CompiledQuestionBank, load_question_store
+
+
+def json_load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [Question(q['id'], q['level'], q['text'], q['options'],
+                     q['correct'], q['difficulty']) for q in data['questions']]
+
+
+def timed(name, action, repeat=1):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        store = action()
+        # Первый вопрос тоже входит в старт: его показывают сразу
+        store[0]
+        total = time.perf_counter() - started
+        best = total if best is None else min(best, total)
+        del store
+    print("{:<34} {:>10.1f} мс".format(name, best * 1000))
+
+
+def remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'questions.json')
+        write_bank(path, count)
+        print("Вопросов: {}, файл {:.1f} МБ".format(
+            count, os.path.getsize(path) / 2 ** 20))
+
+        timed("json.load + Question", lambda: json_load(path), repeat=3)
+
+        remove(path + INDEX_SUFFIX)
+        timed("QuestionBank, холодный (индекс)", lambda: QuestionBank(path))
+        timed("QuestionBank, теплый", lambda: QuestionBank(path), repeat=5)
+
+        remove(path + CACHE_SUFFIX)
+        timed("Кэш mmap, холодный (компиляция)", lambda: load_question_store(path))
+        timed("Кэш mmap, теплый", lambda: load_question_store(path), repeat=5)
+
+        store = CompiledQuestionBank(path + CACHE_SUFFIX)
+        started = time.perf_counter()
+        for position in range(0, len(store), max(len(store) // 10000, 1)):
+            store[position]
+        elapsed = time.perf_counter() - started
+        print("Чтение вопроса из mmap: {:.2f} мкс".format(
+            elapsed / min(len(store), 10000) * 1e6))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
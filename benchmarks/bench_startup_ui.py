@@ -0,0 +1,56 @@
+"""
+Бенчмарк запуска main.py: импорт, инициализация Tk, первая отрисовка меню
+и готовность банка вопросов
+
+Каждый запуск — отдельный процесс с MILLIONAIRE_STARTUP_REPORT=1:
+приложение печатает отметки времени и закрывается. Нужен графический дисплей.
+
+Запуск: python -m benchmarks.bench_startup_ui [--runs 5] [--questions файл]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+MARKS = ["import", "tk_init", "first_paint", "bank_ready", "started"]
+
+
+def run_once(questions_file):
+    env = dict(os.environ, MILLIONAIRE_STARTUP_REPORT="1",
+               MILLIONAIRE_QUESTIONS=questions_file)
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "main.py"], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    wall = (time.perf_counter() - started) * 1000
+
+    for line in output.splitlines():
+        if line.startswith("STARTUP "):
+            report = json.loads(line[len("STARTUP "):])
+            report["process"] = wall
+            return report
+    raise RuntimeError("main.py не напечатал замеры запуска:\n" + output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска игры")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--questions", default="questions.json")
+    args = parser.parse_args()
+
+    reports = [run_once(args.questions) for _ in range(args.runs)]
+
+    print("Запусков: {}, файл вопросов: {}".format(args.runs, args.questions))
+    for mark in MARKS + ["process"]:
+        values = [report[mark] for report in reports if mark in report]
+        if values:
+            print("{:<12} медиана {:>8.1f} мс  max {:>8.1f} мс".format(
+                mark, statistics.median(values), max(values)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Микробенчмарк наведения на ModernButton: сколько пар <Enter>/<Leave>
+в секунду обрабатывается вместе с перерисовкой
+
+Для сравнения используется прежний draw_button, который удалял
+и заново создавал три сглаженных многоугольника. Нужен графический дисплей.
+
+Запуск: python -m benchmarks.bench_ui_hover [событий]
+"""
+
+import sys
+import time
+import tkinter as tk
+
+from modern_ui_interface import ModernButton
+
+
+class LegacyModernButton(ModernButton):
+    """Кнопка с прежней перерисовкой через delete/create"""
+
+    def draw_button(self):
+        self.delete("button_bg")
+
+        radius = 15
+        color = self.hover_color if self.is_hovered else self.bg_color
+        shadow_offset = 3 if not self.is_hovered else 1
+
+        self.create_legacy_rect(shadow_offset, shadow_offset,
+                                self.width, self.height, radius,
+                                fill="#000000", stipple="gray25",
+                                outline="", tags="button_bg")
+        self.create_legacy_rect(0, 0, self.width - shadow_offset,
+                                self.height - shadow_offset, radius,
+                                fill=color, outline="", tags="button_bg")
+        self.create_legacy_rect(5, 5, self.width - shadow_offset - 5,
+                                self.height / 2, radius,
+                                fill="#ffffff", stipple="gray25",
+                                outline="", tags="button_bg")
+        self.tag_lower("button_bg")
+
+    def create_legacy_rect(self, x1, y1, x2, y2, radius, **kwargs):
+        points = [
+            x1 + radius, y1, x2 - radius, y1, x2, y1, x2, y1 + radius,
+            x2, y2 - radius, x2, y2, x2 - radius, y2, x1 + radius, y2,
+            x1, y2, x1, y2 - radius, x1, y1 + radius, x1, y1
+        ]
+        return self.create_polygon(points, smooth=True, **kwargs)
+
+
+def measure(root, button_class, events):
+    button = button_class(root, text="A: вариант", command=None,
+                          width=345, height=70, bg="#667eea")
+    button.pack()
+    root.update()
+
+    started = time.perf_counter()
+    for _ in range(events // 2):
+        button.on_enter(None)
+        root.update_idletasks()
+        button.on_leave(None)
+        root.update_idletasks()
+    elapsed = time.perf_counter() - started
+
+    items = len(button.find_all())
+    button.destroy()
+    return events / elapsed, items
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    root = tk.Tk()
+
+    for name, button_class in (("delete/create (было)", LegacyModernButton),
+                               ("itemconfig/coords", ModernButton)):
+        rate, items = measure(root, button_class, events)
+        print("{:<22} {:>10.0f} событий/с, элементов на холсте: {}".format(
+            name, rate, items))
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
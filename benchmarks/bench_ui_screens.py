@@ -0,0 +1,69 @@
+"""
+Время переключения экранов: пересборка виджетов против кэша экранов
+
+Для каждого цикла «меню -> новая игра» измеряется время вместе с
+отрисовкой (update_idletasks). Нужен графический дисплей.
+
+Запуск: python -m benchmarks.bench_ui_screens [циклов]
+"""
+
+import sys
+import time
+
+from modern_ui_interface import MillionaireModernUI
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def drop_screens(ui):
+    """Выбросить кэш, чтобы следующий показ строил экран заново"""
+    for screen in ui.screens.values():
+        screen.destroy()
+    ui.screens.clear()
+    ui.current_screen = None
+
+
+def run_cycles(ui, cycles, rebuild):
+    timings = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        if rebuild:
+            drop_screens(ui)
+        ui.show_main_menu()
+        ui.root.update_idletasks()
+        if rebuild:
+            drop_screens(ui)
+        ui.start_game()
+        ui.root.update_idletasks()
+        timings.append(time.perf_counter() - started)
+        ui.root.update()
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+    print("{:<24} среднее {:>7.2f} мс  p95 {:>7.2f} мс".format(
+        name, mean * 1000, p95 * 1000))
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    ui = MillionaireModernUI()
+    # Банк вопросов грузится в фоне
+    while ui.game is None:
+        ui.root.update()
+    ui.root.update()
+
+    report("Пересборка экранов", run_cycles(ui, cycles, rebuild=True))
+    report("Кэш экранов", run_cycles(ui, cycles, rebuild=False))
+    print("Виджетов в окне: {}".format(count_widgets(ui.root)))
+
+    ui.root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Длительный прогон интерфейса: тысячи игр подряд без перезапуска окна
+
+Ответы в диалогах нажимаются автоматически, паузы показа ответа
+обнулены, чтобы игры шли без участия человека. Каждые --every игр печатаются число виджетов, элементов фона,
+Tcl-команд (колбэки виджетов) и память Python. Рост этих чисел при
+постоянном числе игр означает утечку. Нужен графический дисплей.
+
+Запуск: python -m benchmarks.soak_ui [--games 5000] [--every 500]
+"""
+
+import argparse
+import random
+import tracemalloc
+
+import modern_ui_interface
+from modern_ui_interface import MillionaireModernUI
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * 4
+    except OSError:
+        return 0
+
+
+def pump(ui):
+    """Прокрутить цикл событий, пока идет показ ответа"""
+    ui.root.update()
+    while ui.reveal_state is not None:
+        ui.root.update()
+
+
+def play_game(ui, rng):
+    ui.start_game()
+    while ui.current_screen is ui.screens.get("game"):
+        hint = rng.random()
+        if hint < 0.1:
+            ui.use_hint("50:50")
+        elif hint < 0.2:
+            ui.use_hint("ЗВОНОК")
+        elif hint < 0.3:
+            ui.use_hint("ЗАЛ")
+            ui.hide_pooled_dialog("audience")
+
+        answer = ui.game.current_question.correct
+        if rng.random() < 0.3:
+            answer = (answer + 1) % 4
+        ui.select_answer(answer)
+        pump(ui)
+
+
+def snapshot(ui, games):
+    current, _ = tracemalloc.get_traced_memory()
+    print("{:>7} {:>9} {:>8} {:>11} {:>12.1f} {:>10}".format(
+        games, count_widgets(ui.root), len(ui.bg_canvas.find_all()),
+        len(ui.root.tk.call('info', 'commands')), current / 1024, rss_kb()
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Длительный прогон интерфейса")
+    parser.add_argument('--games', type=int, default=5000)
+    parser.add_argument('--every', type=int, default=500)
+    args = parser.parse_args()
+
+    ui = MillionaireModernUI()
+    # Банк вопросов грузится в фоне
+    while ui.game is None:
+        ui.root.update()
+    ui.REVEAL_SELECTED_MS = ui.REVEAL_CORRECT_MS = ui.REVEAL_WRONG_MS = 0
+    # Продолжаем после правильного ответа, остальные диалоги ведут в меню;
+    # ответ «нажимается» из цикла событий, пока диалог ждет
+    show_custom_dialog = ui.show_custom_dialog
+
+    def auto_dialog(title, message, icon_color="#4CAF50"):
+        ui.root.after(0, ui.hide_pooled_dialog, "custom",
+                      title.startswith("Отлично"))
+        return show_custom_dialog(title, message, icon_color)
+
+    ui.show_custom_dialog = auto_dialog
+    modern_ui_interface.messagebox.showinfo = lambda *args, **kwargs: None
+
+    rng = random.Random(0)
+    tracemalloc.start()
+    print("{:>7} {:>9} {:>8} {:>11} {:>12} {:>10}".format(
+        "игр", "виджетов", "фон", "tcl-команд", "python, КБ", "RSS, КБ"))
+    for games in range(1, args.games + 1):
+        play_game(ui, rng)
+        if games % args.every == 0:
+            snapshot(ui, games)
+
+    ui.root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Генератор синтетических банков вопросов для бенчмарков
+"""
+
+import json
+import random
+
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+DEFAULT_PRIZE_LADDER = [
+    {"level": 1, "amount": 500, "safe_haven": False},
+    {"level": 2, "amount": 1000, "safe_haven": False},
+    {"level": 3, "amount": 2000, "safe_haven": False},
+    {"level": 4, "amount": 3000, "safe_haven": False},
+    {"level": 5, "amount": 5000, "safe_haven": True},
+    {"level": 6, "amount": 10000, "safe_haven": False},
+    {"level": 7, "amount": 15000, "safe_haven": False},
+    {"level": 8, "amount": 25000, "safe_haven": False},
+    {"level": 9, "amount": 50000, "safe_haven": False},
+    {"level": 10, "amount": 100000, "safe_haven": True},
+    {"level": 11, "amount": 200000, "safe_haven": False},
+    {"level": 12, "amount": 400000, "safe_haven": False},
+    {"level": 13, "amount": 800000, "safe_haven": False},
+    {"level": 14, "amount": 1500000, "safe_haven": False},
+    {"level": 15, "amount": 3000000, "safe_haven": False}
+]
+
+_WORDS = [
+    "планета", "река", "столица", "автор", "роман", "год", "элемент",
+    "океан", "гора", "композитор", "художник", "страна", "язык", "море",
+    "война", "картина", "остров", "пустыня", "континент", "город"
+]
+
+
+def make_question(question_id, rng, levels=15):
+    """Один синтетический вопрос в формате questions.json"""
+    level = (question_id - 1) % levels + 1
+    words = rng.sample(_WORDS, 4)
+    text = "Вопрос {}: какой {} связан с {} и {}?".format(
+        question_id, words[0], words[1], words[2]
+    )
+    # Варианты из небольшого словаря, как годы и числа в реальной базе
+    options = [str(rng.randint(1, 2000)) for _ in range(2)] + \
+        [rng.choice(_WORDS).capitalize() for _ in range(2)]
+    return {
+        "id": question_id,
+        "level": level,
+        "text": text,
+        "options": options,
+        "correct": rng.randrange(4),
+        "difficulty": DIFFICULTIES[min((level - 1) * 3 // levels, 2)]
+    }
+
+
+def generate_questions(count, levels=15, seed=0):
+    """Генератор count вопросов"""
+    rng = random.Random(seed)
+    for question_id in range(1, count + 1):
+        yield make_question(question_id, rng, levels)
+
+
+def write_bank(path, count, levels=15, seed=0, prize_ladder=None):
+    """Записать банк из count вопросов в файл формата questions.json"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"questions": [\n')
+        for i, q_data in enumerate(generate_questions(count, levels, seed)):
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(q_data, ensure_ascii=False))
+        f.write('\n], "prize_ladder": ')
+        json.dump(prize_ladder or DEFAULT_PRIZE_LADDER, f, ensure_ascii=False)
+        f.write('}\n')
+    return path
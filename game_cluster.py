@@ -0,0 +1,180 @@
+"""
+Многопроцессный режим сервера игры: процессы-обработчики сами принимают
+подключения клиентов с одного общего слушающего сокета
+
+Протокол для клиентов тот же, что у game_server.py. Сессия принадлежит
+подключению, которое ее начало, поэтому все запросы клиента обрабатывает
+процесс, принявший подключение: общего фронта, который разбирал бы каждый
+запрос, нет, и подключения между процессами распределяет ядро. Банк
+вопросов один раз компилируется в кэш .qbc, и каждый обработчик открывает
+его через mmap: страницы файла общие в кэше ОС, копий банка в процессах нет.
+
+История показанных вопросов игрока у каждого процесса своя.
+
+Запуск: python game_cluster.py --workers 4 --port 8765
+"""
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import sys
+import threading
+
+from game_events import EventLog
+from game_results import ResultLog
+from game_server import GameServer
+from question_cache import CACHE_SUFFIX, compile_bank, is_cache_fresh
+from question_decks import DeckPool
+
+
+def worker_main(questions_file, listener, shard, shards, events=None,
+                results=None, decks=0):
+    """Процесс-обработчик: GameServer на общем слушающем сокете
+
+    Номера сессий обработчика дают остаток shard при делении на shards,
+    так что они не пересекаются между процессами. Журнал событий у каждого
+    процесса в своем файле (events.<shard>), журнал итогов общий: его
+    сегменты и так у каждого процесса свои.
+    """
+    # terminate() от кластера завершает процесс через finally: буферы
+    # журналов сбрасываются, сегмент итогов закрывается
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Без кластера обработчик не нужен, даже если тот убит без stop()
+    threading.Thread(target=exit_with_parent, daemon=True).start()
+
+    event_log = EventLog('{}.{}'.format(events, shard)) if events else None
+    result_log = ResultLog(results) if results else None
+    server = GameServer(questions_file, event_log,
+                        session_ids=itertools.count(shard + shards, shards),
+                        results=result_log)
+    if decks:
+        server.decks = DeckPool(server.bank, capacity=decks)
+        server.decks.fill()
+        server.decks.start()
+    try:
+        asyncio.run(server.serve(sock=listener))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.decks is not None:
+            server.decks.close()
+        if event_log is not None:
+            event_log.close()
+        if result_log is not None:
+            result_log.close()
+
+
+def exit_with_parent():
+    multiprocessing.parent_process().join()
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+class GameCluster:
+    """Процессы с GameServer на одном слушающем сокете"""
+
+    def __init__(self, questions_file='questions.json', workers=None,
+                 events=None, results=None, decks=0):
+        self.questions_file = questions_file
+        self.workers = workers or os.cpu_count() or 1
+        # Пути журналов и размер запаса колод: сами объекты создает
+        # каждый процесс-обработчик
+        self.events = events
+        self.results = results
+        self.decks = decks
+        self.processes = []
+        self.listener = None
+
+    def listen(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Слушающий сокет, общий для всех обработчиков"""
+        if unix_path:
+            # Файл сокета от прошлого запуска, как в asyncio.start_unix_server
+            try:
+                if stat.S_ISSOCK(os.stat(unix_path).st_mode):
+                    os.remove(unix_path)
+            except FileNotFoundError:
+                pass
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(unix_path)
+            listener.listen(socket.SOMAXCONN)
+        else:
+            listener = socket.create_server((host, port),
+                                            backlog=socket.SOMAXCONN)
+        return listener
+
+    def start_workers(self, listener):
+        """Собрать кэш банка и запустить процессы-обработчики"""
+        cache_file = self.questions_file + CACHE_SUFFIX
+        if not is_cache_fresh(self.questions_file, cache_file):
+            try:
+                compile_bank(self.questions_file, cache_file)
+            except OSError:
+                # Кэш нельзя записать (каталог только для чтения):
+                # обработчики откроют JSON сами, как load_question_store
+                if not os.path.exists(self.questions_file):
+                    raise
+
+        # spawn, а не fork: обработчикам не нужны потоки и состояние фронта
+        context = multiprocessing.get_context('spawn')
+        for shard in range(self.workers):
+            process = context.Process(
+                target=worker_main, daemon=True,
+                args=(self.questions_file, listener, shard, self.workers,
+                      self.events, self.results, self.decks),
+            )
+            process.start()
+            self.processes.append(process)
+
+    def serve(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Запустить обработчики и ждать их завершения"""
+        self.listener = self.listen(host, port, unix_path)
+        self.start_workers(self.listener)
+        print("Кластер из {} процессов слушает {}".format(
+            self.workers, self.listener.getsockname()), flush=True)
+        for process in self.processes:
+            process.join()
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        if self.listener is not None:
+            self.listener.close()
+
+
+def main():
+    """Точка входа многопроцессного сервера"""
+    parser = argparse.ArgumentParser(description="Многопроцессный сервер игры")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="путь к Unix-сокету вместо TCP")
+    parser.add_argument('--questions', default='questions.json')
+    parser.add_argument('--workers', type=int,
+                        help="число процессов-обработчиков (по умолчанию — ядер)")
+    parser.add_argument('--events', help="журнал событий игр: у процесса N "
+                                         "файл <путь>.N")
+    parser.add_argument('--results', help="каталог журнала итогов игр "
+                                          "(game_results.py)")
+    parser.add_argument('--decks', type=int, default=0,
+                        help="сколько готовых колод вопросов держать в запасе "
+                             "в каждом процессе")
+    args = parser.parse_args()
+
+    cluster = GameCluster(args.questions, args.workers, args.events,
+                          args.results, args.decks)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        cluster.serve(args.host, args.port, args.unix)
+    except KeyboardInterrupt:
+        print("\nСервер остановлен")
+    finally:
+        cluster.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Журнал событий игры: каждый переход GameState — запись фиксированной длины
+в файле, который только дописывается
+
+Записи копятся в буфере и сбрасываются на диск пачками с одним fsync.
+Журнал можно проиграть заново: восстановить состояние любой сессии или
+посчитать статистику по миллионам игр (NumPy читает файл через memmap).
+
+Просмотр журнала: python game_events.py games.events [--session N]
+"""
+
+import argparse
+import os
+import struct
+import threading
+import time
+
+
+EVENTS_MAGIC = b'GEV1'
+EVENTS_VERSION = 1
+
+# magic, версия, размер записи
+_HEADER = struct.Struct('<4sHH8x')
+# сессия, id вопроса, время (unix, с), данные, уровень, тип, ответ
+_EVENT = struct.Struct('<QqIIHBb4x')
+
+# Типы событий
+EVENT_START = 1
+EVENT_QUESTION = 2
+EVENT_ANSWER = 3          # answer — выбранный вариант, data — 1 если верно
+EVENT_ADVANCE = 4
+EVENT_HINT_5050 = 5       # data — битовая маска оставшихся вариантов
+EVENT_HINT_CALL = 6       # answer — вариант, названный другом
+EVENT_HINT_AUDIENCE = 7   # data — проценты вариантов по байту на каждый
+EVENT_TAKE_MONEY = 8      # data — выигрыш
+EVENT_GAME_OVER = 9       # answer — 1 победа, 0 неверный ответ; data — выигрыш
+
+EVENT_NAMES = {
+    EVENT_START: 'start',
+    EVENT_QUESTION: 'question',
+    EVENT_ANSWER: 'answer',
+    EVENT_ADVANCE: 'advance',
+    EVENT_HINT_5050: 'hint_5050',
+    EVENT_HINT_CALL: 'hint_call',
+    EVENT_HINT_AUDIENCE: 'hint_audience',
+    EVENT_TAKE_MONEY: 'take_money',
+    EVENT_GAME_OVER: 'game_over',
+}
+
+
+def pack_percentages(percentages):
+    """Проценты зала {индекс: процент} в одно число, по байту на вариант"""
+    return sum(percentages.get(i, 0) << (8 * i) for i in range(4))
+
+
+def unpack_percentages(data):
+    return {i: data >> (8 * i) & 0xFF for i in range(4)}
+
+
+class EventLog:
+    """Журнал событий с групповой записью на диск
+
+    Запись сбрасывается, когда в буфере набралось batch_size событий
+    или прошло sync_interval секунд, одним write и одним fsync.
+    """
+
+    def __init__(self, path, batch_size=4096, sync_interval=0.1):
+        self.path = path
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.buffer = bytearray()
+        self.count = 0
+        # События, значения которых не помещаются в запись (пропущены)
+        self.dropped = 0
+        self._writer = self._new_writer()
+        self._sessions = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        self.file = open(path, 'ab')
+        size = self.file.tell()
+        if size == 0:
+            self.file.write(_HEADER.pack(EVENTS_MAGIC, EVENTS_VERSION,
+                                         _EVENT.size))
+            self.file.flush()
+        else:
+            with open(path, 'rb') as f:
+                magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != EVENTS_MAGIC or record_size != _EVENT.size:
+                self.file.close()
+                raise Exception(f"Файл {path} не является журналом событий!")
+            # Недописанная при сбое запись отрезается
+            tail = (size - _HEADER.size) % _EVENT.size
+            if tail:
+                self.file.truncate(size - tail)
+
+        self._flusher = threading.Thread(target=self._flush_periodically,
+                                         daemon=True)
+        self._flusher.start()
+
+    @staticmethod
+    def _new_writer():
+        # Случайные, а не время открытия: процессы кластера открывают
+        # журналы в одну и ту же секунду
+        return int.from_bytes(os.urandom(4), 'little')
+
+    def new_session(self):
+        """Новый номер сессии, уникальный и между процессами и запусками
+
+        Старшие 32 бита — случайный номер этого журнала, младшие — счетчик
+        сессий; когда счетчик кончается, берется новый номер журнала.
+        """
+        with self._lock:
+            self._sessions += 1
+            if self._sessions > 0xFFFFFFFF:
+                self._writer = self._new_writer()
+                self._sessions = 1
+            return self._writer << 32 | self._sessions
+
+    def record(self, session, kind, level, question_id=0, answer=-1, data=0):
+        """Добавить событие в буфер
+
+        Журнал не должен прерывать игру: событие, которое не помещается
+        в запись фиксированной длины, пропускается и учитывается в dropped.
+        """
+        try:
+            event = _EVENT.pack(session, question_id, int(time.time()),
+                                data, level, kind, answer)
+        except struct.error:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.buffer += event
+            self.count += 1
+            full = len(self.buffer) >= self.batch_size * _EVENT.size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Записать накопленные события и дождаться fsync"""
+        with self._io_lock:
+            with self._lock:
+                data, self.buffer = self.buffer, bytearray()
+            if not data:
+                return
+            self.file.write(data)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.sync_interval):
+            self.flush()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        self.file.close()
+
+
+def event_dtype():
+    """Тип NumPy для записи журнала"""
+    import numpy as np
+
+    return np.dtype({
+        'names': ['session', 'question', 'time', 'data', 'level', 'kind',
+                  'answer'],
+        'formats': ['<u8', '<i8', '<u4', '<u4', '<u2', 'u1', 'i1'],
+        'offsets': [0, 8, 16, 20, 24, 26, 27],
+        'itemsize': _EVENT.size,
+    })
+
+
+def read_events(path):
+    """Все события журнала как массив NumPy без копирования (memmap)"""
+    # NumPy нужен только для разбора журнала, не для самой игры
+    import numpy as np
+
+    with open(path, 'rb') as f:
+        magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != EVENTS_MAGIC or record_size != _EVENT.size:
+        raise Exception(f"Файл {path} не является журналом событий!")
+
+    count = (os.path.getsize(path) - _HEADER.size) // _EVENT.size
+    if count == 0:
+        return np.zeros(0, event_dtype())
+    return np.memmap(path, dtype=event_dtype(), mode='r',
+                     offset=_HEADER.size, shape=(count,))
+
+
+def replay_session(events, session, bank):
+    """Восстановить GameState сессии по ее событиям"""
+    from game_logic import GameState
+
+    game = GameState(bank=bank)
+    game.session_id = session
+    for event in events[events['session'] == session]:
+        kind = event['kind']
+        if kind == EVENT_START:
+            game.current_level = 0
+            game.current_question = None
+            game.drawn = []
+            game.hint_5050_used = False
+            game.hint_call_used = False
+            game.hint_audience_used = False
+        elif kind == EVENT_QUESTION:
+            game.current_level = int(event['level'])
+            game.current_question = bank.questions.get_by_id(
+                int(event['question'])
+            )
+            game.drawn.append(game.current_question.id)
+        elif kind == EVENT_ADVANCE:
+            game.current_level = int(event['level'])
+        elif kind == EVENT_HINT_5050:
+            game.hint_5050_used = True
+        elif kind == EVENT_HINT_CALL:
+            game.hint_call_used = True
+        elif kind == EVENT_HINT_AUDIENCE:
+            game.hint_audience_used = True
+        elif kind == EVENT_TAKE_MONEY:
+            game.current_question = None
+    return game
+
+
+def aggregate_events(events, chunk_size=1 << 22):
+    """Сводная статистика по всем играм журнала"""
+    import numpy as np
+
+    levels = int(events['level'].max()) + 1 if len(events) else 0
+    kinds = np.zeros(max(EVENT_NAMES) + 1, np.int64)
+    reached = np.zeros(levels, np.int64)
+    answered = np.zeros(levels, np.int64)
+    correct = np.zeros(levels, np.int64)
+    payouts = {}
+    payout_total = 0
+    won = 0
+
+    for start in range(0, len(events), chunk_size):
+        chunk = events[start:start + chunk_size]
+        kind = chunk['kind']
+        kinds += np.bincount(kind, minlength=kinds.size)
+
+        questions = chunk['level'][kind == EVENT_QUESTION]
+        reached += np.bincount(questions, minlength=levels)
+
+        answers = kind == EVENT_ANSWER
+        answered += np.bincount(chunk['level'][answers], minlength=levels)
+        correct += np.bincount(chunk['level'][answers],
+                               weights=chunk['data'][answers],
+                               minlength=levels).astype(np.int64)
+
+        over = kind == EVENT_GAME_OVER
+        won += int(np.count_nonzero(chunk['answer'][over] == 1))
+        finished = chunk['data'][over | (kind == EVENT_TAKE_MONEY)]
+        payout_total += int(finished.sum(dtype=np.int64))
+        amounts, counts = np.unique(finished, return_counts=True)
+        for amount, count in zip(amounts.tolist(), counts.tolist()):
+            payouts[amount] = payouts.get(amount, 0) + count
+
+    finished_games = int(kinds[EVENT_GAME_OVER] + kinds[EVENT_TAKE_MONEY])
+    return {
+        'events': len(events),
+        'games': int(kinds[EVENT_START]),
+        'finished': finished_games,
+        'won': won,
+        'lost': int(kinds[EVENT_GAME_OVER]) - won,
+        'took_money': int(kinds[EVENT_TAKE_MONEY]),
+        'average_payout': payout_total / finished_games if finished_games else 0.0,
+        'payouts': dict(sorted(payouts.items())),
+        'reached': reached.tolist(),
+        'answer_accuracy': [c / a if a else 0.0
+                            for c, a in zip(correct.tolist(), answered.tolist())],
+        'hints': {name: int(kinds[kind]) for kind, name in EVENT_NAMES.items()
+                  if name.startswith('hint')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Журнал событий игры")
+    parser.add_argument('events')
+    parser.add_argument('--session', type=int,
+                        help="показать события и состояние одной сессии")
+    parser.add_argument('--questions', default='questions.json')
+    args = parser.parse_args()
+
+    events = read_events(args.events)
+    if args.session is None:
+        started = time.perf_counter()
+        stats = aggregate_events(events)
+        elapsed = time.perf_counter() - started
+        for name, value in stats.items():
+            print("{}: {}".format(name, value))
+        print("Обработано за {:.1f} мс".format(elapsed * 1000))
+        return
+
+    from game_logic import GameBank
+
+    for event in events[events['session'] == args.session]:
+        print("{:>12} уровень {:>3} вопрос {:>6} ответ {:>2} данные {}".format(
+            EVENT_NAMES.get(int(event['kind']), event['kind']),
+            event['level'], event['question'], event['answer'], event['data']))
+    game = replay_session(events, args.session,
+                          GameBank.load(args.questions))
+    print("Уровень {}, выигрыш {}, подсказки: 50/50 {}, звонок {}, зал {}".format(
+        game.current_level, game.get_current_prize(), game.hint_5050_used,
+        game.hint_call_used, game.hint_audience_used))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,104 +2,302 @@
 Модуль игровой логики для игры 'Кто хочет стать миллионером'
 """
 
+import array
+import hashlib
 import json
+import os
 import random
+import struct
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+from game_events import (EVENT_ADVANCE, EVENT_ANSWER, EVENT_GAME_OVER,
+                         EVENT_HINT_5050, EVENT_HINT_AUDIENCE, EVENT_HINT_CALL,
+                         EVENT_QUESTION, EVENT_START, EVENT_TAKE_MONEY,
+                         pack_percentages)
+from game_results import (HINT_5050, HINT_AUDIENCE, HINT_CALL, OUTCOME_LOST,
+                          OUTCOME_TOOK_MONEY, OUTCOME_WON)
+from question_cache import load_question_store
+from question_selector import QuestionSelector, SeenQuestions
+
+
+# Параметры подсказок: точность друга и доля зала за правильный ответ
+FRIEND_ACCURACY = 0.8
+AUDIENCE_CORRECT_PERCENT = (40, 60)
+AUDIENCE_MIN_PERCENT = 5
+
+# Неправильные варианты для каждого индекса правильного ответа
+WRONG_INDICES = tuple(
+    tuple(i for i in range(4) if i != correct) for correct in range(4)
+)
+
+# Сохранение партии: magic, версия формата, отпечаток банка, сессия журнала,
+# уровень, флаги, число показанных вопросов; дальше их id и, если нужно,
+# состояние генератора случайных чисел
+SAVE_MAGIC = b'GS'
+SAVE_VERSION = 1
+_SAVE_HEADER = struct.Struct('<2sB8sQHBH')
+# 624 слова состояния Mersenne Twister и позиция, затем gauss_next
+_SAVE_RNG = struct.Struct('<625I?d')
+
+SAVE_HINT_5050 = 1
+SAVE_HINT_CALL = 2
+SAVE_HINT_AUDIENCE = 4
+SAVE_HAS_QUESTION = 8
+SAVE_HAS_RNG = 16
 
 
 class Question:
     """Класс для представления вопроса"""
 
+    __slots__ = ('id', 'level', 'text', 'options', 'correct', 'difficulty')
+
     def __init__(self, question_id, level, text, options, correct, difficulty):
         self.id = question_id
         self.level = level
         self.text = text
-        self.options = options
+        # Варианты ответов повторяются между вопросами ("1939", "7"),
+        # поэтому храним их интернированными в неизменяемом кортеже
+        self.options = tuple(sys.intern(option) for option in options)
         self.correct = correct
-        self.difficulty = difficulty
+        self.difficulty = sys.intern(difficulty)
 
     def is_correct(self, answer_index):
         """Проверка правильности ответа"""
         return answer_index == self.correct
 
 
+class GameBank:
+    """Неизменяемые данные игры, общие для всех сессий: вопросы и призы"""
+
+    __slots__ = ('questions', 'prize_ladder', 'prize_amounts',
+                 'safe_haven_amounts', 'selector', '_version')
+
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, questions):
+        setattr_ = object.__setattr__
+        setattr_(self, 'questions', questions)
+        setattr_(self, 'prize_ladder', tuple(
+            MappingProxyType(dict(prize)) for prize in questions.prize_ladder
+        ))
+        setattr_(self, 'prize_amounts', tuple(
+            prize['amount'] for prize in self.prize_ladder
+        ))
+        setattr_(self, 'safe_haven_amounts', tuple(
+            prize['amount'] for prize in self.prize_ladder
+            if prize['safe_haven']
+        ))
+        setattr_(self, 'selector', QuestionSelector(questions))
+        setattr_(self, '_version', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameBank нельзя изменять")
+
+    @property
+    def version(self):
+        """Отпечаток банка (8 байт) по id вопросов и суммам призов
+
+        Считается при первом обращении: сохранения игр проверяют по нему,
+        что id вопросов значат то же самое. Отпечаток id скомпилированный
+        банк берет из кэша, не читая столбец id.
+        """
+        if self._version is None:
+            digest = hashlib.blake2b(digest_size=8)
+            digest.update(self.questions.ids_digest)
+            digest.update(array.array('q', self.prize_amounts).tobytes())
+            object.__setattr__(self, '_version', digest.digest())
+        return self._version
+
+    @classmethod
+    def load(cls, questions_file):
+        """Общий банк для файла: разбирается один раз на процесс"""
+        path = os.path.abspath(questions_file)
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+
+        with cls._cache_lock:
+            cached = cls._cache.get(path)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            bank = cls(load_question_store(questions_file))
+            cls._cache[path] = (key, bank)
+            return bank
+
+
 class GameState:
     """Класс для управления состоянием игры"""
 
-    def __init__(self, questions_file='questions.json'):
+    # Только состояние сессии; вопросы и призы живут в общем GameBank
+    __slots__ = ('questions_file', 'player_id', 'bank', 'history', 'seen',
+                 'seed', '_rng',
+                 'audience', 'events', 'session_id', 'drawn',
+                 'results', 'started_at',
+                 'decks', 'deck',
+                 'current_level', 'current_question',
+                 'hint_5050_used', 'hint_call_used', 'hint_audience_used')
+
+    def __init__(self, questions_file='questions.json', player_id=None,
+                 bank=None, seed=None, audience=None, events=None,
+                 decks=None, results=None, history=None):
         self.questions_file = questions_file
-        self.questions = []
-        self.prize_ladder = []
+        self.player_id = player_id
+        self.bank = bank
+        # История игроков сервера (PlayerHistory): с ней игрок не видит
+        # повторов и в следующих сессиях, без нее — только в этой
+        self.history = history
+        self.seen = None
+        # Свой генератор у каждой сессии: игру можно повторить по seed,
+        # и потоки не делят состояние модуля random
+        self.seed = seed
+        self._rng = None
+        # Источник голосов настоящего зала (AudienceVotes) или None
+        self.audience = audience
+        # Журнал событий (EventLog) и номер сессии текущей игры в нем
+        self.events = events
+        self.session_id = None
+        # Журнал итогов игр (ResultLog) и начало текущей игры (monotonic);
+        # None — итог игры уже записан
+        self.results = results
+        self.started_at = None
+        # id вопросов, показанных в текущей игре
+        self.drawn = []
+        # Запас готовых колод (DeckPool) и колода текущей игры: с колодой
+        # вопросы не выбираются на каждом уровне, а история игрока
+        # заменяется общей историей колод. Если запас пуст, колоды нет
+        self.decks = decks
+        self.deck = None
         self.current_level = 0
         self.current_question = None
-        self.safe_haven_amounts = []
 
         # Подсказки
         self.hint_5050_used = False
         self.hint_call_used = False
         self.hint_audience_used = False
 
-        self.load_questions()
+        if self.bank is None:
+            self.load_questions()
+
+        if self.player_id is None or self.history is None:
+            self.seen = SeenQuestions()
+        else:
+            self.seen = self.history.seen_for(self.player_id)
+
+    @property
+    def rng(self):
+        """Генератор сессии, создается при первом обращении"""
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        return self._rng
+
+    @property
+    def questions(self):
+        return self.bank.questions
+
+    @property
+    def prize_ladder(self):
+        return self.bank.prize_ladder
+
+    @property
+    def safe_haven_amounts(self):
+        return self.bank.safe_haven_amounts
+
+    @property
+    def selector(self):
+        return self.bank.selector
 
     def load_questions(self):
-        """Загрузка вопросов из JSON файла"""
+        """Загрузка вопросов из JSON файла через общий банк"""
         try:
-            with open(self.questions_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            for q_data in data['questions']:
-                question = Question(
-                    q_data['id'],
-                    q_data['level'],
-                    q_data['text'],
-                    q_data['options'],
-                    q_data['correct'],
-                    q_data['difficulty']
-                )
-                self.questions.append(question)
-
-            self.prize_ladder = data['prize_ladder']
-
-            self.safe_haven_amounts = [
-                prize['amount'] for prize in self.prize_ladder 
-                if prize['safe_haven']
-            ]
-
+            self.bank = GameBank.load(self.questions_file)
         except FileNotFoundError:
             raise Exception(f"Файл {self.questions_file} не найден!")
         except json.JSONDecodeError:
             raise Exception(f"Ошибка чтения JSON из файла {self.questions_file}!")
 
+    def log_event(self, kind, answer=-1, data=0):
+        """Записать переход в журнал событий, если он подключен"""
+        if self.events is not None:
+            question = self.current_question
+            self.events.record(self.session_id, kind, self.current_level,
+                               question.id if question else 0, answer, data)
+
+    def record_result(self, outcome, prize):
+        """Записать итог игры в журнал итогов, если он подключен, один раз"""
+        if self.results is None or self.started_at is None:
+            return
+        hints = (self.hint_5050_used * HINT_5050
+                 | self.hint_call_used * HINT_CALL
+                 | self.hint_audience_used * HINT_AUDIENCE)
+        self.results.record(self.player_id, outcome, self.current_level, prize,
+                            self.get_safe_haven_prize(), hints,
+                            time.monotonic() - self.started_at)
+        self.started_at = None
+
     def start_new_game(self):
         """Начать новую игру"""
         self.current_level = 0
+        self.current_question = None
+        self.drawn = []
+        self.deck = self.decks.pop() if self.decks is not None else None
         self.hint_5050_used = False
         self.hint_call_used = False
         self.hint_audience_used = False
+        if self.events is not None:
+            self.session_id = self.events.new_session()
+        self.started_at = time.monotonic()
+        self.log_event(EVENT_START)
         self.load_next_question()
 
     def load_next_question(self):
-        """Загрузить следующий вопрос"""
-        if self.current_level < len(self.questions):
-            self.current_question = self.questions[self.current_level]
-            return True
+        """Загрузить случайный непоказанный вопрос текущего уровня"""
+        if self.current_level < len(self.prize_ladder):
+            if self.deck is not None:
+                question = self.deck[self.current_level] \
+                    if self.current_level < len(self.deck) else None
+            else:
+                level = self.prize_ladder[self.current_level]['level']
+                position = self.selector.draw(level, self.seen, rng=self.rng)
+                question = self.questions[position] \
+                    if position is not None else None
+            if question is not None:
+                self.current_question = question
+                self.drawn.append(self.current_question.id)
+                if self.audience is not None:
+                    self.audience.start_round()
+                self.log_event(EVENT_QUESTION)
+                return True
         return False
 
     def check_answer(self, answer_index):
         """Проверить ответ игрока"""
-        if self.current_question:
-            return self.current_question.is_correct(answer_index)
-        return False
+        if not self.current_question:
+            return False
+
+        correct = self.current_question.is_correct(answer_index)
+        self.log_event(EVENT_ANSWER, answer_index, int(correct))
+        if not correct:
+            self.log_event(EVENT_GAME_OVER, 0, self.get_safe_haven_prize())
+            self.record_result(OUTCOME_LOST, self.get_safe_haven_prize())
+        return correct
 
     def advance_level(self):
         """Перейти на следующий уровень"""
         self.current_level += 1
+        self.log_event(EVENT_ADVANCE)
+        if self.is_game_won():
+            self.log_event(EVENT_GAME_OVER, 1, self.get_current_prize())
+            self.record_result(OUTCOME_WON, self.get_current_prize())
         return self.load_next_question()
 
     def get_current_prize(self):
         """Получить текущую сумму выигрыша"""
         if self.current_level == 0:
             return 0
-        return self.prize_ladder[self.current_level - 1]['amount']
+        return self.bank.prize_amounts[self.current_level - 1]
 
     def get_safe_haven_prize(self):
         """Получить последнюю несгораемую сумму"""
@@ -114,7 +312,81 @@ class GameState:
 
     def is_game_won(self):
         """Проверка, выиграна ли игра"""
-        return self.current_level >= len(self.questions)
+        return self.current_level >= len(self.prize_ladder)
+
+    def take_money(self):
+        """Забрать текущий выигрыш и закончить игру"""
+        prize = self.get_current_prize()
+        self.log_event(EVENT_TAKE_MONEY, data=prize)
+        self.record_result(OUTCOME_TOOK_MONEY, prize)
+        self.current_question = None
+        return prize
+
+    def to_bytes(self, include_rng=False):
+        """Сохранить партию в компактные байты (без pickle)
+
+        Хранятся отпечаток банка, уровень, подсказки и id показанных
+        вопросов; include_rng добавляет состояние генератора сессии.
+        """
+        flags = (self.hint_5050_used * SAVE_HINT_5050
+                 | self.hint_call_used * SAVE_HINT_CALL
+                 | self.hint_audience_used * SAVE_HINT_AUDIENCE
+                 | (self.current_question is not None) * SAVE_HAS_QUESTION
+                 | include_rng * SAVE_HAS_RNG)
+        data = _SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, self.bank.version,
+                                 self.session_id or 0, self.current_level,
+                                 flags, len(self.drawn))
+        data += struct.pack('<%dq' % len(self.drawn), *self.drawn)
+        if include_rng:
+            _, state, gauss_next = self.rng.getstate()
+            data += _SAVE_RNG.pack(*state, gauss_next is not None,
+                                   gauss_next or 0.0)
+        return data
+
+    @classmethod
+    def from_bytes(cls, data, bank, player_id=None, audience=None,
+                   events=None, results=None, history=None):
+        """Восстановить партию из to_bytes поверх общего банка"""
+        try:
+            (magic, version, bank_version, session_id, level, flags,
+             count) = _SAVE_HEADER.unpack_from(data)
+            drawn = struct.unpack_from('<%dq' % count, data, _SAVE_HEADER.size)
+            rng_state = None
+            if flags & SAVE_HAS_RNG:
+                words = _SAVE_RNG.unpack_from(data,
+                                              _SAVE_HEADER.size + 8 * count)
+                rng_state = (3, words[:625], words[626] if words[625] else None)
+        except struct.error:
+            raise ValueError("Сохранение игры повреждено!")
+        if magic != SAVE_MAGIC or version != SAVE_VERSION:
+            raise ValueError("Неизвестный формат сохранения игры!")
+        if bank_version != bank.version:
+            raise ValueError("Сохранение сделано для другого банка вопросов!")
+        # Отпечаток совпал, но поля могли изменить: уровень в пределах
+        # лестницы, не больше вопроса на уровень, все вопросы есть в банке
+        levels = len(bank.prize_ladder)
+        if level > levels or (flags & SAVE_HAS_QUESTION and level >= levels) \
+                or count > level + 1 or any(
+                    bank.questions.find_position(question_id) is None
+                    for question_id in drawn):
+            raise ValueError("Сохранение игры повреждено!")
+
+        game = cls(bank=bank, player_id=player_id, audience=audience,
+                   events=events, results=results, history=history)
+        game.session_id = session_id or None
+        game.current_level = level
+        game.drawn = list(drawn)
+        game.hint_5050_used = bool(flags & SAVE_HINT_5050)
+        game.hint_call_used = bool(flags & SAVE_HINT_CALL)
+        game.hint_audience_used = bool(flags & SAVE_HINT_AUDIENCE)
+        if flags & SAVE_HAS_QUESTION and drawn:
+            game.current_question = bank.questions.get_by_id(drawn[-1])
+            # Длительность продолженной игры считается с момента продолжения
+            game.started_at = time.monotonic()
+        if rng_state is not None:
+            game._rng = random.Random(0)
+            game._rng.setstate(rng_state)
+        return game
 
     def use_hint_5050(self):
         """Использовать подсказку 50/50"""
@@ -123,10 +395,10 @@ class GameState:
 
         self.hint_5050_used = True
         correct_index = self.current_question.correct
-        wrong_indices = [i for i in range(4) if i != correct_index]
-        keep_wrong = random.choice(wrong_indices)
-        remaining = sorted([correct_index, keep_wrong])
-        return remaining
+        keep_wrong = self.rng.choice(WRONG_INDICES[correct_index])
+        self.log_event(EVENT_HINT_5050,
+                       data=1 << correct_index | 1 << keep_wrong)
+        return sorted((correct_index, keep_wrong))
 
     def use_hint_call_friend(self):
         """Использовать подсказку 'Звонок другу'"""
@@ -134,12 +406,14 @@ class GameState:
             return None
 
         self.hint_call_used = True
+        correct_index = self.current_question.correct
 
-        if random.random() < 0.8:
-            return self.current_question.correct
+        if self.rng.random() < FRIEND_ACCURACY:
+            answer = correct_index
         else:
-            wrong_indices = [i for i in range(4) if i != self.current_question.correct]
-            return random.choice(wrong_indices)
+            answer = self.rng.choice(WRONG_INDICES[correct_index])
+        self.log_event(EVENT_HINT_CALL, answer)
+        return answer
 
     def use_hint_audience(self):
         """Использовать подсказку 'Помощь зала'"""
@@ -147,21 +421,29 @@ class GameState:
             return None
 
         self.hint_audience_used = True
-        correct_index = self.current_question.correct
-        percentages = {}
+        if self.audience is not None:
+            percentages = self.audience.percentages()
+            if percentages is not None:
+                self.log_event(EVENT_HINT_AUDIENCE,
+                               data=pack_percentages(percentages))
+                return percentages
 
-        correct_percent = random.randint(40, 60)
-        percentages[correct_index] = correct_percent
+        correct_index = self.current_question.correct
+        randint = self.rng.randint
 
+        correct_percent = randint(*AUDIENCE_CORRECT_PERCENT)
         remaining = 100 - correct_percent
-        wrong_indices = [i for i in range(4) if i != correct_index]
-
-        for i, idx in enumerate(wrong_indices):
-            if i == len(wrong_indices) - 1:
-                percentages[idx] = remaining
-            else:
-                percent = random.randint(5, remaining - (len(wrong_indices) - i - 1) * 5)
-                percentages[idx] = percent
-                remaining -= percent
-
+        # Каждому неправильному варианту остается хотя бы AUDIENCE_MIN_PERCENT
+        first = randint(AUDIENCE_MIN_PERCENT, remaining - 2 * AUDIENCE_MIN_PERCENT)
+        second = randint(AUDIENCE_MIN_PERCENT,
+                         remaining - first - AUDIENCE_MIN_PERCENT)
+
+        wrong = WRONG_INDICES[correct_index]
+        percentages = {
+            correct_index: correct_percent,
+            wrong[0]: first,
+            wrong[1]: second,
+            wrong[2]: remaining - first - second,
+        }
+        self.log_event(EVENT_HINT_AUDIENCE, data=pack_percentages(percentages))
         return percentages
@@ -0,0 +1,479 @@
+"""
+Итоги законченных игр: одна запись фиксированной длины на игру в журнале
+из сегментов, которые только дописываются, и сводка в SQLite
+
+Записи копятся в буфере и сбрасываются на диск пачками с одним fsync,
+как в game_events. Каждый процесс пишет свой сегмент; сегмент
+закрывается по числу записей или по возрасту и дальше не меняется.
+Свертка (compact) складывает закрытые сегменты в таблицы SQLite —
+распределение выигрышей и итоги игроков — и удаляет их, поэтому
+таблица лидеров и распределение выигрышей читаются из небольших
+таблиц с индексами, сколько бы игр ни было сыграно.
+
+Свертка и отчет: python game_results.py games.results [--every 60] [--top 10]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+
+RESULTS_MAGIC = b'GRS1'
+RESULTS_VERSION = 2
+
+# magic, версия, размер записи
+_HEADER = struct.Struct('<4sHH8x')
+# игрок, выигрыш, несгораемая сумма, время окончания (unix, с),
+# длительность (мс), уровень, исход, подсказки. Суммы и уровень с запасом:
+# лестница может быть длиннее 255 ступеней, а призы — больше 2**32
+_RESULT = struct.Struct('<qqqIIHBB4x')
+
+# Исход игры
+OUTCOME_LOST = 0
+OUTCOME_WON = 1
+OUTCOME_TOOK_MONEY = 2
+
+OUTCOME_NAMES = {
+    OUTCOME_LOST: 'lost',
+    OUTCOME_WON: 'won',
+    OUTCOME_TOOK_MONEY: 'took_money',
+}
+
+# Биты использованных подсказок
+HINT_5050 = 1
+HINT_CALL = 2
+HINT_AUDIENCE = 4
+
+# Сегмент закрывается после стольких записей или секунд с первой записи
+SEGMENT_RECORDS = 1 << 20
+SEGMENT_SECONDS = 60
+# Открытый сегмент, не менявшийся столько секунд, остался от упавшего
+# процесса: живой процесс закрывает свой раньше
+STALE_SECONDS = 10 * SEGMENT_SECONDS
+
+ACTIVE_SUFFIX = '.active'
+SEGMENT_SUFFIX = '.seg'
+NAMES_SUFFIX = '.names'
+SUMMARY_FILE = 'summary.sqlite'
+
+
+def player_key(player_id):
+    """Ключ игрока в записи: 0 для игры без игрока, иначе 8 байт хэша"""
+    if player_id is None:
+        return 0
+    digest = hashlib.blake2b(str(player_id).encode('utf-8'), digest_size=8)
+    return int.from_bytes(digest.digest(), 'little', signed=True) or 1
+
+
+class ResultLog:
+    """Журнал итогов игр с групповой записью на диск
+
+    Запись сбрасывается, когда в буфере набралось batch_size итогов
+    или прошло sync_interval секунд, одним write и одним fsync. Имена
+    игроков пишутся рядом с сегментом при первой игре игрока в этом
+    сегменте, поэтому каждый сегмент сворачивается сам по себе.
+    Итог, который не помещается в запись, пропускается и учитывается
+    в dropped.
+    """
+
+    def __init__(self, directory, batch_size=4096, sync_interval=0.1,
+                 segment_records=SEGMENT_RECORDS,
+                 segment_seconds=SEGMENT_SECONDS):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.segment_records = segment_records
+        self.segment_seconds = segment_seconds
+        self.buffer = bytearray()
+        self.count = 0
+        self.dropped = 0
+        # Игроки из буфера {ключ: id} и игроки, чьи имена уже есть
+        # в текущем сегменте (меняется только под _io_lock)
+        self._pending = {}
+        self._players = set()
+        self._file = None
+        self._names_file = None
+        self._segment = None
+        self._segment_count = 0
+        self._segment_opened = 0.0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        os.makedirs(directory, exist_ok=True)
+        seal_stale_segments(directory)
+
+        self._flusher = threading.Thread(target=self._flush_periodically,
+                                         daemon=True)
+        self._flusher.start()
+
+    def record(self, player_id, outcome, level, prize, safe_haven, hints,
+               duration):
+        """Добавить итог игры в буфер; duration — в секундах"""
+        player = player_key(player_id)
+        try:
+            result = _RESULT.pack(
+                player, int(prize), int(safe_haven), int(time.time()),
+                min(int(duration * 1000), 0xFFFFFFFF), level, outcome, hints)
+        except struct.error:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.buffer += result
+            if player and player not in self._pending:
+                self._pending[player] = player_id
+            self.count += 1
+            full = len(self.buffer) >= self.batch_size * _RESULT.size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Записать накопленные итоги и дождаться fsync"""
+        with self._io_lock:
+            with self._lock:
+                data, self.buffer = self.buffer, bytearray()
+                pending, self._pending = self._pending, {}
+            if data:
+                if self._file is None:
+                    self._open_segment()
+                names = [json.dumps({'player': player, 'name': str(player_id)},
+                                    ensure_ascii=False) + '\n'
+                         for player, player_id in pending.items()
+                         if player not in self._players]
+                self._players.update(pending)
+                # Имена раньше записей: у сегмента не бывает записи без имени
+                if names:
+                    self._names_file.write(''.join(names).encode('utf-8'))
+                    self._names_file.flush()
+                    os.fsync(self._names_file.fileno())
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._segment_count += len(data) // _RESULT.size
+            if self._file is not None and (
+                    self._segment_count >= self.segment_records or
+                    time.monotonic() - self._segment_opened >= self.segment_seconds):
+                self._seal()
+
+    def _open_segment(self):
+        # Имя по времени создания: сегменты сворачиваются по порядку
+        self._segment = os.path.join(self.directory, '{:019d}-{}'.format(
+            time.time_ns(), os.getpid()))
+        self._file = open(self._segment + ACTIVE_SUFFIX, 'wb')
+        self._file.write(_HEADER.pack(RESULTS_MAGIC, RESULTS_VERSION,
+                                      _RESULT.size))
+        self._names_file = open(self._segment + NAMES_SUFFIX, 'wb')
+        self._segment_count = 0
+        self._segment_opened = time.monotonic()
+
+    def _seal(self):
+        """Закрыть сегмент: после переименования его можно сворачивать"""
+        self._file.close()
+        self._names_file.close()
+        os.replace(self._segment + ACTIVE_SUFFIX, self._segment + SEGMENT_SUFFIX)
+        self._file = self._names_file = self._segment = None
+        self._players = set()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.sync_interval):
+            self.flush()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._seal()
+
+
+def seal_stale_segments(directory, older_than=STALE_SECONDS):
+    """Закрыть открытые сегменты упавших процессов"""
+    deadline = time.time() - older_than
+    for path in glob.glob(os.path.join(directory, '*' + ACTIVE_SUFFIX)):
+        try:
+            if os.path.getmtime(path) < deadline:
+                os.replace(path, path[:-len(ACTIVE_SUFFIX)] + SEGMENT_SUFFIX)
+        except OSError:
+            pass
+
+
+def result_dtype():
+    """Тип NumPy для записи итога"""
+    import numpy as np
+
+    return np.dtype({
+        'names': ['player', 'prize', 'safe_haven', 'time', 'duration',
+                  'level', 'outcome', 'hints'],
+        'formats': ['<i8', '<i8', '<i8', '<u4', '<u4', '<u2', 'u1', 'u1'],
+        'offsets': [0, 8, 16, 24, 28, 32, 34, 35],
+        'itemsize': _RESULT.size,
+    })
+
+
+def read_segment(path):
+    """Все итоги сегмента как массив NumPy; недописанный хвост отбрасывается"""
+    import numpy as np
+
+    with open(path, 'rb') as f:
+        magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != RESULTS_MAGIC or version != RESULTS_VERSION or \
+                record_size != _RESULT.size:
+            raise Exception(f"Файл {path} не является журналом итогов!")
+        data = f.read()
+    count = len(data) // _RESULT.size
+    return np.frombuffer(data, result_dtype(), count)
+
+
+def _read_names(path):
+    names = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Строка, недописанная при сбое
+                    continue
+                names[entry['player']] = entry['name']
+    except FileNotFoundError:
+        pass
+    return names
+
+
+def _runs(keys):
+    """Начала отрезков одинаковых значений в отсортированных массивах keys"""
+    import numpy as np
+
+    count = len(keys[0])
+    change = np.zeros(count, bool)
+    change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    records INTEGER NOT NULL,
+    compacted INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payouts (
+    outcome INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    hints INTEGER NOT NULL,
+    prize INTEGER NOT NULL,
+    safe_haven INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    PRIMARY KEY (outcome, level, hints, prize, safe_haven)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS players (
+    player INTEGER PRIMARY KEY,
+    name TEXT,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    total_prize INTEGER NOT NULL,
+    best_prize INTEGER NOT NULL,
+    best_level INTEGER NOT NULL,
+    last_finished INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_total ON players (total_prize DESC);
+CREATE INDEX IF NOT EXISTS players_best ON players (best_prize DESC, best_level DESC);
+"""
+
+_ADD_PAYOUTS = """
+INSERT INTO payouts VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT DO UPDATE SET games = games + excluded.games,
+                          duration_ms = duration_ms + excluded.duration_ms
+"""
+
+_ADD_PLAYERS = """
+INSERT INTO players VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT DO UPDATE SET
+    name = coalesce(excluded.name, name),
+    games = games + excluded.games,
+    wins = wins + excluded.wins,
+    total_prize = total_prize + excluded.total_prize,
+    best_prize = max(best_prize, excluded.best_prize),
+    best_level = max(best_level, excluded.best_level),
+    last_finished = max(last_finished, excluded.last_finished)
+"""
+
+
+class ResultSummary:
+    """Сводка итогов в SQLite: распределение выигрышей и итоги игроков
+
+    Лежит в каталоге журнала (summary.sqlite). Свертка сегмента и отметка
+    о ней в таблице segments — одна транзакция: сегмент, удаление
+    которого прервал сбой, второй раз не учитывается.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, SUMMARY_FILE))
+        self.connection.executescript(_SCHEMA)
+
+    def compact(self, stale_seconds=STALE_SECONDS):
+        """Свернуть закрытые сегменты в сводку, вернуть число итогов"""
+        seal_stale_segments(self.directory, stale_seconds)
+        connection = self.connection
+        done = {name for name, in connection.execute("SELECT name FROM segments")}
+        total = 0
+        for path in sorted(glob.glob(os.path.join(self.directory,
+                                                  '*' + SEGMENT_SUFFIX))):
+            base = path[:-len(SEGMENT_SUFFIX)]
+            name = os.path.basename(base)
+            if name not in done:
+                results = read_segment(path)
+                with connection:
+                    self._add(results, _read_names(base + NAMES_SUFFIX))
+                    connection.execute("INSERT INTO segments VALUES (?, ?, ?)",
+                                       (name, len(results), int(time.time())))
+                total += len(results)
+            os.remove(path)
+            if os.path.exists(base + NAMES_SUFFIX):
+                os.remove(base + NAMES_SUFFIX)
+        return total
+
+    def _add(self, results, names):
+        """Сложить итоги сегмента с таблицами (внутри транзакции)"""
+        import numpy as np
+
+        if not len(results):
+            return
+        # Распределение: итоги с одинаковыми исходом, уровнем, подсказками
+        # и суммами складываются в одну строку
+        order = np.lexsort((results['safe_haven'], results['prize'],
+                            results['hints'], results['level'],
+                            results['outcome']))
+        # Столбцы по отдельности: выборка целых записей в разы медленнее
+        columns = [results[column][order] for column in
+                   ('outcome', 'level', 'hints', 'prize', 'safe_haven')]
+        starts = _runs(columns)
+        games = np.diff(np.append(starts, len(order)))
+        durations = np.add.reduceat(
+            results['duration'][order].astype(np.int64), starts)
+        self.connection.executemany(_ADD_PAYOUTS, zip(
+            *(column[starts].tolist() for column in columns),
+            games.tolist(), durations.tolist()))
+
+        # Итоги игроков: игры, победы, сумма и лучший выигрыш
+        known = np.flatnonzero(results['player'] != 0)
+        if not len(known):
+            return
+        order = known[np.argsort(results['player'][known])]
+        player = results['player'][order]
+        prize = results['prize'][order]
+        starts = _runs([player])
+        players = player[starts].tolist()
+        self.connection.executemany(_ADD_PLAYERS, zip(
+            players,
+            [names.get(key) for key in players],
+            np.diff(np.append(starts, len(order))).tolist(),
+            np.add.reduceat((results['outcome'][order] == OUTCOME_WON)
+                            .astype(np.int64), starts).tolist(),
+            np.add.reduceat(prize, starts).tolist(),
+            np.maximum.reduceat(prize, starts).tolist(),
+            np.maximum.reduceat(results['level'][order], starts).tolist(),
+            np.maximum.reduceat(results['time'][order], starts).tolist()))
+
+    def leaderboard(self, limit=10, by='total'):
+        """Лучшие игроки по сумме выигрышей (total) или лучшей игре (best)"""
+        order = {'total': "total_prize DESC",
+                 'best': "best_prize DESC, best_level DESC"}[by]
+        cursor = self.connection.execute(
+            "SELECT name, games, wins, total_prize, best_prize, best_level "
+            "FROM players ORDER BY {} LIMIT ?".format(order), (limit,))
+        return [dict(zip(('name', 'games', 'wins', 'total_prize', 'best_prize',
+                          'best_level'), row)) for row in cursor]
+
+    def payout_distribution(self, outcome=None):
+        """Число игр на каждую сумму выигрыша, по возрастанию суммы"""
+        query = "SELECT prize, sum(games) FROM payouts"
+        parameters = ()
+        if outcome is not None:
+            query += " WHERE outcome = ?"
+            parameters = (outcome,)
+        return dict(self.connection.execute(
+            query + " GROUP BY prize ORDER BY prize", parameters))
+
+    def totals(self):
+        """Игры по исходам, средний выигрыш и длительность, подсказки"""
+        outcomes = dict.fromkeys(OUTCOME_NAMES.values(), 0)
+        games = prize_total = duration_total = 0
+        hints = {'hint_5050': 0, 'hint_call': 0, 'hint_audience': 0}
+        for outcome, hint_mask, count, prizes, durations in self.connection.execute(
+                "SELECT outcome, hints, sum(games), sum(prize * games), "
+                "sum(duration_ms) FROM payouts GROUP BY outcome, hints"):
+            outcomes[OUTCOME_NAMES.get(outcome, str(outcome))] += count
+            games += count
+            prize_total += prizes
+            duration_total += durations
+            for bit, name in ((HINT_5050, 'hint_5050'), (HINT_CALL, 'hint_call'),
+                              (HINT_AUDIENCE, 'hint_audience')):
+                if hint_mask & bit:
+                    hints[name] += count
+        return {
+            'games': games,
+            **outcomes,
+            'average_payout': prize_total / games if games else 0.0,
+            'average_duration': duration_total / 1000 / games if games else 0.0,
+            'hints': hints,
+        }
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Итоги игр: свертка и отчет")
+    parser.add_argument('directory', help="каталог журнала итогов")
+    parser.add_argument('--every', type=float,
+                        help="сворачивать каждые N секунд, пока не прервут")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--by', choices=('total', 'best'), default='total')
+    args = parser.parse_args()
+
+    summary = ResultSummary(args.directory)
+    try:
+        while True:
+            started = time.perf_counter()
+            count = summary.compact()
+            print("Свернуто итогов: {} за {:.2f} с".format(
+                count, time.perf_counter() - started), flush=True)
+            if args.every is None:
+                break
+            time.sleep(args.every)
+    except KeyboardInterrupt:
+        pass
+
+    started = time.perf_counter()
+    totals = summary.totals()
+    leaders = summary.leaderboard(args.top, args.by)
+    payouts = summary.payout_distribution()
+    elapsed = time.perf_counter() - started
+    for name, value in totals.items():
+        print("{}: {}".format(name, value))
+    print("Выигрыши: {}".format(payouts))
+    for place, leader in enumerate(leaders, 1):
+        print("{:>3}. {:<20} игр {:>6}  побед {:>5}  сумма {:>12}  лучшая {:>9}".format(
+            place, leader['name'] or '?', leader['games'], leader['wins'],
+            leader['total_prize'], leader['best_prize']))
+    print("Запросы за {:.1f} мс".format(elapsed * 1000))
+    summary.close()
+
+
+if __name__ == "__main__":
+    main()
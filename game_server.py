@@ -0,0 +1,265 @@
+"""
+Асинхронный сервер игры 'Кто хочет стать миллионером' для многих клиентов
+Протокол: одна JSON-строка на запрос и одна на ответ, по TCP или Unix-сокету
+
+Запросы:
+    {"op": "start", "player": "alice", "seed": 42}  (поля необязательны;
+        без них игра берет готовую колоду вопросов, если включен --decks)
+    {"op": "answer", "session": 1, "answer": 2}
+    {"op": "take_money", "session": 1}
+    {"op": "hint", "session": 1, "hint": "5050" | "call" | "audience"}
+    {"op": "suspend", "session": 1}  -> {"state": "<base64>"}, сессия закрывается
+    {"op": "resume", "state": "<base64>"}  -> новая сессия, в том числе
+        на другом процессе сервера с тем же банком вопросов
+Поле "id" из запроса, если оно есть, возвращается в ответе без изменений.
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+
+from game_events import EventLog
+from game_results import ResultLog
+from game_logic import GameBank, GameState
+from question_decks import DeckPool
+from question_selector import PlayerHistory
+
+
+class GameServer:
+    """Сессии GameState поверх одного общего банка вопросов"""
+
+    def __init__(self, questions_file='questions.json', events=None,
+                 session_ids=None, decks=None, results=None):
+        self.bank = GameBank.load(questions_file)
+        # Журнал событий всех игр (EventLog) или None
+        self.events = events
+        # Журнал итогов законченных игр (ResultLog) или None
+        self.results = results
+        # Запас готовых колод (DeckPool) для игр без игрока и seed или None
+        self.decks = decks
+        self.sessions = {}
+        # Показанные вопросы игроков этого сервера; банк их не хранит
+        self.history = PlayerHistory()
+        # Процессы game_cluster выдают номера со своим шагом, без пересечений
+        self.session_ids = session_ids or itertools.count(1)
+        self.handlers = {
+            'start': self.op_start,
+            'answer': self.op_answer,
+            'take_money': self.op_take_money,
+            'hint': self.op_hint,
+            'suspend': self.op_suspend,
+            'resume': self.op_resume,
+        }
+
+    def question_payload(self, game):
+        """Текущий вопрос без правильного ответа"""
+        question = game.current_question
+        return {
+            'level': game.current_level + 1,
+            'text': question.text,
+            'options': list(question.options),
+            'prize': self.bank.prize_amounts[game.current_level],
+        }
+
+    def finish(self, session_id, owned, prize, reason):
+        """Закрыть сессию и вернуть итог игры"""
+        self.sessions.pop(session_id, None)
+        owned.discard(session_id)
+        return {'finished': True, 'reason': reason, 'prize': prize}
+
+    def get_session(self, request, owned):
+        """Сессия из запроса, если она принадлежит этому подключению"""
+        session_id = request.get('session')
+        game = self.sessions.get(session_id) if session_id in owned else None
+        if game is None:
+            raise KeyError("Нет сессии {}".format(session_id))
+        return session_id, game
+
+    def add_session(self, game, owned):
+        # Сессия регистрируется, только когда ответ для нее уже готов
+        payload = self.question_payload(game)
+        session_id = next(self.session_ids)
+        self.sessions[session_id] = game
+        owned.add(session_id)
+        return {'session': session_id, 'question': payload}
+
+    def op_start(self, request, owned):
+        player_id = request.get('player')
+        seed = request.get('seed')
+        # У игрока своя история вопросов, а игра с seed должна повторяться,
+        # поэтому колоды только для анонимных игр
+        decks = self.decks if player_id is None and seed is None else None
+        game = GameState(bank=self.bank, player_id=player_id, seed=seed,
+                         events=self.events, decks=decks,
+                         results=self.results, history=self.history)
+        game.start_new_game()
+        return self.add_session(game, owned)
+
+    def op_suspend(self, request, owned):
+        session_id, game = self.get_session(request, owned)
+        self.sessions.pop(session_id, None)
+        owned.discard(session_id)
+        state = game.to_bytes(include_rng=True)
+        return {'state': base64.b64encode(state).decode('ascii')}
+
+    def op_resume(self, request, owned):
+        state = base64.b64decode(request['state'], validate=True)
+        try:
+            game = GameState.from_bytes(state, self.bank,
+                                        player_id=request.get('player'),
+                                        events=self.events,
+                                        results=self.results,
+                                        history=self.history)
+        except Exception as e:
+            raise ValueError(str(e))
+        if game.current_question is None:
+            raise ValueError("Сохраненная игра уже закончена")
+        return self.add_session(game, owned)
+
+    def op_answer(self, request, owned):
+        session_id, game = self.get_session(request, owned)
+        answer = request['answer']
+        if type(answer) is not int or not 0 <= answer <= 3:
+            raise ValueError("Ответ должен быть числом от 0 до 3")
+
+        if not game.check_answer(answer):
+            correct = game.current_question.correct
+            result = self.finish(session_id, owned, game.get_safe_haven_prize(),
+                                 'wrong')
+            result.update(correct=False, correct_answer=correct)
+            return result
+
+        if not game.advance_level() or game.is_game_won():
+            result = self.finish(session_id, owned, self.bank.prize_amounts[-1],
+                                 'won')
+        else:
+            result = {'finished': False, 'question': self.question_payload(game)}
+        result['correct'] = True
+        return result
+
+    def op_take_money(self, request, owned):
+        session_id, game = self.get_session(request, owned)
+        return self.finish(session_id, owned, game.take_money(), 'take_money')
+
+    def op_hint(self, request, owned):
+        _, game = self.get_session(request, owned)
+        hint = request.get('hint')
+        if hint == '5050':
+            result = game.use_hint_5050()
+        elif hint == 'call':
+            result = game.use_hint_call_friend()
+        elif hint == 'audience':
+            result = game.use_hint_audience()
+            if result is not None:
+                result = [result[i] for i in range(4)]
+        else:
+            raise ValueError("Неизвестная подсказка {}".format(hint))
+
+        if result is None:
+            raise ValueError("Подсказка уже использована")
+        return {'hint': hint, 'result': result}
+
+    def handle_line(self, line, owned):
+        """Обработать одну строку запроса и вернуть строку ответа"""
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            handler = self.handlers.get(request.get('op'))
+            if handler is None:
+                raise ValueError("Неизвестная операция {}".format(request.get('op')))
+            response = handler(request, owned)
+            response['ok'] = True
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            response = {'ok': False, 'error': str(e)}
+
+        if request_id is not None:
+            response['id'] = request_id
+        return json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n'
+
+    async def handle_client(self, reader, writer):
+        """Цикл обработки запросов одного подключения"""
+        owned = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Строка длиннее лимита StreamReader: дальше поток
+                    # не разобрать, подключение закрывается
+                    writer.write(json.dumps(
+                        {'ok': False, 'error': "Слишком длинный запрос"},
+                        ensure_ascii=False).encode('utf-8') + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                writer.write(self.handle_line(line, owned))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # Незаконченные игры отключившегося клиента больше не нужны
+            for session_id in owned:
+                self.sessions.pop(session_id, None)
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None,
+                    sock=None):
+        """Запустить сервер и обслуживать клиентов до остановки
+
+        sock — уже слушающий сокет (так его делят процессы game_cluster).
+        """
+        if sock is not None:
+            server = await asyncio.start_server(self.handle_client, sock=sock)
+        elif unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+
+        if sock is None:
+            addresses = ", ".join(str(listener.getsockname())
+                                  for listener in server.sockets)
+            print("Сервер игры слушает {}".format(addresses), flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Точка входа сервера"""
+    parser = argparse.ArgumentParser(description="Сервер Millionaire Game")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="путь к Unix-сокету вместо TCP")
+    parser.add_argument('--questions', default='questions.json')
+    parser.add_argument('--events', help="файл журнала событий игр")
+    parser.add_argument('--results', help="каталог журнала итогов игр "
+                                          "(game_results.py)")
+    parser.add_argument('--decks', type=int, default=0,
+                        help="сколько готовых колод вопросов держать в запасе")
+    args = parser.parse_args()
+
+    events = EventLog(args.events) if args.events else None
+    results = ResultLog(args.results) if args.results else None
+    server = GameServer(args.questions, events, results=results)
+    if args.decks:
+        server.decks = DeckPool(server.bank, capacity=args.decks)
+        server.decks.fill()
+        server.decks.start()
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("\nСервер остановлен")
+    finally:
+        if server.decks is not None:
+            server.decks.close()
+        if events is not None:
+            events.close()
+        if results is not None:
+            results.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Пакетный Монте-Карло симулятор игры на NumPy для настройки призовой
+лестницы, несгораемых сумм и подсказок
+
+Правила те же, что в GameState: неверный ответ оставляет несгораемую сумму,
+игрок может забрать текущий выигрыш, подсказки работают с теми же
+вероятностями. Игры одного пакета идут уровень за уровнем сразу векторами.
+
+Запуск: python game_simulator.py --games 1000000 --accuracy 0.95 0.4
+"""
+
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from game_logic import AUDIENCE_CORRECT_PERCENT, FRIEND_ACCURACY
+from hint_batch import HintBatch
+from question_cache import load_question_store
+
+
+HINTS = ('5050', 'call', 'audience')
+
+
+def linear_accuracy(first, last, levels):
+    """Вероятность знать ответ, линейно падающая от первого вопроса к последнему"""
+    return np.linspace(first, last, levels)
+
+
+def ladder_amounts(prize_ladder, safe_haven_levels=None):
+    """Суммы лестницы и несгораемые суммы до каждого вопроса
+
+    safe_haven_levels переопределяет номера несгораемых вопросов.
+    """
+    amounts = np.array([prize['amount'] for prize in prize_ladder], np.int64)
+    if safe_haven_levels is None:
+        safe = [prize['safe_haven'] for prize in prize_ladder]
+    else:
+        safe = [prize['level'] in safe_haven_levels for prize in prize_ladder]
+
+    # Сумма, которую игрок уже выиграл перед вопросом, и его несгораемый
+    # остаток — как get_current_prize и get_safe_haven_prize в GameState
+    current = np.concatenate(([0], amounts[:-1]))
+    safe_amounts = [amount for amount, is_safe in zip(amounts, safe) if is_safe]
+    safe_before = np.array([
+        max([amount for amount in safe_amounts if amount <= prize], default=0)
+        for prize in current
+    ], np.int64)
+    return amounts, current, safe_before
+
+
+class GameSimulator:
+    """Прогон множества игр по модели игрока и стратегии подсказок
+
+    accuracy — вероятность знать ответ: число или значение для каждого вопроса.
+    Не зная ответа, игрок берет подсказки в порядке hints (не больше
+    hints_per_question на вопрос, начиная с вопроса hints_from), следует
+    ответу друга или большинству зала, иначе угадывает среди оставшихся
+    вариантов. С вопроса take_money_from неуверенный игрок забирает деньги.
+    Номера вопросов считаются с 0, как current_level в GameState.
+    """
+
+    def __init__(self, prize_ladder, accuracy=0.75, hints=HINTS,
+                 hints_per_question=1, hints_from=0, take_money_from=None,
+                 safe_haven_levels=None, friend_accuracy=FRIEND_ACCURACY,
+                 audience_percent=AUDIENCE_CORRECT_PERCENT, seed=None):
+        for hint in hints:
+            if hint not in HINTS:
+                raise ValueError(f"Неизвестная подсказка: {hint}")
+
+        self.amounts, self.current, self.safe_before = ladder_amounts(
+            prize_ladder, safe_haven_levels
+        )
+        self.levels = len(self.amounts)
+        self.accuracy = np.broadcast_to(
+            np.asarray(accuracy, np.float64), (self.levels,)
+        )
+        self.hints = tuple(hints)
+        self.hints_per_question = hints_per_question
+        self.hints_from = hints_from
+        self.take_money_from = take_money_from
+        self.rng = np.random.default_rng(seed)
+        self.hint_batch = HintBatch(self.rng, friend_accuracy, audience_percent)
+
+    def run(self, games, batch_size=1 << 20):
+        """Сыграть games игр пакетами и вернуть отчет"""
+        payouts = collections.Counter()
+        reached = np.zeros(self.levels, np.int64)
+        hint_uses = dict.fromkeys(HINTS, 0)
+        walked = 0
+        total = 0.0
+        total_sq = 0.0
+
+        started = time.perf_counter()
+        for first in range(0, games, batch_size):
+            batch = self._play_batch(min(batch_size, games - first),
+                                     reached, hint_uses)
+            batch_payouts, batch_walked = batch
+            walked += batch_walked
+            total += batch_payouts.sum(dtype=np.float64)
+            total_sq += np.square(batch_payouts, dtype=np.float64).sum()
+            amounts, counts = np.unique(batch_payouts, return_counts=True)
+            payouts.update(dict(zip(amounts.tolist(), counts.tolist())))
+        elapsed = time.perf_counter() - started
+
+        mean = total / games
+        return {
+            'games': games,
+            'expected_cost': mean,
+            'payout_std': max(total_sq / games - mean * mean, 0.0) ** 0.5,
+            'payouts': {amount: count / games
+                        for amount, count in sorted(payouts.items())},
+            'reach_rate': (reached / games).tolist(),
+            'win_rate': payouts.get(int(self.amounts[-1]), 0) / games,
+            'take_money_rate': walked / games,
+            'hint_rate': {hint: count / games
+                          for hint, count in hint_uses.items()},
+            'games_per_second': games / elapsed if elapsed else float('inf'),
+        }
+
+    def _play_batch(self, count, reached, hint_uses):
+        """Сыграть пакет игр, вернуть выигрыши и число забравших деньги"""
+        rng = self.rng
+        payouts = np.zeros(count, np.int64)
+        hints_left = np.ones((count, len(HINTS)), bool)
+        alive = np.arange(count)
+        walked = 0
+
+        for level in range(self.levels):
+            if not alive.size:
+                break
+            reached[level] += alive.size
+
+            correct = rng.random(alive.size) < self.accuracy[level]
+            unsure = np.flatnonzero(~correct)
+            if unsure.size:
+                guessed, walks = self._answer_unsure(
+                    level, alive[unsure], hints_left, hint_uses
+                )
+                correct[unsure] = guessed
+
+                walk_games = alive[unsure[walks]]
+                payouts[walk_games] = self.current[level]
+                walked += walk_games.size
+
+                wrong = unsure[~guessed & ~walks]
+                payouts[alive[wrong]] = self.safe_before[level]
+
+            alive = alive[correct]
+
+        payouts[alive] = self.amounts[-1]
+        return payouts, walked
+
+    def _answer_unsure(self, level, games, hints_left, hint_uses):
+        """Ответы игроков, не знающих ответа; правильный вариант — индекс 0
+
+        Возвращает (ответ верный, игрок забрал деньги).
+        """
+        rng = self.rng
+        count = games.size
+        options = np.ones((count, 4), bool)
+        choice = np.full(count, -1, np.int8)
+        used = np.zeros(count, np.int8)
+
+        if level >= self.hints_from:
+            for hint in self.hints:
+                column = HINTS.index(hint)
+                users = np.flatnonzero(hints_left[games, column] & (choice < 0)
+                                       & (used < self.hints_per_question))
+                if not users.size:
+                    continue
+                hints_left[games[users], column] = False
+                used[users] += 1
+                hint_uses[hint] += users.size
+                correct = np.zeros(users.size, np.intp)
+
+                if hint == '5050':
+                    remaining = self.hint_batch.fifty_fifty(correct)
+                    options[users] = False
+                    options[users, remaining[:, 0]] = True
+                    options[users, remaining[:, 1]] = True
+                elif hint == 'call':
+                    friend = self.hint_batch.call_friend(correct)
+                    # Вариант, убранный 50:50, игрок не примет от друга
+                    follow = options[users, friend]
+                    choice[users[follow]] = friend[follow]
+                else:
+                    # Случайная добавка < 1 разбивает ничьи
+                    votes = (self.hint_batch.audience(correct)
+                             + rng.random((users.size, 4)))
+                    votes[~options[users]] = -1
+                    choice[users] = votes.argmax(axis=1)
+
+        walks = np.zeros(count, bool)
+        undecided = np.flatnonzero(choice < 0)
+        if undecided.size:
+            if self.take_money_from is not None and level >= self.take_money_from:
+                walks[undecided] = True
+            else:
+                remaining = options[undecided].sum(axis=1)
+                choice[undecided] = np.where(
+                    rng.random(undecided.size) * remaining < 1, 0, 1
+                )
+        return (choice == 0) & ~walks, walks
+
+
+def print_report(report, prize_ladder):
+    print("Игр: {:,}, {:,.0f} игр/с".format(report['games'],
+                                           report['games_per_second']))
+    print("Средняя выплата за игру: {:,.0f} (σ {:,.0f})".format(
+        report['expected_cost'], report['payout_std']))
+    print("Победы: {:.4%}, забрали деньги: {:.2%}".format(
+        report['win_rate'], report['take_money_rate']))
+    print("Подсказки: " + ", ".join(
+        "{} {:.1%}".format(hint, rate)
+        for hint, rate in report['hint_rate'].items()))
+
+    print("\nВопрос  Сумма        Дошли")
+    for prize, rate in zip(prize_ladder, report['reach_rate']):
+        print("{:>6}  {:>10,}  {:>8.3%}".format(prize['level'], prize['amount'], rate))
+
+    print("\nВыплата      Доля игр")
+    for amount, share in report['payouts'].items():
+        print("{:>10,}  {:>9.4%}".format(amount, share))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симулятор игр Millionaire Game")
+    parser.add_argument('--questions', default='questions.json')
+    parser.add_argument('--games', type=int, default=1000000)
+    parser.add_argument('--accuracy', type=float, nargs='+', default=[0.95, 0.4],
+                        help="одно число, начало и конец линейной модели "
+                             "или значение для каждого вопроса")
+    parser.add_argument('--hints', nargs='*', default=list(HINTS), choices=HINTS)
+    parser.add_argument('--hints-per-question', type=int, default=1)
+    parser.add_argument('--hints-from', type=int, default=1,
+                        help="номер вопроса, с которого берутся подсказки")
+    parser.add_argument('--take-money-from', type=int,
+                        help="номер вопроса, с которого неуверенный игрок уходит")
+    parser.add_argument('--safe-havens', type=int, nargs='*',
+                        help="номера несгораемых вопросов вместо заданных в файле")
+    parser.add_argument('--friend-accuracy', type=float, default=FRIEND_ACCURACY)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    prize_ladder = load_question_store(args.questions).prize_ladder
+    accuracy = args.accuracy
+    if len(accuracy) == 2 and len(prize_ladder) != 2:
+        accuracy = linear_accuracy(accuracy[0], accuracy[1], len(prize_ladder))
+
+    simulator = GameSimulator(
+        prize_ladder, accuracy, hints=args.hints,
+        hints_per_question=args.hints_per_question,
+        hints_from=args.hints_from - 1,
+        take_money_from=(None if args.take_money_from is None
+                         else args.take_money_from - 1),
+        safe_haven_levels=args.safe_havens,
+        friend_accuracy=args.friend_accuracy, seed=args.seed,
+    )
+    print_report(simulator.run(args.games), prize_ladder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Пакетная генерация подсказок на NumPy для ботов и симуляций
+
+Распределения те же, что у use_hint_5050, use_hint_call_friend и
+use_hint_audience в GameState, но результат считается сразу для N вопросов
+по массиву индексов правильных ответов.
+"""
+
+import numpy as np
+
+from game_logic import (AUDIENCE_CORRECT_PERCENT, AUDIENCE_MIN_PERCENT,
+                        FRIEND_ACCURACY, WRONG_INDICES)
+
+
+WRONG_TABLE = np.array(WRONG_INDICES, np.intp)
+
+
+def correct_indices(questions):
+    """Индексы правильных ответов для списка вопросов"""
+    return np.fromiter((question.correct for question in questions), np.intp,
+                       len(questions))
+
+
+class HintBatch:
+    """Генератор подсказок для пакетов вопросов со своим потоком случайных чисел
+
+    seed может быть числом или готовым numpy.random.Generator.
+    """
+
+    def __init__(self, seed=None, friend_accuracy=FRIEND_ACCURACY,
+                 audience_percent=AUDIENCE_CORRECT_PERCENT):
+        self.rng = np.random.default_rng(seed)
+        self.friend_accuracy = friend_accuracy
+        self.audience_percent = audience_percent
+
+    def fifty_fifty(self, correct):
+        """50/50: два оставшихся варианта по возрастанию, массив (N, 2)"""
+        correct = np.asarray(correct, np.intp)
+        keep = WRONG_TABLE[correct, self.rng.integers(0, 3, correct.size)]
+        return np.sort(np.stack((correct, keep), axis=1), axis=1)
+
+    def call_friend(self, correct):
+        """Звонок другу: названный другом вариант, массив (N,)"""
+        correct = np.asarray(correct, np.intp)
+        wrong = WRONG_TABLE[correct, self.rng.integers(0, 3, correct.size)]
+        return np.where(self.rng.random(correct.size) < self.friend_accuracy,
+                        correct, wrong)
+
+    def audience(self, correct):
+        """Помощь зала: проценты по вариантам, массив (N, 4)"""
+        correct = np.asarray(correct, np.intp)
+        count = correct.size
+        rng = self.rng
+        low, high = self.audience_percent
+
+        correct_percent = rng.integers(low, high + 1, count)
+        remaining = 100 - correct_percent
+        first = rng.integers(AUDIENCE_MIN_PERCENT,
+                             remaining - 2 * AUDIENCE_MIN_PERCENT + 1)
+        second = rng.integers(AUDIENCE_MIN_PERCENT,
+                              remaining - first - AUDIENCE_MIN_PERCENT + 1)
+
+        percentages = np.empty((count, 4), np.int64)
+        rows = np.arange(count)
+        wrong = WRONG_TABLE[correct]
+        percentages[rows, correct] = correct_percent
+        percentages[rows, wrong[:, 0]] = first
+        percentages[rows, wrong[:, 1]] = second
+        percentages[rows, wrong[:, 2]] = remaining - first - second
+        return percentages
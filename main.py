@@ -2,13 +2,62 @@
 Главный файл запуска игры "Кто хочет стать миллионером"
 """
 
+import time
+
+# Отсчет времени запуска ведется до импорта интерфейса
+STARTED = time.perf_counter()
+
+import json
+import logging
+import os
+
+from audience_votes import AudienceVotes
+from game_events import EventLog
+from game_results import ResultLog
 from modern_ui_interface import MillionaireModernUI
+from ui_metrics import StartupTimer
 
 
 def main():
     """Точка входа в приложение"""
+    # MILLIONAIRE_UI_METRICS=1 выводит замеры отзывчивости интерфейса
+    if os.environ.get("MILLIONAIRE_UI_METRICS"):
+        logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+
+    startup = StartupTimer(STARTED)
+    startup.mark("import")
+
+    # MILLIONAIRE_EVENT_LOG=games.events: журнал всех переходов игры
+    events = None
+    if os.environ.get("MILLIONAIRE_EVENT_LOG"):
+        events = EventLog(os.environ["MILLIONAIRE_EVENT_LOG"])
+    # MILLIONAIRE_RESULTS=games.results: итоги законченных игр
+    results = None
+    if os.environ.get("MILLIONAIRE_RESULTS"):
+        results = ResultLog(os.environ["MILLIONAIRE_RESULTS"])
+
     try:
-        app = MillionaireModernUI()
+        # MILLIONAIRE_AUDIENCE_PORT=8766: подсказка "ЗАЛ" по голосам зрителей
+        audience = None
+        if os.environ.get("MILLIONAIRE_AUDIENCE_PORT"):
+            audience = AudienceVotes()
+            audience.start_server(
+                port=int(os.environ["MILLIONAIRE_AUDIENCE_PORT"])
+            )
+
+        questions_file = os.environ.get("MILLIONAIRE_QUESTIONS", "questions.json")
+        app = MillionaireModernUI(questions_file, startup=startup,
+                                  audience=audience, events=events,
+                                  results=results)
+
+        # MILLIONAIRE_STARTUP_REPORT=1: напечатать замеры запуска и выйти
+        if os.environ.get("MILLIONAIRE_STARTUP_REPORT"):
+            def on_started(report):
+                print("STARTUP " + json.dumps(report), flush=True)
+                app.root.destroy()
+
+            app.on_started = on_started
+
         app.run()
     except KeyboardInterrupt:
         print("\nИгра прервана пользователем")
@@ -16,6 +65,11 @@ def main():
         print("Произошла ошибка: {}".format(e))
         import traceback
         traceback.print_exc()
+    finally:
+        if events is not None:
+            events.close()
+        if results is not None:
+            results.close()
 
 
 if __name__ == "__main__":
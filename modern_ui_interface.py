@@ -3,14 +3,45 @@
 Дизайн: Glassmorphism + градиенты + анимации
 """
 
+import functools
+import os
+import threading
 import tkinter as tk
 from tkinter import messagebox
-from game_logic import GameState
+from game_logic import GameBank, GameState
+from ui_metrics import StallMonitor, StartupTimer, TimeToVisible
+
+
+@functools.lru_cache(maxsize=256)
+def rounded_rect_points(x1, y1, x2, y2, radius):
+    """Точки скругленного прямоугольника, считаются один раз на размер"""
+    return (
+        x1 + radius, y1,
+        x2 - radius, y1,
+        x2, y1,
+        x2, y1 + radius,
+        x2, y2 - radius,
+        x2, y2,
+        x2 - radius, y2,
+        x1 + radius, y2,
+        x1, y2,
+        x1, y2 - radius,
+        x1, y1 + radius,
+        x1, y1
+    )
+
+
+def create_rounded_rect(canvas, x1, y1, x2, y2, radius, **kwargs):
+    """Создание скругленного прямоугольника на холсте"""
+    return canvas.create_polygon(rounded_rect_points(x1, y1, x2, y2, radius),
+                                 smooth=True, **kwargs)
 
 
 class ModernButton(tk.Canvas):
     """Современная кнопка с hover-эффектом и анимацией"""
 
+    DISABLED_COLOR = "#55557a"
+
     def __init__(self, parent, text, command, width=200, height=50,
                  bg_color="#667eea", hover_color="#764ba2", **kwargs):
         super().__init__(parent, width=width, height=height,
@@ -23,6 +54,9 @@ class ModernButton(tk.Canvas):
         self.width = width
         self.height = height
         self.is_hovered = False
+        self.enabled = True
+        self.shape_ids = None
+        self.drawn_state = None
 
         self.draw_button()
 
@@ -37,60 +71,65 @@ class ModernButton(tk.Canvas):
         self.bind("<Leave>", self.on_leave)
         self.bind("<Button-1>", self.on_click)
 
-    def draw_button(self):
-        """Рисуем кнопку с градиентом"""
-        self.delete("button_bg")
-
+    def button_shapes(self):
+        """Координаты тени, тела и блика для текущего состояния"""
         radius = 15
-        color = self.hover_color if self.is_hovered else self.bg_color
-
         shadow_offset = 3 if not self.is_hovered else 1
+        return (
+            rounded_rect_points(shadow_offset, shadow_offset,
+                                self.width, self.height, radius),
+            rounded_rect_points(0, 0, self.width - shadow_offset,
+                                self.height - shadow_offset, radius),
+            rounded_rect_points(5, 5, self.width - shadow_offset - 5,
+                                self.height / 2, radius),
+        )
 
-        x1 = shadow_offset
-        y1 = shadow_offset
-        x2 = self.width
-        y2 = self.height
-        self.create_rounded_rect(x1, y1, x2, y2, radius,
-                                 fill="#000000", stipple="gray25",
-                                 outline="", tags="button_bg")
-
-        x1 = 0
-        y1 = 0
-        x2 = self.width - shadow_offset
-        y2 = self.height - shadow_offset
-        self.create_rounded_rect(x1, y1, x2, y2, radius,
-                                 fill=color, outline="", tags="button_bg")
-
-        x1 = 5
-        y1 = 5
-        x2 = self.width - shadow_offset - 5
-        y2 = self.height / 2
-        self.create_rounded_rect(x1, y1, x2, y2, radius,
-                                 fill="#ffffff", stipple="gray25",
-                                 outline="", tags="button_bg")
-
-        self.tag_lower("button_bg")
-
-    def create_rounded_rect(self, x1, y1, x2, y2, radius, **kwargs):
-        """Создание скругленного прямоугольника"""
-        points = [
-            x1 + radius, y1,
-            x2 - radius, y1,
-            x2, y1,
-            x2, y1 + radius,
-            x2, y2 - radius,
-            x2, y2,
-            x2 - radius, y2,
-            x1 + radius, y2,
-            x1, y2,
-            x1, y2 - radius,
-            x1, y1 + radius,
-            x1, y1
-        ]
-        return self.create_polygon(points, smooth=True, **kwargs)
+    def draw_button(self):
+        """Рисуем кнопку: у готовых фигур меняются только цвет и координаты"""
+        if not self.enabled:
+            color = self.DISABLED_COLOR
+        elif self.is_hovered:
+            color = self.hover_color
+        else:
+            color = self.bg_color
+        state = (color, self.is_hovered)
+        if state == self.drawn_state:
+            return
+
+        shadow, body, gloss = self.button_shapes()
+        if self.shape_ids is None:
+            self.shape_ids = (
+                self.create_polygon(shadow, smooth=True, fill="#000000",
+                                    stipple="gray25", outline="",
+                                    tags="button_bg"),
+                self.create_polygon(body, smooth=True, fill=color,
+                                    outline="", tags="button_bg"),
+                self.create_polygon(gloss, smooth=True, fill="#ffffff",
+                                    stipple="gray25", outline="",
+                                    tags="button_bg"),
+            )
+            self.tag_lower("button_bg")
+        else:
+            shadow_id, body_id, gloss_id = self.shape_ids
+            if state[1] != self.drawn_state[1]:
+                self.coords(shadow_id, shadow)
+                self.coords(body_id, body)
+                self.coords(gloss_id, gloss)
+            self.itemconfig(body_id, fill=color)
+
+        self.drawn_state = state
+
+    def set_enabled(self, enabled):
+        """Включить или выключить кнопку"""
+        self.enabled = enabled
+        self.is_hovered = False
+        self.draw_button()
+        self.itemconfig(self.text_id, fill="white" if enabled else "#aaaaaa")
 
     def on_enter(self, event):
         """Эффект при наведении"""
+        if not self.enabled:
+            return
         self.is_hovered = True
         self.draw_button()
         self.config(cursor="hand2")
@@ -103,7 +142,7 @@ class ModernButton(tk.Canvas):
 
     def on_click(self, event):
         """Обработка клика"""
-        if self.command:
+        if self.enabled and self.command:
             self.command()
 
 
@@ -122,57 +161,183 @@ class GlassCard(tk.Canvas):
         """Рисуем стеклянный эффект"""
         radius = 20
 
-        self.create_rounded_rect(
-            0, 0, self.width, self.height, radius,
+        create_rounded_rect(
+            self, 0, 0, self.width, self.height, radius,
             fill="#1a1a2e", outline="#ffffff", width=1
         )
 
-        self.create_rounded_rect(
-            10, 10, self.width - 10, self.height / 3, radius,
+        create_rounded_rect(
+            self, 10, 10, self.width - 10, self.height / 3, radius,
             fill="#ffffff", stipple="gray12", outline=""
         )
 
-    def create_rounded_rect(self, x1, y1, x2, y2, radius, **kwargs):
-        """Создание скругленного прямоугольника"""
-        points = [
-            x1 + radius, y1,
-            x2 - radius, y1,
-            x2, y1,
-            x2, y1 + radius,
-            x2, y2 - radius,
-            x2, y2,
-            x2 - radius, y2,
-            x1 + radius, y2,
-            x1, y2,
-            x1, y2 - radius,
-            x1, y1 + radius,
-            x1, y1
-        ]
-        return self.create_polygon(points, smooth=True, **kwargs)
-
 
 class MillionaireModernUI:
     """Главный класс с современным интерфейсом"""
 
-    def __init__(self):
+    # Паузы показа ответа, мс: выбран -> подсвечен результат -> диалог
+    REVEAL_SELECTED_MS = 800
+    REVEAL_CORRECT_MS = 1000
+    REVEAL_WRONG_MS = 1500
+
+    DIALOG_SIZE = (320, 170)
+
+    BANK_POLL_MS = 20
+
+    # Незаконченная игра сохраняется рядом с файлом вопросов
+    SAVE_SUFFIX = '.save'
+
+    def __init__(self, questions_file='questions.json', startup=None,
+                 on_started=None, audience=None, events=None, results=None):
+        self.startup = startup or StartupTimer()
+        self.on_started = on_started
+        # Голоса настоящего зала для подсказки "ЗАЛ" (AudienceVotes)
+        self.audience = audience
+        # Журнал событий игр (EventLog)
+        self.events = events
+        # Журнал итогов законченных игр (ResultLog)
+        self.results = results
+
         self.root = tk.Tk()
         self.root.title("Millionaire Game")
         self.root.geometry("1200x750")
         self.root.resizable(False, False)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.startup.mark("tk_init")
 
+        self.bg_canvas = None
         self.setup_gradient_background()
 
-        self.game = GameState()
+        # Банк вопросов грузится в фоне, меню появляется сразу
+        self.questions_file = questions_file
+        self.save_file = questions_file + self.SAVE_SUFFIX
+        self.game = None
+        self.game_in_progress = False
+        # Окно закрывается: после диалогов состояние игры не трогаем
+        self.closing = False
+        self.bank_result = None
+        self.play_btn = None
+        threading.Thread(target=self.load_bank, daemon=True).start()
+
         self.answer_buttons = []
         self.prize_labels = []
 
+        # Экраны строятся один раз и дальше только скрываются и показываются
+        self.screens = {}
+        self.current_screen = None
+
+        # Окна диалогов не уничтожаются, а прячутся и показываются снова
+        self.dialog_pool = {}
+        self.time_to_visible = TimeToVisible()
+
+        # Состояние показа ответа: None, "selected", "correct" или "wrong"
+        self.reveal_state = None
+        self.reveal_job = None
+        self.stall_monitor = StallMonitor(self.root)
+
         self.show_main_menu()
+        self.screens["menu"].bind("<Expose>", self.on_first_paint, add="+")
+        self.root.after(self.BANK_POLL_MS, self.check_bank_ready)
+
+    def load_bank(self):
+        """Загрузка банка вопросов в фоновом потоке (без обращений к Tk)"""
+        try:
+            self.bank_result = GameBank.load(self.questions_file)
+        except Exception as e:
+            self.bank_result = e
+
+    def check_bank_ready(self):
+        """Проверка из цикла событий, загружен ли банк"""
+        result = self.bank_result
+        if result is None:
+            self.root.after(self.BANK_POLL_MS, self.check_bank_ready)
+            return
+
+        if isinstance(result, Exception):
+            messagebox.showerror("Ошибка", str(result))
+            self.root.destroy()
+            return
+
+        self.game = GameState(self.questions_file, bank=result,
+                              audience=self.audience, events=self.events,
+                              results=self.results)
+        self.play_btn.set_enabled(True)
+        self.startup.mark("bank_ready")
+        self.check_startup_complete()
+        self.root.after_idle(self.offer_resume)
+
+    def offer_resume(self):
+        """Предложить продолжить игру, сохраненную при закрытии окна"""
+        try:
+            with open(self.save_file, 'rb') as f:
+                data = f.read()
+            os.remove(self.save_file)
+        except OSError:
+            return
+
+        try:
+            game = GameState.from_bytes(data, self.game.bank,
+                                        audience=self.audience,
+                                        events=self.events,
+                                        results=self.results)
+        except Exception:
+            # Сохранение от другого банка вопросов или поврежденное
+            return
+        if game.current_question is None:
+            return
+
+        message = "Продолжить сохраненную игру с вопроса {}?".format(
+            game.current_level + 1)
+        if messagebox.askyesno("Продолжить игру", message):
+            self.game = game
+            self.game_in_progress = True
+            self.show_game_screen()
+
+    def save_game(self):
+        """Сохранить незаконченную игру"""
+        tmp_file = self.save_file + '.tmp'
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(self.game.to_bytes(include_rng=True))
+            os.replace(tmp_file, self.save_file)
+        except OSError:
+            pass
+
+    def on_close(self):
+        """Закрытие окна: незаконченная игра сохраняется"""
+        self.closing = True
+        # Неверный ответ уже проверен, такую игру продолжать нельзя
+        if self.game_in_progress and self.reveal_state != "wrong":
+            self.save_game()
+        self.root.destroy()
+
+    def on_first_paint(self, event):
+        """Первая отрисовка меню"""
+        if "first_paint" not in self.startup.marks:
+            self.root.after_idle(self.mark_first_paint)
+
+    def mark_first_paint(self):
+        self.startup.mark("first_paint")
+        self.check_startup_complete()
+
+    def check_startup_complete(self):
+        """Сообщить о завершении запуска, когда меню нарисовано и банк готов"""
+        marks = self.startup.marks
+        if "first_paint" in marks and "bank_ready" in marks and \
+                "started" not in marks:
+            self.startup.mark("started")
+            report = self.startup.report()
+            if self.on_started:
+                self.on_started(report)
 
     def setup_gradient_background(self):
-        """Создание градиентного фона"""
-        self.bg_canvas = tk.Canvas(self.root, width=1200, height=750,
-                                   highlightthickness=0)
-        self.bg_canvas.place(x=0, y=0)
+        """Создание градиентного фона: один холст на всё время работы"""
+        if self.bg_canvas is not None:
+            return
+
+        # Полосы градиента отрисовываются один раз в изображение,
+        # на холсте остаются только картинка и два полупрозрачных круга
+        self.bg_image = tk.PhotoImage(width=1200, height=750)
 
         colors = [
             "#667eea", "#6b7ce8", "#707ae6", "#7578e4",
@@ -182,23 +347,41 @@ class MillionaireModernUI:
 
         height_step = 750 / len(colors)
         for i, color in enumerate(colors):
-            y1 = i * height_step
-            y2 = (i + 1) * height_step
-            self.bg_canvas.create_rectangle(0, y1, 1200, y2,
-                                            fill=color, outline="")
+            y1 = round(i * height_step)
+            y2 = round((i + 1) * height_step)
+            self.bg_image.put(color, to=(0, y1, 1200, y2))
+
+        self.bg_canvas = tk.Canvas(self.root, width=1200, height=750,
+                                   highlightthickness=0)
+        self.bg_canvas.place(x=0, y=0)
+        self.bg_canvas.create_image(0, 0, image=self.bg_image, anchor=tk.NW)
 
         self.bg_canvas.create_oval(-100, -100, 300, 300,
                                    fill="#ffffff", stipple="gray12", outline="")
         self.bg_canvas.create_oval(900, 500, 1400, 900,
                                    fill="#000000", stipple="gray12", outline="")
 
+    def show_screen(self, name, builder, **place_options):
+        """Показать экран из кэша, построив его при первом показе"""
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = self.screens[name] = builder()
+
+        if self.current_screen is not None and self.current_screen is not screen:
+            self.current_screen.place_forget()
+        screen.place(**place_options)
+        self.current_screen = screen
+        return screen
+
     def show_main_menu(self):
         """Главное меню"""
-        self.clear_window()
-        self.setup_gradient_background()
+        self.cancel_reveal()
+        self.show_screen("menu", self.build_main_menu,
+                         relx=0.5, rely=0.5, anchor=tk.CENTER)
 
+    def build_main_menu(self):
+        """Построение главного меню"""
         menu_frame = tk.Frame(self.root, bg="#667eea")
-        menu_frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
 
         glass_card = GlassCard(menu_frame, 500, 480, bg="#667eea")
         glass_card.pack()
@@ -221,7 +404,7 @@ class MillionaireModernUI:
         )
         glass_card.create_window(250, 190, window=subtitle)
 
-        play_btn = ModernButton(
+        self.play_btn = ModernButton(
             glass_card,
             text="НАЧАТЬ ИГРУ",
             command=self.start_game,
@@ -231,7 +414,9 @@ class MillionaireModernUI:
             hover_color="#764ba2",
             bg="#1a1a2e"
         )
-        glass_card.create_window(250, 290, window=play_btn)
+        # Кнопка включится, когда банк вопросов будет загружен
+        self.play_btn.set_enabled(self.game is not None)
+        glass_card.create_window(250, 290, window=self.play_btn)
 
         exit_btn = ModernButton(
             glass_card,
@@ -245,24 +430,29 @@ class MillionaireModernUI:
         )
         glass_card.create_window(250, 380, window=exit_btn)
 
-    def clear_window(self):
-        """Очистка окна"""
-        for widget in self.root.winfo_children():
-            if widget != self.bg_canvas:
-                widget.destroy()
+        return menu_frame
 
     def start_game(self):
         """Начать игру"""
+        if self.game is None:
+            return
         self.game.start_new_game()
+        self.game_in_progress = True
         self.show_game_screen()
 
     def show_game_screen(self):
         """Игровой экран"""
-        self.clear_window()
-        self.setup_gradient_background()
+        self.show_screen("game", self.build_game_screen,
+                         x=50, y=50, width=1100, height=650)
+
+        for btn in (self.hint_5050_btn, self.hint_call_btn,
+                    self.hint_audience_btn):
+            btn.config(state=tk.NORMAL)
+        self.display_question()
 
+    def build_game_screen(self):
+        """Построение игрового экрана"""
         main_frame = tk.Frame(self.root, bg="#667eea")
-        main_frame.place(x=50, y=50, width=1100, height=650)
 
         left_frame = tk.Frame(main_frame, bg="#667eea")
         left_frame.place(x=0, y=0, width=750, height=650)
@@ -320,7 +510,7 @@ class MillionaireModernUI:
             self.answer_buttons.append(btn)
 
         self.create_modern_prize_ladder(right_frame)
-        self.display_question()
+        return main_frame
 
     def create_hint_button(self, parent, text, width, height, color):
         """Создание кнопки подсказки"""
@@ -470,7 +660,10 @@ class MillionaireModernUI:
                                  font=("Segoe UI", 11, "normal"))
 
     def select_answer(self, answer_index):
-        """Выбор ответа"""
+        """Выбор ответа: дальше показ идет шагами через after()"""
+        if self.reveal_state is not None:
+            return
+
         for btn in self.answer_buttons:
             btn.unbind("<Button-1>")
             btn.unbind("<Enter>")
@@ -479,22 +672,36 @@ class MillionaireModernUI:
         selected_btn = self.answer_buttons[answer_index]
         selected_btn.bg_color = "#FFA500"
         selected_btn.draw_button()
-        self.root.update()
-        self.root.after(800)
+
+        self.stall_monitor.begin(
+            "Ответ на уровне {}".format(self.game.current_level + 1)
+        )
+        self.set_reveal_state("selected", self.REVEAL_SELECTED_MS,
+                              self.reveal_answer, answer_index)
+
+    def set_reveal_state(self, state, delay_ms=0, callback=None, *args):
+        """Перейти в состояние показа и запланировать следующий шаг"""
+        self.reveal_state = state
+        self.reveal_job = None
+        if callback is not None:
+            self.reveal_job = self.root.after(delay_ms, callback, *args)
+
+    def cancel_reveal(self):
+        """Прервать показ ответа, если он идет"""
+        if self.reveal_job is not None:
+            self.root.after_cancel(self.reveal_job)
+        self.set_reveal_state(None)
+        self.stall_monitor.end()
+
+    def reveal_answer(self, answer_index):
+        """Подсветить результат ответа"""
+        selected_btn = self.answer_buttons[answer_index]
 
         if self.game.check_answer(answer_index):
             selected_btn.bg_color = "#4CAF50"
             selected_btn.draw_button()
-            self.root.update()
-            self.root.after(1000)
-
-            if self.game.advance_level():
-                if self.game.is_game_won():
-                    self.show_victory()
-                else:
-                    self.show_correct_dialog()
-            else:
-                self.show_victory()
+            self.set_reveal_state("correct", self.REVEAL_CORRECT_MS,
+                                  self.finish_answer, True)
         else:
             selected_btn.bg_color = "#f44336"
             selected_btn.draw_button()
@@ -503,76 +710,99 @@ class MillionaireModernUI:
             correct_btn.bg_color = "#4CAF50"
             correct_btn.draw_button()
 
-            self.root.update()
-            self.root.after(1500)
+            self.set_reveal_state("wrong", self.REVEAL_WRONG_MS,
+                                  self.finish_answer, False)
+
+    def finish_answer(self, correct):
+        """Завершить показ ответа и перейти к следующему окну"""
+        self.set_reveal_state(None)
+        self.stall_monitor.end()
+
+        if not correct:
             self.show_game_over()
+        elif self.game.advance_level():
+            if self.game.is_game_won():
+                self.show_victory()
+            else:
+                self.show_correct_dialog()
+        else:
+            self.show_victory()
+
+    def get_pooled_dialog(self, kind, builder):
+        """Скрытое окно диалога из пула, создается при первом обращении"""
+        dialog = self.dialog_pool.get(kind)
+        if dialog is None or not dialog.winfo_exists():
+            dialog = self.dialog_pool[kind] = builder()
+            dialog.protocol("WM_DELETE_WINDOW",
+                            lambda k=kind: self.hide_pooled_dialog(k))
+            # Если окно уничтожат вместе с главным, ожидание должно закончиться
+            dialog.bind("<Destroy>",
+                        lambda event, d=dialog: self.on_dialog_destroyed(event, d))
+            self.time_to_visible.attach(dialog, kind)
+        return dialog
+
+    def hide_pooled_dialog(self, kind, result=None):
+        """Спрятать диалог обратно в пул"""
+        dialog = self.dialog_pool.get(kind)
+        if dialog is None:
+            return
+        dialog.result = result
+        dialog.grab_release()
+        dialog.withdraw()
+        dialog.closed.set(True)
 
-    def show_custom_dialog(self, title, message, icon_color="#4CAF50"):
-        """Маленький компактный диалог внизу слева между ответами"""
-        dialog = tk.Toplevel(self.root)
-        dialog.title(title)
+    def on_dialog_destroyed(self, event, dialog):
+        """Разбудить ожидание диалога, уничтоженного вместе с окном игры"""
+        if event.widget is dialog:
+            dialog.closed.set(True)
+
+    def build_custom_dialog(self):
+        """Построение окна компактного диалога (один раз)"""
+        width, height = self.DIALOG_SIZE
 
-        width, height = 320, 170
+        dialog = tk.Toplevel(self.root)
+        dialog.withdraw()
         dialog.geometry(f"{width}x{height}")
         dialog.configure(bg="#667eea")
         dialog.resizable(False, False)
         dialog.transient(self.root)
-        dialog.grab_set()
-
-        # Позиция: сильно влево и как можно ниже
-        dialog.update_idletasks()
-        root_x = self.root.winfo_x()
-        root_y = self.root.winfo_y()
-        root_w = self.root.winfo_width()
-        root_h = self.root.winfo_height()
-
-        x = root_x + (root_w - width) // 2 - 180  # ещё левее
-        y = root_y + root_h - height - 5  # низ окна
-
-        dialog.geometry(f"+{x}+{y}")
+        dialog.result = None
+        dialog.closed = tk.BooleanVar(dialog, False)
 
         # Стеклянная карточка
         card = GlassCard(dialog, width - 8, height - 8, bg="#667eea")
         card.place(x=4, y=4)
 
         # Иконка
-        icon_canvas = tk.Canvas(card, width=36, height=36,
-                                bg="#1a1a2e", highlightthickness=0)
-        icon_canvas.place(x=(width - 8) // 2 - 18, y=4)
-        icon_canvas.create_oval(3, 3, 33, 33, fill=icon_color, outline="")
-        icon_canvas.create_text(18, 18, text="✓",
-                                font=("Segoe UI", 16, "bold"), fill="white")
+        dialog.icon_canvas = tk.Canvas(card, width=36, height=36,
+                                       bg="#1a1a2e", highlightthickness=0)
+        dialog.icon_canvas.place(x=(width - 8) // 2 - 18, y=4)
+        dialog.icon_id = dialog.icon_canvas.create_oval(3, 3, 33, 33,
+                                                        outline="")
+        dialog.icon_canvas.create_text(18, 18, text="✓",
+                                       font=("Segoe UI", 16, "bold"),
+                                       fill="white")
 
         # Заголовок (чуть выше)
-        title_label = tk.Label(
+        dialog.title_label = tk.Label(
             card,
-            text=title,
+            text="",
             font=("Segoe UI", 11, "bold"),
             bg="#1a1a2e",
             fg="white"
         )
-        card.create_window((width - 8) // 2, 52, window=title_label)
+        card.create_window((width - 8) // 2, 52, window=dialog.title_label)
 
         # Сообщение ближе к заголовку (меньше расстояние между строками)
-        msg_label = tk.Label(
+        dialog.msg_label = tk.Label(
             card,
-            text=message,
+            text="",
             font=("Segoe UI", 9),
             bg="#1a1a2e",
             fg="#dddddd",
             justify=tk.CENTER
         )
-        card.create_window((width - 8) // 2, 86, window=msg_label)
-
-        dialog.result = None
-
-        def on_yes():
-            dialog.result = True
-            dialog.destroy()
-
-        def on_no():
-            dialog.result = False
-            dialog.destroy()
+        card.create_window((width - 8) // 2, 86, window=dialog.msg_label)
 
         btn_frame = tk.Frame(card, bg="#1a1a2e")
         card.create_window((width - 8) // 2, height - 40, window=btn_frame)
@@ -580,7 +810,7 @@ class MillionaireModernUI:
         yes_btn = ModernButton(
             btn_frame,
             text="ДА",
-            command=on_yes,
+            command=lambda: self.hide_pooled_dialog("custom", True),
             width=70,
             height=30,
             bg_color="#4CAF50",
@@ -592,7 +822,7 @@ class MillionaireModernUI:
         no_btn = ModernButton(
             btn_frame,
             text="НЕТ",
-            command=on_no,
+            command=lambda: self.hide_pooled_dialog("custom", False),
             width=70,
             height=30,
             bg_color="#f44336",
@@ -601,7 +831,37 @@ class MillionaireModernUI:
         )
         no_btn.pack(side=tk.LEFT, padx=4)
 
-        dialog.wait_window()
+        return dialog
+
+    def show_custom_dialog(self, title, message, icon_color="#4CAF50"):
+        """Маленький компактный диалог внизу слева между ответами"""
+        self.time_to_visible.start("custom", title)
+        dialog = self.get_pooled_dialog("custom", self.build_custom_dialog)
+
+        dialog.title(title)
+        dialog.title_label.config(text=title)
+        dialog.msg_label.config(text=message)
+        dialog.icon_canvas.itemconfig(dialog.icon_id, fill=icon_color)
+
+        # Позиция: сильно влево и как можно ниже
+        width, height = self.DIALOG_SIZE
+        root_x = self.root.winfo_x()
+        root_y = self.root.winfo_y()
+        root_w = self.root.winfo_width()
+        root_h = self.root.winfo_height()
+
+        x = root_x + (root_w - width) // 2 - 180  # ещё левее
+        y = root_y + root_h - height - 5  # низ окна
+
+        dialog.geometry(f"+{x}+{y}")
+
+        dialog.result = None
+        dialog.deiconify()
+        dialog.grab_set()
+        self.root.wait_variable(dialog.closed)
+        # Окно закрыли во время диалога: игра уже сохранена, ответа нет
+        if self.closing:
+            return None
         return dialog.result
 
     def show_correct_dialog(self):
@@ -611,6 +871,8 @@ class MillionaireModernUI:
 
         message = "Правильный ответ!   Ваш выигрыш: {} руб\nПродолжить игру?".format(prize_text)
         result = self.show_custom_dialog("Отлично! ✨", message, "#4CAF50")
+        if self.closing:
+            return
 
         if result:
             self.display_question()
@@ -619,11 +881,14 @@ class MillionaireModernUI:
 
     def show_game_over(self):
         """Окно проигрыша"""
+        self.game_in_progress = False
         safe_prize = self.game.get_safe_haven_prize()
         prize_text = "{:,}".format(safe_prize).replace(",", " ")
 
         message = "Неправильный ответ   Вы выиграли: {} руб\nСыграть еще раз?".format(prize_text)
         result = self.show_custom_dialog("Игра окончена", message, "#FF9800")
+        if self.closing:
+            return
 
         if result:
             self.start_game()
@@ -632,11 +897,14 @@ class MillionaireModernUI:
 
     def show_victory(self):
         """Окно победы"""
+        self.game_in_progress = False
         max_prize = self.game.prize_ladder[-1]['amount']
         prize_text = "{:,}".format(max_prize).replace(",", " ")
 
         message = "НЕВЕРОЯТНО!\n\nВЫ ВЫИГРАЛИ {} руб!\n\nСыграть еще раз?".format(prize_text)
         result = self.show_custom_dialog("ПОЗДРАВЛЯЕМ! 🎉", message, "#FFD700")
+        if self.closing:
+            return
 
         if result:
             self.start_game()
@@ -645,11 +913,14 @@ class MillionaireModernUI:
 
     def show_take_money(self):
         """Забрать деньги"""
-        prize = self.game.get_current_prize()
+        self.game_in_progress = False
+        prize = self.game.take_money()
         prize_text = "{:,}".format(prize).replace(",", " ")
 
         message = "Вы забираете деньги!\n\nВаш выигрыш: {} руб\n\nСыграть еще раз?".format(prize_text)
         result = self.show_custom_dialog("Поздравляем! 💰", message, "#4CAF50")
+        if self.closing:
+            return
 
         if result:
             self.start_game()
@@ -658,6 +929,9 @@ class MillionaireModernUI:
 
     def use_hint(self, hint_type):
         """Использование подсказок"""
+        if self.reveal_state is not None:
+            return
+
         if "50:50" in hint_type:
             self.use_hint_5050()
         elif "ЗВОНОК" in hint_type:
@@ -705,14 +979,16 @@ class MillionaireModernUI:
             self.hint_audience_btn.config(state=tk.DISABLED)
             self.show_audience_window(percentages)
 
-    def show_audience_window(self, percentages):
-        """Окно помощи зала"""
+    def build_audience_window(self):
+        """Построение окна помощи зала (один раз): все столбцы на одном холсте"""
         window = tk.Toplevel(self.root)
+        window.withdraw()
         window.title("Помощь зала")
         window.geometry("500x400")
         window.configure(bg="#667eea")
         window.transient(self.root)
-        window.grab_set()
+        window.result = None
+        window.closed = tk.BooleanVar(window, False)
 
         title = tk.Label(
             window,
@@ -723,57 +999,34 @@ class MillionaireModernUI:
         )
         title.pack(pady=20)
 
-        chart_frame = tk.Frame(window, bg="#667eea")
-        chart_frame.pack(pady=20, padx=40, fill=tk.BOTH, expand=True)
+        chart = tk.Canvas(window, width=420, height=4 * 51,
+                          bg="#667eea", highlightthickness=0)
+        chart.pack(pady=10)
 
         labels = ["A", "B", "C", "D"]
         colors = ["#FF6B6B", "#4ECDC4", "#95E1D3", "#FFD93D"]
 
-        sorted_percentages = sorted(percentages.items())
-
-        for i, (idx, percent) in enumerate(sorted_percentages):
-            frame = tk.Frame(chart_frame, bg="#667eea")
-            frame.pack(pady=8, fill=tk.X)
-
-            label = tk.Label(
-                frame,
-                text="{}:".format(labels[idx]),
-                font=("Segoe UI", 14, "bold"),
-                bg="#667eea",
-                fg="white",
-                width=3
-            )
-            label.pack(side=tk.LEFT)
-
-            bar_canvas = tk.Canvas(
-                frame,
-                width=300,
-                height=35,
-                bg="#3a3a5a",
-                highlightthickness=0
-            )
-            bar_canvas.pack(side=tk.LEFT, padx=10)
-
-            fill_width = int(300 * percent / 100)
-            bar_canvas.create_rectangle(
-                0, 0, fill_width, 35,
-                fill=colors[i],
-                outline=""
-            )
-
-            percent_label = tk.Label(
-                frame,
-                text="{}%".format(percent),
-                font=("Segoe UI", 14, "bold"),
-                bg="#667eea",
-                fg="white"
-            )
-            percent_label.pack(side=tk.LEFT)
+        window.bars = []
+        window.percent_ids = []
+        for i in range(4):
+            y = i * 51 + 8
+            chart.create_text(20, y + 17, text="{}:".format(labels[i]),
+                              font=("Segoe UI", 14, "bold"), fill="white")
+            chart.create_rectangle(50, y, 350, y + 35,
+                                   fill="#3a3a5a", outline="")
+            window.bars.append(chart.create_rectangle(
+                50, y, 50, y + 35, fill=colors[i], outline=""
+            ))
+            window.percent_ids.append(chart.create_text(
+                360, y + 17, text="", anchor=tk.W,
+                font=("Segoe UI", 14, "bold"), fill="white"
+            ))
+        window.chart = chart
 
         close_btn = ModernButton(
             window,
             text="ЗАКРЫТЬ",
-            command=window.destroy,
+            command=lambda: self.hide_pooled_dialog("audience"),
             width=200,
             height=50,
             bg_color="#f093fb",
@@ -782,6 +1035,24 @@ class MillionaireModernUI:
         )
         close_btn.pack(pady=20)
 
+        return window
+
+    def show_audience_window(self, percentages):
+        """Окно помощи зала"""
+        self.time_to_visible.start("audience", "Помощь зала")
+        window = self.get_pooled_dialog("audience", self.build_audience_window)
+
+        for idx in range(4):
+            percent = percentages.get(idx, 0)
+            x1, y1, _, y2 = window.chart.coords(window.bars[idx])
+            window.chart.coords(window.bars[idx],
+                                x1, y1, x1 + int(300 * percent / 100), y2)
+            window.chart.itemconfig(window.percent_ids[idx],
+                                    text="{}%".format(percent))
+
+        window.deiconify()
+        window.grab_set()
+
     def run(self):
         """Запуск приложения"""
         self.root.mainloop()
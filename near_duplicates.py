@@ -0,0 +1,343 @@
+"""
+Поиск почти одинаковых вопросов (переформулировок) в большом банке
+через MinHash и LSH
+
+Вопрос превращается в множество основ слов текста и вариантов ответа.
+MinHash сжимает множество в num_perm минимальных хэшей. Подписи режутся
+на полосы, и кандидатами считаются вопросы с совпавшей полосой (ключи
+полос хранятся отсортированными массивами NumPy). Кандидаты проверяются
+по доле совпавших хэшей и объединяются в кластеры через систему
+непересекающихся множеств. Каждый вопрос сравнивается только с первым
+вопросом своей корзины, поэтому время растет почти линейно, а не
+квадратично.
+
+Запуск: python near_duplicates.py questions.json --index questions.json.lsh
+"""
+
+import argparse
+import array
+import os
+import zlib
+
+import numpy as np
+
+from question_common import HashSet
+from question_text import stems
+
+
+NUM_PERM = 64
+BANDS = 16
+# Порог оценки сходства Жаккара для почти одинаковых вопросов
+THRESHOLD = 0.6
+SEED = 1
+# Слова короче этого (предлоги) не входят в множество слов вопроса
+MIN_WORD = 3
+
+# Простое число больше 2**32 для хэшей (a * x + b) mod P
+_PRIME = np.uint64(4294967311)
+# Вопросов в одном векторном пакете: матрица слов на хэши ~ 15 МБ
+_BATCH = 2000
+
+
+def question_tokens(text, options):
+    """Основы слов текста и вариантов ответа без повторов"""
+    tokens = set(stems(text, MIN_WORD))
+    for option in options:
+        tokens.update(stems(option))
+    return tokens
+
+
+class MinHasher:
+    """Подписи MinHash и ключи полос LSH для пакетов вопросов
+
+    Параметры определяются seed, поэтому подписи, посчитанные в процессах
+    импорта, совместимы с индексом.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=SEED):
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # a < 2**31 и x < 2**32: a * x + b не переполняет uint64
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self.mix = rng.integers(1, 1 << 63, self.rows, dtype=np.uint64) | \
+            np.uint64(1)
+
+    def signatures(self, items):
+        """Для пар (текст, варианты): ключи полос (n × bands, uint64)
+        и младшие байты подписей (n × num_perm, uint8)"""
+        keys = []
+        low_bytes = []
+        items = list(items)
+        for start in range(0, len(items), _BATCH):
+            batch_keys, batch_bytes = self._signatures(items[start:start + _BATCH])
+            keys.append(batch_keys)
+            low_bytes.append(batch_bytes)
+        if not keys:
+            return (np.empty((0, self.bands), np.uint64),
+                    np.empty((0, self.num_perm), np.uint8))
+        return np.concatenate(keys), np.concatenate(low_bytes)
+
+    def _signatures(self, items):
+        hashes = []
+        offsets = []
+        for text, options in items:
+            offsets.append(len(hashes))
+            # У вопроса без слов одно пустое слово, чтобы у reduceat
+            # не было пустых отрезков
+            hashes.extend(zlib.crc32(token.encode('utf-8'))
+                          for token in question_tokens(text, options) or ('',))
+        hashes = np.array(hashes, np.uint64)
+        permuted = (hashes[:, None] * self.a + self.b) % _PRIME
+        signature = np.minimum.reduceat(permuted, offsets, axis=0)
+
+        # Ключ полосы — многочлен от ее строк по модулю 2**64
+        keys = (signature.reshape(len(items), self.bands, self.rows) *
+                self.mix).sum(axis=2, dtype=np.uint64)
+        return keys, (signature & np.uint64(0xFF)).astype(np.uint8)
+
+
+class NearDuplicateIndex:
+    """Индекс почти одинаковых вопросов с пополнением пакетами
+
+    На вопрос хранятся id, младшие байты подписи (num_perm байт) и по ключу
+    на полосу; полная подпись не нужна.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD,
+                 seed=SEED):
+        self.hasher = MinHasher(num_perm, bands, seed)
+        self.threshold = threshold
+        self.ids = array.array('q')
+        self.parent = array.array('i')
+        self.known_ids = HashSet()
+        self._low_bytes = np.empty((0, num_perm), np.uint8)
+        # Для каждой полосы прогоны (ключи по возрастанию, позиции)
+        self.band_runs = [[] for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, questions):
+        """Добавить объекты Question, вернуть число новых связей"""
+        questions = list(questions)
+        keys, low_bytes = self.hasher.signatures(
+            (question.text, question.options) for question in questions)
+        return self.add_signatures([question.id for question in questions],
+                                   keys, low_bytes)
+
+    def add_signatures(self, ids, keys, low_bytes):
+        """Добавить готовые подписи; id, которые уже есть, пропускаются"""
+        ids = np.asarray(ids, np.int64)
+        fresh = self.known_ids.add_new(ids.view(np.uint64)) if len(ids) else ()
+        if not np.any(fresh):
+            return 0
+        ids, keys, low_bytes = ids[fresh], keys[fresh], low_bytes[fresh]
+
+        start = len(self.ids)
+        count = len(ids)
+        positions = np.arange(start, start + count, dtype=np.int64)
+        self.ids.extend(ids.tolist())
+        self.parent.extend(range(start, start + count))
+        self._append_low_bytes(low_bytes)
+
+        pairs = []
+        for band, runs in enumerate(self.band_runs):
+            order = np.argsort(keys[:, band], kind='stable')
+            band_keys = keys[order, band]
+            band_positions = positions[order]
+
+            # Внутри пакета: каждый вопрос корзины — к первому в ней
+            first = np.ones(count, bool)
+            first[1:] = band_keys[1:] != band_keys[:-1]
+            leader = np.maximum.accumulate(np.where(first, np.arange(count), 0))
+            pairs.append((band_positions[~first],
+                          band_positions[leader[~first]]))
+
+            # Первые в корзинах пакета — к первому найденному из прежних
+            leader_keys = band_keys[first]
+            leader_positions = band_positions[first]
+            for run_keys, run_positions in runs:
+                places = np.searchsorted(run_keys, leader_keys)
+                found = places < len(run_keys)
+                found[found] = run_keys[places[found]] == leader_keys[found]
+                pairs.append((leader_positions[found],
+                              run_positions[places[found]]))
+
+            self._add_run(runs, band_keys, band_positions)
+
+        return self._link(np.concatenate([a for a, _ in pairs]),
+                          np.concatenate([b for _, b in pairs]))
+
+    def _append_low_bytes(self, low_bytes):
+        used = len(self.ids) - len(low_bytes)
+        if len(self.ids) > len(self._low_bytes):
+            # Емкость растет вдвое, как у list
+            grown = np.empty((max(len(self.ids), 2 * len(self._low_bytes)),
+                              self.hasher.num_perm), np.uint8)
+            grown[:used] = self._low_bytes[:used]
+            self._low_bytes = grown
+        self._low_bytes[used:len(self.ids)] = low_bytes
+
+    @staticmethod
+    def _add_run(runs, keys, positions):
+        """Добавить прогон и слить прогоны, как разряды двоичного счетчика"""
+        while runs and len(runs[-1][0]) <= len(keys):
+            old_keys, old_positions = runs.pop()
+            keys = np.concatenate((old_keys, keys))
+            positions = np.concatenate((old_positions, positions))
+            order = np.argsort(keys, kind='stable')
+            keys, positions = keys[order], positions[order]
+        if len(keys):
+            runs.append((keys, positions))
+
+    def similarity(self, first, second):
+        """Оценка сходства Жаккара для массивов позиций
+
+        Младший байт совпадает и случайно (1/256), это вычитается.
+        """
+        matches = (self._low_bytes[first] == self._low_bytes[second]).mean(axis=1)
+        return (matches - 1 / 256) / (1 - 1 / 256)
+
+    def _link(self, first, second):
+        if not len(first):
+            return 0
+        # Одна пара могла найтись в нескольких полосах
+        pairs = np.unique(np.stack((first, second), axis=1), axis=0)
+        pairs = pairs[self.similarity(pairs[:, 0], pairs[:, 1]) >= self.threshold]
+        linked = 0
+        for a, b in pairs.tolist():
+            root_a, root_b = self._find(a), self._find(b)
+            if root_a != root_b:
+                self.parent[max(root_a, root_b)] = min(root_a, root_b)
+                linked += 1
+        return linked
+
+    def _find(self, position):
+        parent = self.parent
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    def query(self, text, options):
+        """id проиндексированных вопросов, почти одинаковых с данным"""
+        keys, low_bytes = self.hasher.signatures([(text, options)])
+        candidates = set()
+        for band, runs in enumerate(self.band_runs):
+            key = keys[0, band]
+            for run_keys, run_positions in runs:
+                lo = np.searchsorted(run_keys, key, 'left')
+                hi = np.searchsorted(run_keys, key, 'right')
+                candidates.update(run_positions[lo:hi].tolist())
+        if not candidates:
+            return []
+        positions = np.array(sorted(candidates))
+        matches = (self._low_bytes[positions] == low_bytes[0]).mean(axis=1)
+        similar = (matches - 1 / 256) / (1 - 1 / 256) >= self.threshold
+        return [self.ids[position] for position in positions[similar].tolist()]
+
+    def clusters(self):
+        """Кластеры почти одинаковых вопросов: списки id, крупные первыми"""
+        groups = {}
+        for position, parent in enumerate(self.parent):
+            if parent != position:
+                root = self._find(position)
+                groups.setdefault(root, [self.ids[root]]).append(
+                    self.ids[position])
+        return sorted(groups.values(), key=len, reverse=True)
+
+    def save(self, path):
+        """Сохранить индекс в файл .npz (без pickle), прогоны полос сливаются"""
+        bands = {}
+        for band, runs in enumerate(self.band_runs):
+            keys = np.concatenate([keys for keys, _ in runs] or
+                                  [np.empty(0, np.uint64)])
+            positions = np.concatenate([positions for _, positions in runs] or
+                                       [np.empty(0, np.int64)])
+            order = np.argsort(keys, kind='stable')
+            self.band_runs[band] = [(keys[order], positions[order])] \
+                if len(keys) else []
+            bands['keys{}'.format(band)] = keys[order]
+            bands['positions{}'.format(band)] = positions[order]
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, params=np.array([self.hasher.num_perm,
+                                         self.hasher.bands, self.hasher.seed]),
+                     threshold=np.array(self.threshold),
+                     ids=np.array(self.ids, np.int64),
+                     parent=np.array(self.parent, np.int32),
+                     low_bytes=self._low_bytes[:len(self.ids)], **bands)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Загрузить индекс, сохраненный save"""
+        with np.load(path, allow_pickle=False) as data:
+            num_perm, bands, seed = data['params'].tolist()
+            index = cls(num_perm, bands, float(data['threshold']), seed)
+            ids = data['ids']
+            index.ids.extend(ids.tolist())
+            index.parent.extend(data['parent'].tolist())
+            index.known_ids.add_new(ids.view(np.uint64))
+            index._low_bytes = data['low_bytes']
+            for band in range(bands):
+                keys = data['keys{}'.format(band)]
+                if len(keys):
+                    index.band_runs[band].append(
+                        (keys, data['positions{}'.format(band)]))
+        return index
+
+
+def main():
+    """Найти кластеры почти одинаковых вопросов банка"""
+    from question_cache import load_question_store
+
+    parser = argparse.ArgumentParser(
+        description="Почти одинаковые вопросы в банке (MinHash/LSH)")
+    parser.add_argument('questions', nargs='?', default='questions.json')
+    parser.add_argument('--index', help="файл индекса: читается, если есть, "
+                                        "пополняется и сохраняется")
+    parser.add_argument('--threshold', type=float, default=None)
+    parser.add_argument('--show', type=int, default=20,
+                        help="сколько кластеров напечатать")
+    args = parser.parse_args()
+
+    if args.index and os.path.exists(args.index):
+        index = NearDuplicateIndex.load(args.index)
+    else:
+        index = NearDuplicateIndex()
+    if args.threshold is not None:
+        index.threshold = args.threshold
+
+    store = load_question_store(args.questions)
+    batch = []
+    for question in store:
+        batch.append(question)
+        if len(batch) >= 100000:
+            index.add(batch)
+            batch = []
+    index.add(batch)
+    if args.index:
+        index.save(args.index)
+
+    clusters = index.clusters()
+    print("Вопросов {}, кластеров почти одинаковых: {}".format(
+        len(index), len(clusters)))
+    for cluster in clusters[:args.show]:
+        print()
+        for question_id in cluster:
+            question = store.get_by_id(question_id)
+            print("  {:>8}  {}".format(question_id,
+                                       question.text if question else "?"))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Хранилище вопросов с индексом на диске для игры 'Кто хочет стать миллионером'
+Объекты Question создаются только тогда, когда вопрос действительно нужен
+"""
+
+import array
+import codecs
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import threading
+
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'QIDX'
+INDEX_VERSION = 1
+
+_INDEX_PREAMBLE = struct.Struct('<4sHI')
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def digest_ids(ids):
+    """Отпечаток (8 байт) столбца id: по нему сохранения игр сверяют банк"""
+    return hashlib.blake2b(ids.tobytes(), digest_size=8).digest()
+
+
+def build_groups(levels, difficulty_codes):
+    """Упорядочить позиции по (level, difficulty) и найти границы групп"""
+    order = sorted(range(len(levels)),
+                   key=lambda i: (levels[i], difficulty_codes[i]))
+
+    groups = {}
+    start = 0
+    for i in range(1, len(order) + 1):
+        if i == len(order) or \
+                (levels[order[i]], difficulty_codes[order[i]]) != \
+                (levels[order[start]], difficulty_codes[order[start]]):
+            key = (levels[order[start]], difficulty_codes[order[start]])
+            groups[key] = (start, i)
+            start = i
+    return array.array('I', order), groups
+
+
+class _JsonStream:
+    """Потоковое чтение JSON с учетом байтовых смещений"""
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.byte_pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Дочитать следующий кусок файла в буфер"""
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            text = self.text_decoder.decode(b'', final=True)
+        else:
+            text = self.text_decoder.decode(data)
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return bool(data)
+
+    def advance(self, new_pos):
+        """Сдвинуть позицию с пересчетом смещения в байтах"""
+        self.byte_pos += len(self.buf[self.pos:new_pos].encode('utf-8'))
+        self.pos = new_pos
+
+    def skip_whitespace(self):
+        """Пропустить пробелы, при необходимости дочитывая файл"""
+        while True:
+            end = _WHITESPACE.match(self.buf, self.pos).end()
+            self.advance(end)
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def peek(self):
+        """Текущий значимый символ или пустая строка в конце файла"""
+        self.skip_whitespace()
+        if self.pos < len(self.buf):
+            return self.buf[self.pos]
+        return ''
+
+    def expect(self, char):
+        """Проверить и пропустить ожидаемый символ"""
+        if self.peek() != char:
+            raise json.JSONDecodeError(
+                "Ожидался символ '{}'".format(char), self.buf, self.pos
+            )
+        self.advance(self.pos + 1)
+
+    def decode(self):
+        """Разобрать одно значение, вернуть его и длину в байтах"""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # Число на границе буфера могло оборваться
+            if end == len(self.buf) and self.fill():
+                continue
+            start_byte = self.byte_pos
+            self.advance(end)
+            return value, self.byte_pos - start_byte
+
+
+def scan_bank(f, on_question):
+    """Потоково пройти файл банка, вызывая on_question(данные, смещение, длина)
+
+    Возвращает остальные поля верхнего уровня (например, prize_ladder).
+    """
+    stream = _JsonStream(f)
+    other = {}
+
+    stream.expect('{')
+    while stream.peek() != '}':
+        key, _ = stream.decode()
+        stream.expect(':')
+        if key == 'questions':
+            stream.expect('[')
+            while stream.peek() != ']':
+                offset = stream.byte_pos
+                q_data, length = stream.decode()
+                on_question(q_data, offset, length)
+                if stream.peek() == ',':
+                    stream.advance(stream.pos + 1)
+            stream.expect(']')
+            other[key] = None
+        else:
+            other[key], _ = stream.decode()
+        if stream.peek() == ',':
+            stream.advance(stream.pos + 1)
+    stream.expect('}')
+
+    if 'questions' not in other:
+        raise KeyError('questions')
+    del other['questions']
+    return other
+
+
+class QuestionBank:
+    """Банк вопросов с ленивым созданием объектов Question"""
+
+    def __init__(self, questions_file, question_class=None, index_file=None):
+        if question_class is None:
+            from game_logic import Question as question_class
+
+        self.questions_file = questions_file
+        self.index_file = index_file or questions_file + INDEX_SUFFIX
+        self.question_class = question_class
+
+        self.prize_ladder = []
+        self.difficulties = []
+        self.ids = array.array('q')
+        self.levels = array.array('i')
+        self.difficulty_codes = array.array('B')
+        self.offsets = array.array('Q')
+        self.lengths = array.array('I')
+        # Позиции, упорядоченные по id и по (level, difficulty)
+        self.id_order = array.array('I')
+        self.group_order = array.array('I')
+        self.groups = {}
+
+        self._file = open(self.questions_file, 'rb')
+        self._lock = threading.Lock()
+
+        stat = os.fstat(self._file.fileno())
+        self._source_key = [stat.st_size, stat.st_mtime_ns]
+
+        if not self._load_index():
+            self._build_index()
+            self._save_index()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self.offsets)
+        if not 0 <= position < len(self.offsets):
+            raise IndexError("Нет вопроса с позицией {}".format(position))
+        return self._materialize(position)
+
+    def __iter__(self):
+        for position in range(len(self.offsets)):
+            yield self._materialize(position)
+
+    def close(self):
+        """Закрыть файл с вопросами"""
+        self._file.close()
+
+    def read_raw(self, position):
+        """Прочитать JSON одного вопроса как байты"""
+        with self._lock:
+            self._file.seek(self.offsets[position])
+            return self._file.read(self.lengths[position])
+
+    def _materialize(self, position):
+        """Создать объект Question для позиции"""
+        q_data = json.loads(self.read_raw(position))
+        return self.question_class(
+            q_data['id'],
+            q_data['level'],
+            q_data['text'],
+            q_data['options'],
+            q_data['correct'],
+            q_data['difficulty']
+        )
+
+    def find_position(self, question_id):
+        """Позиция вопроса по id или None"""
+        ids = self.ids
+        order = self.id_order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ids[order[mid]] < question_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and ids[order[lo]] == question_id:
+            return order[lo]
+        return None
+
+    @property
+    def ids_digest(self):
+        return digest_ids(self.ids)
+
+    def get_by_id(self, question_id):
+        """Получить вопрос по id"""
+        position = self.find_position(question_id)
+        if position is None:
+            return None
+        return self._materialize(position)
+
+    def get_levels(self):
+        """Список уровней, для которых есть вопросы"""
+        return sorted({level for level, _ in self.groups})
+
+    def positions(self, level=None, difficulty=None):
+        """Позиции вопросов с заданным уровнем и сложностью"""
+        if level is None and difficulty is None:
+            return array.array('I', range(len(self.offsets)))
+        if difficulty is not None and difficulty not in self.difficulties:
+            return array.array('I')
+        code = None if difficulty is None else self.difficulties.index(difficulty)
+
+        result = array.array('I')
+        for (g_level, g_code), (start, end) in sorted(self.groups.items()):
+            if level is not None and g_level != level:
+                continue
+            if code is not None and g_code != code:
+                continue
+            result.extend(self.group_order[start:end])
+        return result
+
+    def _build_index(self):
+        """Построить индекс одним потоковым проходом по файлу"""
+        difficulty_codes = {}
+
+        def add_question(q_data, offset, length):
+            difficulty = q_data['difficulty']
+            if difficulty not in difficulty_codes:
+                difficulty_codes[difficulty] = len(self.difficulties)
+                self.difficulties.append(difficulty)
+
+            self.ids.append(q_data['id'])
+            self.levels.append(q_data['level'])
+            self.difficulty_codes.append(difficulty_codes[difficulty])
+            self.offsets.append(offset)
+            self.lengths.append(length)
+
+        other = scan_bank(self._file, add_question)
+        self.prize_ladder = other['prize_ladder']
+
+        self.id_order = array.array(
+            'I', sorted(range(len(self.ids)), key=self.ids.__getitem__)
+        )
+        self.group_order, self.groups = build_groups(
+            self.levels, self.difficulty_codes
+        )
+
+    def _index_arrays(self):
+        return [self.ids, self.levels, self.difficulty_codes, self.offsets,
+                self.lengths, self.id_order, self.group_order]
+
+    def _save_index(self):
+        """Сохранить индекс рядом с файлом вопросов"""
+        header = json.dumps({
+            'source': self._source_key,
+            'byteorder': sys.byteorder,
+            'count': len(self.offsets),
+            'difficulties': self.difficulties,
+            'prize_ladder': self.prize_ladder,
+            'groups': [[level, code, start, end] for (level, code), (start, end)
+                       in self.groups.items()]
+        }, ensure_ascii=False).encode('utf-8')
+
+        tmp_file = self.index_file + '.tmp'
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(_INDEX_PREAMBLE.pack(INDEX_MAGIC, INDEX_VERSION, len(header)))
+                f.write(header)
+                for column in self._index_arrays():
+                    column.tofile(f)
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            # Каталог только для чтения: работаем с индексом в памяти
+            pass
+
+    def _load_index(self):
+        """Загрузить индекс, если он соответствует файлу вопросов"""
+        try:
+            with open(self.index_file, 'rb') as f:
+                magic, version, header_len = _INDEX_PREAMBLE.unpack(
+                    f.read(_INDEX_PREAMBLE.size)
+                )
+                if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                    return False
+                header = json.loads(f.read(header_len))
+                if header['source'] != self._source_key or \
+                        header['byteorder'] != sys.byteorder:
+                    return False
+
+                count = header['count']
+                for column in self._index_arrays():
+                    column.fromfile(f, count)
+        except (OSError, EOFError, ValueError, KeyError, struct.error):
+            for column in self._index_arrays():
+                del column[:]
+            return False
+
+        self.difficulties = header['difficulties']
+        self.prize_ladder = header['prize_ladder']
+        self.groups = {(level, code): (start, end)
+                       for level, code, start, end in header['groups']}
+        return True
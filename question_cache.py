@@ -0,0 +1,342 @@
+"""
+Скомпилированный двоичный кэш банка вопросов с доступом через mmap
+Записи фиксированной длины ссылаются на общую кучу строк в UTF-8
+
+Компиляция вручную: python question_cache.py questions.json
+"""
+
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from question_bank import QuestionBank, build_groups, digest_ids, scan_bank
+
+
+CACHE_SUFFIX = '.qbc'
+CACHE_MAGIC = b'QBC1'
+CACHE_VERSION = 2
+
+# magic, версия, порядок байт (0 - little), число вопросов,
+# размер и mtime источника, sha256 источника,
+# смещения: кучи, записей, порядка по id, порядка по группам, метаданных
+_HEADER = struct.Struct('<4sHHIQq32sQQQQQI')
+# Смещение mtime источника в заголовке
+_MTIME_OFFSET = struct.calcsize('<4sHHIQ')
+# id, level, correct, difficulty, смещение в куче, длина текста, длины 4 вариантов
+_RECORD = struct.Struct('<qiBBxxQI4H')
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 файла, читаемого кусками"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def compile_bank(questions_file, cache_file=None):
+    """Скомпилировать questions.json в двоичный кэш, вернуть путь к нему"""
+    cache_file = cache_file or questions_file + CACHE_SUFFIX
+    # Свое имя у каждого процесса и потока: одновременные сборки не пишут
+    # в один временный файл, и os.replace ставит целый кэш одной из них
+    tmp_file = '{}.{}.{}.tmp'.format(cache_file, os.getpid(),
+                                     threading.get_ident())
+
+    try:
+        _write_cache(questions_file, tmp_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, cache_file)
+    return cache_file
+
+
+def _write_cache(questions_file, tmp_file):
+    """Записать содержимое кэша во временный файл"""
+    records = bytearray()
+    ids = array.array('q')
+    levels = array.array('i')
+    difficulty_codes = array.array('B')
+    difficulties = []
+    codes = {}
+
+    with open(questions_file, 'rb') as source, open(tmp_file, 'wb') as out:
+        stat = os.fstat(source.fileno())
+        out.write(bytes(_HEADER.size))
+        heap_offset = out.tell()
+        heap_pos = 0
+
+        def add_question(q_data, offset, length):
+            nonlocal heap_pos
+            difficulty = q_data['difficulty']
+            if difficulty not in codes:
+                codes[difficulty] = len(difficulties)
+                difficulties.append(difficulty)
+
+            text = q_data['text'].encode('utf-8')
+            options = [option.encode('utf-8') for option in q_data['options']]
+            if len(options) != 4:
+                raise ValueError(
+                    "У вопроса {} должно быть 4 варианта ответа".format(q_data['id'])
+                )
+
+            records.extend(_RECORD.pack(
+                q_data['id'], q_data['level'], q_data['correct'],
+                codes[difficulty], heap_pos, len(text),
+                *(len(option) for option in options)
+            ))
+            out.write(text)
+            out.write(b''.join(options))
+            heap_pos += len(text) + sum(len(option) for option in options)
+
+            ids.append(q_data['id'])
+            levels.append(q_data['level'])
+            difficulty_codes.append(codes[difficulty])
+
+        other = scan_bank(source, add_question)
+
+        records_offset = out.tell()
+        out.write(records)
+
+        id_order_offset = out.tell()
+        array.array('I', sorted(range(len(ids)), key=ids.__getitem__)).tofile(out)
+
+        group_order, groups = build_groups(levels, difficulty_codes)
+        group_order_offset = out.tell()
+        group_order.tofile(out)
+
+        meta = json.dumps({
+            'difficulties': difficulties,
+            'prize_ladder': other['prize_ladder'],
+            'ids_digest': digest_ids(ids).hex(),
+            'groups': [[level, code, start, end]
+                       for (level, code), (start, end) in groups.items()]
+        }, ensure_ascii=False).encode('utf-8')
+        meta_offset = out.tell()
+        out.write(meta)
+
+        out.seek(0)
+        out.write(_HEADER.pack(
+            CACHE_MAGIC, CACHE_VERSION, 0 if sys.byteorder == 'little' else 1,
+            len(ids), stat.st_size, stat.st_mtime_ns,
+            file_sha256(questions_file), heap_offset, records_offset,
+            id_order_offset, group_order_offset, meta_offset, len(meta)
+        ))
+
+
+def read_cache_header(cache_file):
+    """Заголовок кэша как словарь или None, если файл не подходит"""
+    try:
+        with open(cache_file, 'rb') as f:
+            fields = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+
+    names = ('magic', 'version', 'byteorder', 'count', 'source_size',
+             'source_mtime_ns', 'source_sha256', 'heap_offset',
+             'records_offset', 'id_order_offset', 'group_order_offset',
+             'meta_offset', 'meta_length')
+    header = dict(zip(names, fields))
+    if header['magic'] != CACHE_MAGIC or header['version'] != CACHE_VERSION or \
+            header['byteorder'] != (0 if sys.byteorder == 'little' else 1):
+        return None
+    return header
+
+
+def is_cache_fresh(questions_file, cache_file, verify='mtime'):
+    """Соответствует ли кэш файлу вопросов
+
+    verify='mtime' сверяет размер и время изменения,
+    verify='hash' дополнительно принимает кэш с тем же SHA-256 содержимого
+    и запоминает в нем новое время изменения: следующей проверке
+    хэш уже не нужен.
+    """
+    header = read_cache_header(cache_file)
+    if header is None:
+        return False
+    stat = os.stat(questions_file)
+    if header['source_size'] != stat.st_size:
+        return False
+    if header['source_mtime_ns'] == stat.st_mtime_ns:
+        return True
+    if verify != 'hash' or \
+            header['source_sha256'] != file_sha256(questions_file):
+        return False
+    try:
+        with open(cache_file, 'r+b') as f:
+            f.seek(_MTIME_OFFSET)
+            f.write(struct.pack('<q', stat.st_mtime_ns))
+    except OSError:
+        # Кэш только для чтения: он верен, просто хэш посчитается снова
+        pass
+    return True
+
+
+class CompiledQuestionBank:
+    """Банк вопросов поверх mmap скомпилированного кэша"""
+
+    def __init__(self, cache_file, question_class=None):
+        if question_class is None:
+            from game_logic import Question as question_class
+
+        header = read_cache_header(cache_file)
+        if header is None:
+            raise ValueError("Файл {} не является кэшем вопросов".format(cache_file))
+
+        self.cache_file = cache_file
+        self.question_class = question_class
+        self.header = header
+        self._count = header['count']
+
+        with open(cache_file, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        self._heap = self._view[header['heap_offset']:header['records_offset']]
+        self._records = self._view[header['records_offset']:
+                                   header['id_order_offset']]
+        self.id_order = self._view[header['id_order_offset']:
+                                   header['group_order_offset']].cast('I')
+        self.group_order = self._view[header['group_order_offset']:
+                                      header['meta_offset']].cast('I')
+
+        meta_end = header['meta_offset'] + header['meta_length']
+        meta = json.loads(bytes(self._view[header['meta_offset']:meta_end]))
+        self.difficulties = meta['difficulties']
+        self.prize_ladder = meta['prize_ladder']
+        # Отпечаток id из кэша: столбец id для него не читается
+        self.ids_digest = bytes.fromhex(meta['ids_digest'])
+        self.groups = {(level, code): (start, end)
+                       for level, code, start, end in meta['groups']}
+
+        self._columns = None
+        self._columns_lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("Нет вопроса с позицией {}".format(position))
+        return self._materialize(position)
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._materialize(position)
+
+    def close(self):
+        """Освободить отображение файла"""
+        self.id_order.release()
+        self.group_order.release()
+        self._heap.release()
+        self._records.release()
+        self._view.release()
+        self._mmap.close()
+
+    def record(self, position):
+        """Заголовок записи: id, level, correct, код сложности, смещение, длины"""
+        return _RECORD.unpack_from(self._records, position * _RECORD.size)
+
+    def _materialize(self, position):
+        """Создать Question, декодируя строки прямо из отображенной кучи"""
+        (question_id, level, correct, code, offset,
+         text_len, *option_lens) = self.record(position)
+
+        heap = self._heap
+        end = offset + text_len
+        text = str(heap[offset:end], 'utf-8')
+        options = []
+        for length in option_lens:
+            options.append(str(heap[end:end + length], 'utf-8'))
+            end += length
+
+        return self.question_class(question_id, level, text, options,
+                                   correct, self.difficulties[code])
+
+    def find_position(self, question_id):
+        """Позиция вопроса по id или None"""
+        order = self.id_order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.record(order[mid])[0] < question_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and self.record(order[lo])[0] == question_id:
+            return order[lo]
+        return None
+
+    def get_by_id(self, question_id):
+        """Получить вопрос по id"""
+        position = self.find_position(question_id)
+        if position is None:
+            return None
+        return self._materialize(position)
+
+    def get_levels(self):
+        """Список уровней, для которых есть вопросы"""
+        return sorted({level for level, _ in self.groups})
+
+    def _load_columns(self):
+        """Колонки id/level/сложность, собираются при первом обращении"""
+        with self._columns_lock:
+            if self._columns is None:
+                ids = array.array('q')
+                levels = array.array('i')
+                codes = array.array('B')
+                for record in _RECORD.iter_unpack(self._records):
+                    ids.append(record[0])
+                    levels.append(record[1])
+                    codes.append(record[3])
+                self._columns = (ids, levels, codes)
+        return self._columns
+
+    @property
+    def ids(self):
+        return self._load_columns()[0]
+
+    @property
+    def levels(self):
+        return self._load_columns()[1]
+
+    @property
+    def difficulty_codes(self):
+        return self._load_columns()[2]
+
+
+def load_question_store(questions_file, verify='mtime'):
+    """Открыть банк вопросов через двоичный кэш, при необходимости собрав его
+
+    Если кэш нельзя записать (каталог только для чтения),
+    используется QuestionBank с индексом по JSON.
+    """
+    cache_file = questions_file + CACHE_SUFFIX
+    if not is_cache_fresh(questions_file, cache_file, verify):
+        try:
+            compile_bank(questions_file, cache_file)
+        except OSError:
+            if not os.path.exists(questions_file):
+                raise
+            return QuestionBank(questions_file)
+    return CompiledQuestionBank(cache_file)
+
+
+def main():
+    """Скомпилировать кэш для файлов из командной строки"""
+    for questions_file in sys.argv[1:] or ['questions.json']:
+        cache_file = compile_bank(questions_file)
+        print("{} -> {}".format(questions_file, cache_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Общее для модулей банка вопросов (импорт, поиск, проверка, похожие
+вопросы): допустимые сложности, глубина очереди процессов и множество
+64-битных хэшей
+"""
+
+import numpy as np
+
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Кусков в обработке одновременно на процесс: очередь ограничена,
+# и память не растет, если главный процесс не успевает за рабочими
+MAX_PENDING_PER_WORKER = 2
+
+
+class HashSet:
+    """Множество 64-битных хэшей в отсортированных массивах NumPy
+
+    Новые хэши складываются отдельным прогоном, прогоны сливаются, как
+    разряды двоичного счетчика, поэтому прогонов не больше log2(n),
+    а на хэш уходит 8 байт вместо объекта int в set.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def add_new(self, hashes):
+        """Добавить хэши, вернуть маску тех, которых еще не было
+
+        Из одинаковых хэшей пакета новым считается первый.
+        """
+        hashes = np.asarray(hashes, np.uint64)
+        unique, first = np.unique(hashes, return_index=True)
+        fresh = np.ones(len(unique), bool)
+        for run in self.runs:
+            places = np.searchsorted(run, unique)
+            found = places < len(run)
+            found[found] = run[places[found]] == unique[found]
+            fresh &= ~found
+
+        mask = np.zeros(len(hashes), bool)
+        mask[first[fresh]] = True
+        run = unique[fresh]
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.concatenate((self.runs.pop(), run))
+            run.sort()
+        if len(run):
+            self.runs.append(run)
+        return mask
@@ -0,0 +1,181 @@
+"""
+Готовые колоды вопросов для мгновенного начала игры
+
+Колода — готовые объекты Question для всех уровней призовой лестницы,
+выбранные заранее тем же QuestionSelector. Фоновый поток держит ограниченный запас
+колод, и GameState.start_new_game берет готовую колоду за O(1) вместо
+выбора вопроса на каждом уровне.
+"""
+
+import collections
+import random
+import threading
+import time
+
+from question_selector import SeenQuestions
+
+
+# Запас пополняется, когда в нем остается меньше этой доли колод
+DEFAULT_LOW_WATER = 0.5
+
+
+class DeckBuilder:
+    """Собирает колоды без повторов вопросов между колодами
+
+    Повторы отслеживаются общим для всех колод SeenQuestions: вопрос уровня
+    попадет в колоду снова, только когда покажут все вопросы его корзины.
+    Вопросы создаются из банка сразу при сборке, а не в начале игры.
+    difficulties задает сложность для уровня ({уровень: 'easy'}); если
+    вопросов такой сложности нет, берется любой вопрос уровня.
+    """
+
+    def __init__(self, bank, difficulties=None, rng=None):
+        self.bank = bank
+        self.difficulties = difficulties or {}
+        self.rng = rng or random.Random()
+        self.seen = SeenQuestions()
+        self.levels = tuple(prize['level'] for prize in bank.prize_ladder)
+
+    def build(self):
+        """Новая колода: кортеж вопросов по уровням лестницы"""
+        selector = self.bank.selector
+        questions = self.bank.questions
+        deck = []
+        for level in self.levels:
+            difficulty = self.difficulties.get(level)
+            if difficulty is not None and \
+                    selector.level_size(level, difficulty) == 0:
+                difficulty = None
+            position = selector.draw(level, self.seen, difficulty, self.rng)
+            if position is None:
+                break
+            deck.append(questions[position])
+        return tuple(deck)
+
+
+class DeckPool:
+    """Ограниченный запас готовых колод с фоновым пополнением
+
+    pop() отдает колоду без ожидания. Если запас пуст (всплеск запросов
+    обогнал пополнение), pop() возвращает None и игра выбирает вопросы
+    по уровням, как без запаса; это считается промахом.
+    """
+
+    def __init__(self, bank, capacity=256, low_water=DEFAULT_LOW_WATER,
+                 difficulties=None, seed=None, history_size=10000):
+        self.builder = DeckBuilder(bank, difficulties, random.Random(seed))
+        self.capacity = capacity
+        self.low_water = max(1, int(capacity * low_water))
+        self.decks = collections.deque()
+        self.hits = 0
+        self.misses = 0
+        self.built = 0
+        # Время pop() в секундах и глубина запаса после него
+        self.pop_times = collections.deque(maxlen=history_size)
+        self.depths = collections.deque(maxlen=history_size)
+        # Запас, счетчики попаданий и история pop() меняются под _lock:
+        # pop() зовут потоки сервера, пополняет фоновый поток
+        self._lock = threading.Lock()
+        # Один SeenQuestions на все колоды: собирает только один поток
+        self._build_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = None
+
+    def _build(self):
+        with self._build_lock:
+            deck = self.builder.build()
+            self.built += 1
+        return deck
+
+    def fill(self, count=None):
+        """Собрать колоды в текущем потоке до capacity (или count штук)"""
+        if count is None:
+            with self._lock:
+                count = self.capacity - len(self.decks)
+        for _ in range(count):
+            deck = self._build()
+            with self._lock:
+                if len(self.decks) >= self.capacity:
+                    break
+                self.decks.append(deck)
+
+    def start(self):
+        """Запустить фоновое пополнение"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refill_loop,
+                                            name="deck-refill", daemon=True)
+            self._thread.start()
+        return self
+
+    def _refill_loop(self):
+        while True:
+            with self._lock:
+                while not self._closed and len(self.decks) >= self.low_water:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+            # Пополняем до полного запаса, а не до порога, чтобы поток
+            # просыпался реже
+            while True:
+                with self._lock:
+                    if self._closed or len(self.decks) >= self.capacity:
+                        break
+                deck = self._build()
+                with self._lock:
+                    self.decks.append(deck)
+                # Отдать GIL после каждой колоды: иначе start_new_game
+                # ждет его до конца интервала переключения (5 мс)
+                time.sleep(0)
+
+    def pop(self):
+        """Готовая колода или None, если запас пуст"""
+        started = time.perf_counter()
+        with self._lock:
+            deck = self.decks.popleft() if self.decks else None
+            depth = len(self.decks)
+            if depth < self.low_water:
+                self._wakeup.notify()
+            if deck is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.pop_times.append(time.perf_counter() - started)
+            self.depths.append(depth)
+        return deck
+
+    def close(self):
+        """Остановить фоновое пополнение"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """Глубина запаса, попадания и задержки pop() в микросекундах"""
+        with self._lock:
+            times = sorted(self.pop_times)
+            depth = len(self.decks)
+            min_depth = min(self.depths, default=depth)
+            hits, misses = self.hits, self.misses
+        with self._build_lock:
+            built = self.built
+
+        def percentile(fraction):
+            if not times:
+                return 0.0
+            return times[min(int(len(times) * fraction), len(times) - 1)] * 1e6
+
+        return {
+            'depth': depth,
+            'capacity': self.capacity,
+            'min_depth': min_depth,
+            'hits': hits,
+            'misses': misses,
+            'built': built,
+            'pop_p50_us': percentile(0.5),
+            'pop_p99_us': percentile(0.99),
+            'pop_max_us': times[-1] * 1e6 if times else 0.0,
+        }
@@ -0,0 +1,517 @@
+"""
+Массовый импорт вопросов из выгрузок редакторов (CSV и JSONL)
+в формат questions.json
+
+Файлы читаются кусками по целым строкам, куски обрабатывают процессы
+конвейера: разбор, проверка, нормализация и хэш для поиска дублей.
+Главный процесс отбрасывает дубли, назначает id и уровни и сразу
+дописывает вопросы в выходной файл, поэтому память не растет с размером
+выгрузок (кроме 8 байт хэша на вопрос).
+
+CSV: заголовок text,option1,option2,option3,option4,correct,difficulty
+и необязательный level. JSONL: по объекту на строку с полями как
+в questions.json. correct — номер 0–3 или буква A–D / А–Г.
+
+Запуск:
+    python question_import.py --base questions.json -o questions.json dump.csv dump.jsonl
+"""
+
+import argparse
+import collections
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import time
+
+from question_common import DIFFICULTIES, MAX_PENDING_PER_WORKER, HashSet
+from question_text import match_key, normalize_text
+
+
+# Строк в одном куске конвейера
+CHUNK_ROWS = 20000
+
+CSV_FIELDS = ('text', 'option1', 'option2', 'option3', 'option4',
+              'correct', 'difficulty')
+
+DIFFICULTY_ALIASES = {
+    'easy': 'easy', 'легкий': 'easy', 'лёгкий': 'easy', 'легко': 'easy',
+    'medium': 'medium', 'средний': 'medium', 'средне': 'medium',
+    'hard': 'hard', 'сложный': 'hard', 'трудный': 'hard', 'сложно': 'hard',
+}
+ANSWER_LETTERS = {letter: index for index, letters in enumerate(
+    ('Aa', 'Bb', 'Cc', 'Dd')) for letter in letters}
+ANSWER_LETTERS.update({letter: index for index, letters in enumerate(
+    ('Аа', 'Бб', 'Вв', 'Гг')) for letter in letters})
+
+STAGES = ('read', 'parse', 'validate', 'normalize', 'hash', 'minhash',
+          'dedup', 'write', 'near', 'words', 'search')
+
+
+def question_hash(text, options):
+    """64-битный хэш вопроса; порядок вариантов ответа не важен"""
+    key = '\x1f'.join([match_key(text)] +
+                      sorted(match_key(option) for option in options))
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'),
+                                          digest_size=8).digest(), 'little')
+
+
+def _parse_rows(kind, payload, header):
+    """Разобрать кусок: список (номер строки, словарь или None, ошибка)"""
+    rows = []
+    if kind == 'records':
+        line, records = payload
+        for offset, record in enumerate(records):
+            rows.append((line + offset, record, None))
+    elif kind == 'jsonl':
+        line, text = payload
+        for offset, raw in enumerate(text.splitlines()):
+            if not raw.strip():
+                continue
+            try:
+                rows.append((line + offset, json.loads(raw), None))
+            except json.JSONDecodeError as e:
+                rows.append((line + offset, None, "JSON: {}".format(e.msg)))
+    else:
+        line, text = payload
+        reader = csv.reader(io.StringIO(text))
+        row_line = line
+        for values in reader:
+            if values:
+                if len(values) != len(header):
+                    rows.append((row_line, None, "CSV: {} полей вместо {}".format(
+                        len(values), len(header))))
+                else:
+                    record = dict(zip(header, values))
+                    record['options'] = [record.pop('option{}'.format(i))
+                                         for i in range(1, 5)]
+                    rows.append((row_line, record, None))
+            row_line = line + reader.line_num
+    return rows
+
+
+def _validate(record, levels):
+    """Ошибка в записи или None"""
+    if not isinstance(record, dict):
+        return "запись не объект"
+    text = record.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return "нет текста вопроса"
+    options = record.get('options')
+    if not isinstance(options, list) or len(options) != 4:
+        return "должно быть 4 варианта ответа"
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        return "пустой вариант ответа"
+    correct = record.get('correct')
+    if isinstance(correct, str):
+        correct = correct.strip()
+        if correct not in ANSWER_LETTERS and correct not in ('0', '1', '2', '3'):
+            return "correct вне 0–3"
+    elif type(correct) is not int or not 0 <= correct <= 3:
+        return "correct вне 0–3"
+    difficulty = record.get('difficulty')
+    if not isinstance(difficulty, str) or \
+            difficulty.strip().casefold() not in DIFFICULTY_ALIASES:
+        return "неизвестная сложность"
+    level = record.get('level')
+    if level not in (None, ''):
+        try:
+            level = int(level)
+        except (TypeError, ValueError):
+            return "уровень не число"
+        if level not in levels:
+            return "уровня нет в призовой лестнице: {}".format(level)
+    return None
+
+
+def _normalize(record):
+    """Привести запись к полям questions.json; уровень 0, если не задан"""
+    correct = record['correct']
+    if isinstance(correct, str):
+        correct = ANSWER_LETTERS.get(correct.strip())
+        if correct is None:
+            correct = int(record['correct'])
+    level = record.get('level')
+    return {
+        'level': int(level) if level not in (None, '') else 0,
+        'id': record.get('id'),
+        'text': normalize_text(record['text']),
+        'options': [normalize_text(option) for option in record['options']],
+        'correct': correct,
+        'difficulty': DIFFICULTY_ALIASES[record['difficulty'].strip().casefold()],
+    }
+
+
+# MinHasher процесса-исполнителя по параметрам
+_hashers = {}
+
+
+def process_chunk(task):
+    """Кусок через этапы конвейера в процессе-исполнителе
+
+    Возвращает принятые вопросы (хэши, уровни, сложности, id, JSON без id
+    и уровня, подписи MinHash или None, слова для поиска или None),
+    отклоненные строки и время каждого этапа. near — параметры MinHasher,
+    если нужен индекс почти дублей; words — нужны ли слова для поиска.
+    """
+    kind, payload, header, levels, near, words = task
+    timings = {}
+
+    started = time.perf_counter()
+    rows = _parse_rows(kind, payload, header)
+    timings['parse'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rejected = []
+    valid = []
+    for line, record, error in rows:
+        if error is None:
+            error = _validate(record, levels)
+        if error is None:
+            valid.append(record)
+        else:
+            rejected.append((line, error))
+    timings['validate'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    normalized = [_normalize(record) for record in valid]
+    timings['normalize'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    hashes = [question_hash(q['text'], q['options']) for q in normalized]
+    timings['hash'] = time.perf_counter() - started
+
+    signatures = None
+    if near is not None:
+        started = time.perf_counter()
+        hasher = _hashers.get(near)
+        if hasher is None:
+            from near_duplicates import MinHasher
+            hasher = _hashers[near] = MinHasher(*near)
+        signatures = hasher.signatures(
+            (q['text'], q['options']) for q in normalized)
+        timings['minhash'] = time.perf_counter() - started
+
+    question_words = None
+    if words:
+        started = time.perf_counter()
+        from question_search import question_words as split_words
+        question_words = [split_words(q['text'], q['options'])
+                          for q in normalized]
+        timings['words'] = time.perf_counter() - started
+
+    accepted = (
+        hashes,
+        [q['level'] for q in normalized],
+        [q['difficulty'] for q in normalized],
+        [q['id'] for q in normalized],
+        [json.dumps({key: q[key] for key in
+                     ('text', 'options', 'correct', 'difficulty')},
+                    ensure_ascii=False)[1:] for q in normalized],
+        signatures,
+        question_words,
+    )
+    return len(rows), accepted, rejected, timings
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Куски файла по целым строкам: (вид, (номер первой строки, текст), заголовок)
+
+    Кусок CSV режется только при четном числе кавычек, чтобы не разорвать
+    значение с переводом строки внутри.
+    """
+    kind = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        header = None
+        line = 1
+        if kind == 'csv':
+            header = next(csv.reader([f.readline()]), [])
+            header = [name.strip() for name in header]
+            missing = [name for name in CSV_FIELDS if name not in header]
+            if missing:
+                raise ValueError("{}: нет столбцов {}".format(
+                    path, ", ".join(missing)))
+            line = 2
+
+        lines = []
+        quotes = 0
+        for raw in f:
+            lines.append(raw)
+            if kind == 'csv':
+                quotes += raw.count('"')
+            if len(lines) >= chunk_rows and not quotes & 1:
+                yield kind, (line, ''.join(lines)), header
+                line += len(lines)
+                lines = []
+                quotes = 0
+        if lines:
+            yield kind, (line, ''.join(lines)), header
+
+
+def read_base_chunks(store, chunk_rows=CHUNK_ROWS):
+    """Куски вопросов существующего банка, их id и уровни сохраняются"""
+    records = []
+    for position, question in enumerate(store):
+        records.append({
+            'id': question.id, 'level': question.level, 'text': question.text,
+            'options': list(question.options), 'correct': question.correct,
+            'difficulty': question.difficulty,
+        })
+        if len(records) >= chunk_rows:
+            yield 'records', (position + 2 - len(records), records), None
+            records = []
+    if records:
+        yield 'records', (len(store) + 1 - len(records), records), None
+
+
+def difficulty_bands(prize_ladder):
+    """Уровни лестницы для каждой сложности: первая треть easy и т.д."""
+    levels = [prize['level'] for prize in prize_ladder]
+    bands = {difficulty: [] for difficulty in DIFFICULTIES}
+    for i, level in enumerate(levels):
+        bands[DIFFICULTIES[min(i * 3 // len(levels), 2)]].append(level)
+    return {difficulty: band or levels for difficulty, band in bands.items()}
+
+
+class ImportStats:
+    """Строки и время по этапам конвейера"""
+
+    def __init__(self):
+        self.rows = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = collections.Counter()
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.wall = 0.0
+
+    def add_time(self, stage, seconds):
+        self.seconds[stage] += seconds
+
+    def report(self):
+        """Таблица: этап, время и строк в секунду (время исполнителей суммируется)"""
+        lines = ["{:<10} {:>10} {:>14}".format("этап", "с", "строк/с")]
+        for stage in STAGES:
+            seconds = self.seconds[stage]
+            if not seconds:
+                continue
+            lines.append("{:<10} {:>10.2f} {:>14,.0f}".format(
+                stage, seconds, self.rows / seconds if seconds else 0))
+        lines.append("всего {:,} строк за {:.2f} с ({:,.0f} строк/с): "
+                     "принято {:,}, дублей {:,}, отклонено {:,}".format(
+                         self.rows, self.wall,
+                         self.rows / self.wall if self.wall else 0,
+                         self.accepted, self.duplicates,
+                         sum(self.rejected.values())))
+        for error, count in self.rejected.most_common():
+            lines.append("  {:,} × {}".format(count, error))
+        return "\n".join(lines)
+
+
+def _timed(iterator, stats, stage):
+    """Отдавать элементы итератора, засчитывая время их получения этапу"""
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            stats.add_time(stage, time.perf_counter() - started)
+        yield item
+
+
+def import_questions(sources, output, base=None, prize_ladder=None,
+                     workers=None, rejects_file=None, chunk_rows=CHUNK_ROWS,
+                     near_index=None, search_index=None):
+    """Слить выгрузки sources (и банк base) в файл output, вернуть ImportStats
+
+    Вопросы base идут первыми и сохраняют свои id; новые получают id после
+    наибольшего. Уровень без значения назначается по кругу из уровней,
+    соответствующих сложности. output может совпадать с base: файл
+    заменяется только после успешного импорта. Принятые вопросы
+    добавляются в near_index (NearDuplicateIndex) и search_index
+    (QuestionSearchIndex), если они заданы; подписи и слова считают
+    процессы конвейера.
+    """
+    from question_cache import load_question_store
+
+    stats = ImportStats()
+    started = time.perf_counter()
+    store = load_question_store(base) if base else None
+    if prize_ladder is None:
+        if store is None:
+            raise ValueError("Нужен банк base или prize_ladder")
+        prize_ladder = store.prize_ladder
+    levels = frozenset(prize['level'] for prize in prize_ladder)
+    bands = difficulty_bands(prize_ladder)
+    band_next = dict.fromkeys(bands, 0)
+    near = None
+    if near_index is not None:
+        hasher = near_index.hasher
+        near = (hasher.num_perm, hasher.bands, hasher.seed)
+    words = search_index is not None
+
+    def tasks():
+        if store is not None:
+            for kind, payload, header in read_base_chunks(store, chunk_rows):
+                yield base, kind, payload, header
+        for path in sources:
+            for kind, payload, header in read_chunks(path, chunk_rows):
+                yield path, kind, payload, header
+
+    seen = HashSet()
+    next_id = 1
+    tmp_file = output + '.tmp'
+    workers = workers or os.cpu_count() or 1
+
+    def write_result(source, kind, result, out, rejects):
+        nonlocal next_id
+        rows, accepted, rejected, timings = result
+        for stage, seconds in timings.items():
+            stats.add_time(stage, seconds)
+        stats.rows += rows
+        for line, error in rejected:
+            stats.rejected[error.split(':')[0]] += 1
+            if rejects is not None:
+                rejects.write(json.dumps({'source': source, 'line': line,
+                                          'error': error},
+                                         ensure_ascii=False) + '\n')
+
+        (hashes, q_levels, difficulties, ids, bodies, signatures,
+         question_words) = accepted
+        dedup_started = time.perf_counter()
+        fresh = seen.add_new(hashes) if hashes else ()
+        stats.add_time('dedup', time.perf_counter() - dedup_started)
+
+        write_started = time.perf_counter()
+        parts = []
+        fresh_ids = []
+        fresh_levels = []
+        for i, is_fresh in enumerate(fresh):
+            if not is_fresh:
+                stats.duplicates += 1
+                continue
+            if kind == 'records':
+                question_id = ids[i]
+            else:
+                question_id = next_id
+            next_id = max(next_id, question_id + 1)
+            fresh_ids.append(question_id)
+            level = q_levels[i]
+            if not level:
+                band = bands[difficulties[i]]
+                level = band[band_next[difficulties[i]] % len(band)]
+                band_next[difficulties[i]] += 1
+            fresh_levels.append(level)
+            parts.append('{{"id": {}, "level": {}, {}'.format(
+                question_id, level, bodies[i]))
+        if parts:
+            out.write((',\n' if stats.accepted else '') + ',\n'.join(parts))
+            stats.accepted += len(parts)
+        stats.add_time('write', time.perf_counter() - write_started)
+
+        if signatures is not None and fresh_ids:
+            near_started = time.perf_counter()
+            keys, low_bytes = signatures
+            near_index.add_signatures(fresh_ids, keys[fresh], low_bytes[fresh])
+            stats.add_time('near', time.perf_counter() - near_started)
+
+        if question_words is not None and fresh_ids:
+            search_started = time.perf_counter()
+            fresh_positions = [i for i, is_fresh in enumerate(fresh) if is_fresh]
+            search_index.add_batch(
+                fresh_ids, [question_words[i] for i in fresh_positions],
+                fresh_levels, [difficulties[i] for i in fresh_positions])
+            stats.add_time('search', time.perf_counter() - search_started)
+
+    rejects = open(rejects_file, 'w', encoding='utf-8') if rejects_file else None
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as out, \
+                multiprocessing.Pool(workers) as pool:
+            out.write('{"questions": [\n')
+            pending = collections.deque()
+            for source, kind, payload, header in _timed(tasks(), stats, 'read'):
+                task = (kind, payload, header, levels, near, words)
+                pending.append((source, kind,
+                                pool.apply_async(process_chunk, (task,))))
+                # Не больше нескольких кусков на исполнителя в памяти
+                while len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                    source_, kind_, result = pending.popleft()
+                    write_result(source_, kind_, result.get(), out, rejects)
+            while pending:
+                source_, kind_, result = pending.popleft()
+                write_result(source_, kind_, result.get(), out, rejects)
+            out.write('\n], "prize_ladder": ')
+            json.dump([dict(prize) for prize in prize_ladder], out,
+                      ensure_ascii=False)
+            out.write('}\n')
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    finally:
+        if rejects is not None:
+            rejects.close()
+        if store is not None:
+            store.close()
+    os.replace(tmp_file, output)
+    stats.wall = time.perf_counter() - started
+    return stats
+
+
+def main():
+    """Точка входа импорта"""
+    parser = argparse.ArgumentParser(
+        description="Импорт вопросов из CSV и JSONL в формат questions.json")
+    parser.add_argument('sources', nargs='+', help="файлы .csv и .jsonl")
+    parser.add_argument('-o', '--output', default='questions.json')
+    parser.add_argument('--base', help="существующий банк, вопросы которого "
+                                       "сохраняются (например, questions.json)")
+    parser.add_argument('--ladder', help="JSON-файл с prize_ladder, если нет --base")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rejects', help="JSONL-файл для отклоненных строк")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--near-index', help="индекс почти одинаковых вопросов "
+                                             "(near_duplicates.py): читается, "
+                                             "пополняется и сохраняется")
+    parser.add_argument('--search-index', help="полнотекстовый индекс "
+                                               "(question_search.py): читается, "
+                                               "пополняется и сохраняется")
+    args = parser.parse_args()
+
+    near_index = None
+    if args.near_index:
+        from near_duplicates import NearDuplicateIndex
+        if os.path.exists(args.near_index):
+            near_index = NearDuplicateIndex.load(args.near_index)
+        else:
+            near_index = NearDuplicateIndex()
+    search_index = None
+    if args.search_index:
+        from question_search import QuestionSearchIndex
+        if os.path.exists(args.search_index):
+            search_index = QuestionSearchIndex.load(args.search_index)
+        else:
+            search_index = QuestionSearchIndex()
+
+    prize_ladder = None
+    if args.ladder:
+        with open(args.ladder, 'r', encoding='utf-8') as f:
+            prize_ladder = json.load(f)['prize_ladder']
+    stats = import_questions(args.sources, args.output, args.base, prize_ladder,
+                             args.workers, args.rejects, args.chunk_rows,
+                             near_index, search_index)
+    print(stats.report())
+    if near_index is not None:
+        near_index.save(args.near_index)
+        print("Кластеров почти одинаковых вопросов: {}".format(
+            len(near_index.clusters())))
+    if search_index is not None:
+        search_index.save(args.search_index)
+        print("В поисковом индексе: {} вопросов".format(len(search_index)))
+
+
+if __name__ == "__main__":
+    main()
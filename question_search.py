@@ -0,0 +1,518 @@
+"""
+Полнотекстовый поиск по тексту и вариантам ответа вопросов
+
+Слова приводятся к основам (question_text.stem), поэтому «континентов»
+находит «континент». Для каждой основы хранятся пары (документ, позиция
+слова) в массивах, по ним считаются совпадения фраз и ранжирование BM25.
+Запрос:
+    континент земл*          все слова; * — любое слово с таким началом
+    "сколько континентов"    фраза, слова подряд
+Фильтры по уровню и сложности задаются параметрами search().
+
+Индекс состоит из сохраненной на диск основы (массивы NumPy) и части
+в памяти, которая пополняется при импорте; save() их объединяет.
+
+Запуск:
+    python question_search.py questions.json "сколько континентов" --level 3
+"""
+
+import argparse
+import array
+import bisect
+import math
+import os
+import re
+
+import numpy as np
+
+from question_common import HashSet
+from question_text import match_key, stem
+
+
+# Позиции слов варианта ответа i начинаются с OPTION_GAP * (i + 1),
+# чтобы фраза не склеивала текст и варианты
+OPTION_GAP = 1024
+# Сколько основ подставлять вместо одного слова с *
+MAX_PREFIX_TERMS = 256
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def question_words(text, options):
+    """Слова вопроса с позициями: сначала текст, потом варианты ответа"""
+    words = list(enumerate(match_key(text).split()[:OPTION_GAP]))
+    for i, option in enumerate(options):
+        start = OPTION_GAP * (i + 1)
+        words.extend((start + j, word) for j, word in
+                     enumerate(match_key(option).split()[:OPTION_GAP]))
+    return words
+
+
+def _sorted_unique(values):
+    """Уникальные значения по возрастанию
+
+    Через сортировку: np.unique в NumPy 2 на ключах вида
+    (кандидат << 16 | позиция) уходит в очень медленный хэш.
+    """
+    values = np.sort(values)
+    if len(values):
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+def _intersect_sorted(first, second):
+    """Пересечение двух отсортированных массивов без повторов"""
+    if not len(first) or not len(second):
+        return first[:0]
+    if len(first) > len(second):
+        first, second = second, first
+    places = np.searchsorted(second, first)
+    places[places == len(second)] = 0
+    return first[second[places] == first]
+
+
+class QuestionSearchIndex:
+    """Обратный индекс по основам слов с позициями
+
+    Документ — номер вопроса в индексе; для него хранятся id, уровень,
+    код сложности и число слов. У основы на каждый документ с ней одна
+    запись: номер документа, число вхождений и начало позиций вхождений
+    в общем массиве позиций.
+    """
+
+    def __init__(self):
+        self.ids = array.array('q')
+        self.levels = array.array('H')
+        self.difficulty_codes = array.array('B')
+        self.lengths = array.array('H')
+        self.difficulties = []
+        # Слово -> основа: по нему раскрываются запросы с *
+        self.words = {}
+        self._sorted_words = None
+        self.total_length = 0
+        # Знаменатель BM25 по длине документа, пересчитывается после add
+        self._norm = None
+        # id, уже внесенные в known_ids (первые _known документов)
+        self.known_ids = HashSet()
+        self._known = 0
+        # Основа на диске: основа -> номер, отрезки записей в общих массивах
+        self.base_terms = {}
+        self.base_offsets = np.zeros(1, np.int64)
+        self.base_docs = np.empty(0, np.uint32)
+        self.base_tf = np.empty(0, np.uint16)
+        self.base_starts = np.empty(0, np.uint32)
+        self.base_positions = np.empty(0, np.uint16)
+        # Пополнение в памяти: основа -> (документы, вхождения, позиции)
+        self.delta = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, question_id, text, options, level, difficulty):
+        """Добавить вопрос в индекс"""
+        self.add_words(question_id, question_words(text, options), level,
+                       difficulty)
+
+    def add_question(self, question):
+        """Добавить объект Question"""
+        self.add(question.id, question.text, question.options,
+                 question.level, question.difficulty)
+
+    def add_batch(self, ids, words, levels, difficulties):
+        """Добавить вопросы пачкой; id, которые уже есть, пропускаются
+
+        Для повторного импорта в тот же индекс: вопросы банка base
+        снова проходят конвейер, но в индекс не попадают дважды.
+        """
+        if self._known < len(self.ids):
+            self.known_ids.add_new(
+                np.frombuffer(self.ids, np.int64)[self._known:].view(np.uint64))
+        fresh = self.known_ids.add_new(np.asarray(ids, np.int64).view(np.uint64))
+        for i in np.flatnonzero(fresh).tolist():
+            self.add_words(ids[i], words[i], levels[i], difficulties[i])
+        self._known = len(self.ids)
+
+    def add_words(self, question_id, words, level, difficulty):
+        """Добавить вопрос по готовым словам question_words"""
+        doc = len(self.ids)
+        try:
+            code = self.difficulties.index(difficulty)
+        except ValueError:
+            code = len(self.difficulties)
+            self.difficulties.append(difficulty)
+        self.ids.append(question_id)
+        self.levels.append(level)
+        self.difficulty_codes.append(code)
+        self.lengths.append(min(len(words), 0xFFFF))
+        self.total_length += len(words)
+        self._norm = None
+
+        known = self.words
+        term_positions = {}
+        for position, word in words:
+            term = known.get(word)
+            if term is None:
+                term = known[word] = stem(word)
+                self._sorted_words = None
+            positions = term_positions.get(term)
+            if positions is None:
+                term_positions[term] = [position]
+            else:
+                positions.append(position)
+
+        delta = self.delta
+        for term, positions in term_positions.items():
+            postings = delta.get(term)
+            if postings is None:
+                postings = delta[term] = (array.array('I'), array.array('H'),
+                                          array.array('H'))
+            postings[0].append(doc)
+            postings[1].append(len(positions))
+            postings[2].extend(positions)
+
+    def postings(self, term):
+        """Записи основы: документы по возрастанию, число вхождений,
+        начала позиций и массив позиций"""
+        index = self.base_terms.get(term)
+        extra = self.delta.get(term)
+        if extra is None:
+            if index is None:
+                return (np.empty(0, np.uint32), np.empty(0, np.uint16),
+                        np.empty(0, np.uint32), np.empty(0, np.uint16))
+            return self._base_postings(index)
+
+        # Копии: пока есть вид на array.array, его нельзя дополнять
+        docs = np.frombuffer(extra[0], np.uint32).copy()
+        tf = np.frombuffer(extra[1], np.uint16).copy()
+        positions = np.frombuffer(extra[2], np.uint16).copy()
+        starts = (np.cumsum(tf, dtype=np.uint32) - tf).astype(np.uint32)
+        if index is None:
+            return docs, tf, starts, positions
+
+        # Документы пополнения всегда новее документов основы
+        base_docs, base_tf, base_starts, base_positions = \
+            self._compact(*self._base_postings(index))
+        return (np.concatenate((base_docs, docs)),
+                np.concatenate((base_tf, tf)),
+                np.concatenate((base_starts,
+                                starts + np.uint32(len(base_positions)))),
+                np.concatenate((base_positions, positions)))
+
+    def _base_postings(self, index):
+        start, end = self.base_offsets[index], self.base_offsets[index + 1]
+        return (self.base_docs[start:end], self.base_tf[start:end],
+                self.base_starts[start:end], self.base_positions)
+
+    @staticmethod
+    def _compact(docs, tf, starts, positions):
+        """Оставить в массиве позиций только отрезок этих записей"""
+        if not len(docs):
+            return docs, tf, starts, positions[:0]
+        first = starts[0]
+        last = int(starts[-1]) + int(tf[-1])
+        return docs, tf, starts - first, positions[first:last]
+
+    def expand_prefix(self, prefix):
+        """Основы слов, начинающихся с prefix, самые частые первыми"""
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self.words)
+        words = self._sorted_words
+        start = bisect.bisect_left(words, prefix)
+        terms = set()
+        for word in words[start:]:
+            if not word.startswith(prefix):
+                break
+            terms.add(self.words[word])
+        if len(terms) > MAX_PREFIX_TERMS:
+            terms = sorted(terms, key=lambda term: len(self.postings(term)[0]),
+                           reverse=True)[:MAX_PREFIX_TERMS]
+        return list(terms)
+
+    def parse_query(self, query):
+        """Запрос в список групп: фраза — несколько слов, иначе одно слово
+
+        Слово — список основ-альтернатив (у слова с * их может быть много).
+        """
+        groups = []
+        for phrase, word in _QUERY.findall(query):
+            if phrase:
+                group = [[stem(word)] for word in match_key(phrase).split()]
+            elif word.endswith('*') and match_key(word):
+                parts = match_key(word).split()
+                group = [[stem(part)] for part in parts[:-1]]
+                group.append(self.expand_prefix(parts[-1]))
+            else:
+                group = [[stem(part)] for part in match_key(word).split()]
+            if group:
+                groups.append((bool(phrase), group))
+        return groups
+
+    def _word_postings(self, alternatives):
+        """Записи слова; у слова с альтернативами позиций нет
+
+        Слово с * не бывает во фразе, поэтому для него достаточно
+        документов и суммы вхождений.
+        """
+        if len(alternatives) == 1:
+            return self.postings(alternatives[0])
+        parts = [self.postings(term) for term in alternatives]
+        if not parts:
+            return (np.empty(0, np.uint32), np.empty(0, np.uint16), None, None)
+        docs = np.concatenate([part[0] for part in parts])
+        tf = np.concatenate([part[1] for part in parts])
+        order = np.argsort(docs, kind='stable')
+        docs, tf = docs[order], tf[order]
+        first = np.flatnonzero(np.concatenate(([True], docs[1:] != docs[:-1])))
+        # Один документ может встретиться у нескольких основ: вхождения
+        # складываются
+        return docs[first], np.add.reduceat(tf, first).astype(np.uint16), \
+            None, None
+
+    def search(self, query, level=None, difficulty=None, limit=20):
+        """Лучшие вопросы по запросу: список (id, оценка)
+
+        level — уровень или набор уровней, difficulty — сложность.
+        """
+        groups = self.parse_query(query)
+        words = [alternatives for _, group in groups for alternatives in group]
+        if not words or not len(self.ids):
+            return []
+        postings = [self._word_postings(alternatives) for alternatives in words]
+        if any(not len(docs) for docs, _, _, _ in postings):
+            return []
+
+        # Кандидаты — документы самого редкого слова; для каждого слова
+        # entries — номера записей кандидатов в его списке
+        rarest = min(range(len(postings)), key=lambda i: len(postings[i][0]))
+        candidates = postings[rarest][0]
+        entries = [None] * len(postings)
+        entries[rarest] = np.arange(len(candidates))
+        keep = self._filter(candidates, level, difficulty)
+        if keep is not None:
+            candidates = candidates[keep]
+            entries[rarest] = entries[rarest][keep]
+
+        for word, (docs, _, _, _) in enumerate(postings):
+            if word == rarest:
+                continue
+            places = np.searchsorted(docs, candidates)
+            places[places == len(docs)] = 0
+            present = docs[places] == candidates
+            candidates = candidates[present]
+            entries = [places[present] if i == word else
+                       None if found is None else found[present]
+                       for i, found in enumerate(entries)]
+            if not len(candidates):
+                return []
+
+        word = 0
+        for is_phrase, group in groups:
+            if is_phrase and len(group) > 1:
+                keep = self._phrase_match(
+                    len(candidates), postings[word:word + len(group)],
+                    entries[word:word + len(group)])
+                candidates = candidates[keep]
+                entries = [found[keep] for found in entries]
+            word += len(group)
+        if not len(candidates):
+            return []
+
+        scores = self._bm25(candidates, postings, entries)
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            top = top[np.argsort(-scores[top], kind='stable')]
+        else:
+            top = np.argsort(-scores, kind='stable')
+        return [(self.ids[int(doc)], float(score))
+                for doc, score in zip(candidates[top], scores[top])]
+
+    def _filter(self, candidates, level, difficulty):
+        """Маска кандидатов по уровню и сложности или None без фильтров"""
+        keep = None
+        if level is not None:
+            levels = np.frombuffer(self.levels, np.uint16)[candidates]
+            wanted = [level] if isinstance(level, int) else list(level)
+            keep = np.isin(levels, wanted)
+        if difficulty is not None:
+            codes = np.frombuffer(self.difficulty_codes, np.uint8)[candidates]
+            if difficulty in self.difficulties:
+                match = codes == self.difficulties.index(difficulty)
+            else:
+                match = np.zeros(len(candidates), bool)
+            keep = match if keep is None else keep & match
+        return keep
+
+    @staticmethod
+    def _phrase_match(count, postings, entries):
+        """Маска кандидатов, где слова фразы идут подряд
+
+        Вхождение слова i с позицией p дает ключ (кандидат, p - i);
+        фраза есть там, где ключ общий у всех слов. Позиции в записи идут
+        по возрастанию, поэтому ключи уже отсортированы. Слова берутся от
+        редких к частым, и каждое следующее смотрит только на кандидатов,
+        у которых фраза еще возможна.
+        """
+        order = sorted(range(len(postings)), key=lambda i: int(
+            postings[i][1][entries[i]].sum(dtype=np.int64)))
+        alive = np.arange(count, dtype=np.int64)
+        common = None
+        for i in order:
+            _, tf, starts, positions = postings[i]
+            found = entries[i][alive]
+            counts = tf[found].astype(np.int64)
+            ends = np.cumsum(counts)
+            taken = np.repeat(starts[found].astype(np.int64) - (ends - counts),
+                              counts) + np.arange(int(ends[-1]))
+            keys = (np.repeat(alive, counts) << 17) + \
+                positions[taken].astype(np.int64) + ((1 << 16) - i)
+            common = keys if common is None else _intersect_sorted(common, keys)
+            alive = _sorted_unique(common >> 17)
+            if not len(alive):
+                break
+        keep = np.zeros(count, bool)
+        keep[alive] = True
+        return keep
+
+    def _bm25(self, candidates, postings, entries):
+        count = len(self.ids)
+        if self._norm is None:
+            lengths = np.frombuffer(self.lengths, np.uint16)
+            self._norm = (BM25_K1 * (1 - BM25_B + BM25_B * lengths *
+                                     (count / self.total_length))
+                          ).astype(np.float32)
+        norm = self._norm[candidates]
+        scores = np.zeros(len(candidates), np.float32)
+        for (docs, tf, _, _), found in zip(postings, entries):
+            frequency = len(docs)
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            term_tf = tf[found].astype(np.float32)
+            scores += np.float32(idf * (BM25_K1 + 1)) * term_tf / (term_tf + norm)
+        return scores
+
+    def save(self, path):
+        """Сохранить индекс в .npz (без pickle), пополнение входит в основу"""
+        terms = sorted(set(self.base_terms) | set(self.delta))
+        offsets = np.zeros(len(terms) + 1, np.int64)
+        parts = []
+        position_count = 0
+        for i, term in enumerate(terms):
+            docs, tf, starts, positions = self._compact(*self.postings(term))
+            parts.append((docs, tf, starts + np.uint32(position_count),
+                          positions))
+            position_count += len(positions)
+            offsets[i + 1] = offsets[i] + len(docs)
+
+        def join(column, dtype):
+            return np.concatenate([part[column] for part in parts] or
+                                  [np.empty(0, dtype)]).astype(dtype, copy=False)
+
+        self.base_terms = {term: i for i, term in enumerate(terms)}
+        self.base_offsets = offsets
+        self.base_docs = join(0, np.uint32)
+        self.base_tf = join(1, np.uint16)
+        self.base_starts = join(2, np.uint32)
+        self.base_positions = join(3, np.uint16)
+        self.delta = {}
+
+        words = sorted(self.words)
+        word_terms = np.array([self.base_terms[self.words[word]]
+                               for word in words], np.uint32)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                ids=np.frombuffer(self.ids, np.int64),
+                levels=np.frombuffer(self.levels, np.uint16),
+                difficulty_codes=np.frombuffer(self.difficulty_codes, np.uint8),
+                lengths=np.frombuffer(self.lengths, np.uint16),
+                difficulties=np.array(self.difficulties, str),
+                terms=np.frombuffer('\n'.join(terms).encode('utf-8'), np.uint8),
+                words=np.frombuffer('\n'.join(words).encode('utf-8'), np.uint8),
+                word_terms=word_terms, offsets=offsets,
+                docs=self.base_docs, tf=self.base_tf, starts=self.base_starts,
+                positions=self.base_positions,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Загрузить индекс, сохраненный save"""
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            index.ids.frombytes(data['ids'].tobytes())
+            index.levels.frombytes(data['levels'].tobytes())
+            index.difficulty_codes.frombytes(data['difficulty_codes'].tobytes())
+            index.lengths.frombytes(data['lengths'].tobytes())
+            index.difficulties = data['difficulties'].tolist()
+            terms = data['terms'].tobytes().decode('utf-8')
+            words = data['words'].tobytes().decode('utf-8')
+            terms = terms.split('\n') if terms else []
+            index.base_terms = {term: i for i, term in enumerate(terms)}
+            index.words = dict(zip(words.split('\n') if words else [],
+                                   map(terms.__getitem__,
+                                       data['word_terms'].tolist())))
+            index._sorted_words = list(index.words)
+            index.base_offsets = data['offsets']
+            index.base_docs = data['docs']
+            index.base_tf = data['tf']
+            index.base_starts = data['starts']
+            index.base_positions = data['positions']
+        index.total_length = int(np.frombuffer(index.lengths, np.uint16).sum())
+        return index
+
+
+def build_index(questions_file):
+    """Индекс по всем вопросам банка"""
+    from question_cache import load_question_store
+
+    store = load_question_store(questions_file)
+    index = QuestionSearchIndex()
+    try:
+        for question in store:
+            index.add_question(question)
+    finally:
+        store.close()
+    return index
+
+
+def main():
+    """Поиск по банку из командной строки"""
+    import time
+
+    from question_cache import load_question_store
+
+    parser = argparse.ArgumentParser(description="Поиск вопросов по тексту")
+    parser.add_argument('questions', nargs='?', default='questions.json')
+    parser.add_argument('query', nargs='?', default='')
+    parser.add_argument('--index', help="файл индекса; создается, если его нет")
+    parser.add_argument('--level', type=int, action='append')
+    parser.add_argument('--difficulty')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.index and os.path.exists(args.index):
+        index = QuestionSearchIndex.load(args.index)
+    else:
+        index = build_index(args.questions)
+        if args.index:
+            index.save(args.index)
+    if not args.query:
+        print("Вопросов в индексе: {}".format(len(index)))
+        return
+
+    started = time.perf_counter()
+    results = index.search(args.query, args.level, args.difficulty, args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    store = load_question_store(args.questions)
+    for question_id, score in results:
+        question = store.get_by_id(question_id)
+        print("{:>8} {:>7.2f}  {}".format(question_id, score,
+                                          question.text if question else "?"))
+    print("Найдено {} за {:.1f} мс".format(len(results), elapsed))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
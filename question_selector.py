@@ -0,0 +1,235 @@
+"""
+Случайный выбор вопросов по уровням без повторов для игры 'Кто хочет стать миллионером'
+"""
+
+import collections
+import random
+import re
+import threading
+
+from question_bank import build_groups
+
+
+# Сколько случайных попыток делать до линейного поиска непоказанного вопроса
+DRAW_ATTEMPTS = 8
+# Примерная цена одного элемента множества в битах: выше этой доли
+# показанных вопросов битовая карта уровня становится компактнее множества
+SET_ENTRY_BITS = 256
+# Сколько игроков помнит PlayerHistory, прежде чем забыть давно не игравших
+MAX_PLAYERS = 100000
+
+_NOT_FULL_BYTE = re.compile(rb'[^\xff]')
+
+
+class SeenQuestions:
+    """Показанные игроку вопросы: по уровням, множество или битовая карта"""
+
+    __slots__ = ('levels',)
+
+    def __init__(self):
+        # level -> set номеров внутри уровня или bytearray с битами
+        self.levels = {}
+
+    def contains(self, level, slot):
+        """Показывался ли вопрос с номером slot внутри уровня"""
+        seen = self.levels.get(level)
+        if seen is None:
+            return False
+        if isinstance(seen, set):
+            return slot in seen
+        return bool(seen[slot >> 3] & (1 << (slot & 7)))
+
+    def add(self, level, slot, level_size):
+        """Отметить вопрос как показанный"""
+        seen = self.levels.get(level)
+        if seen is None:
+            seen = self.levels[level] = set()
+
+        if isinstance(seen, set):
+            seen.add(slot)
+            if len(seen) * SET_ENTRY_BITS >= level_size:
+                self.levels[level] = self._to_bitmap(seen, level_size)
+        else:
+            seen[slot >> 3] |= 1 << (slot & 7)
+
+    def count(self, level=None):
+        """Сколько вопросов уже показано (на уровне или всего)"""
+        levels = self.levels if level is None else \
+            {level: self.levels.get(level, set())}
+        total = 0
+        for seen in levels.values():
+            if isinstance(seen, set):
+                total += len(seen)
+            else:
+                total += int.from_bytes(seen, 'little').bit_count()
+        return total
+
+    def find_unseen(self, level, lo, hi, start):
+        """Первый непоказанный номер в [lo, hi), начиная со start по кругу"""
+        seen = self.levels.get(level)
+        if seen is None:
+            return start
+        for a, b in ((start, hi), (lo, start)):
+            if isinstance(seen, set):
+                for slot in range(a, b):
+                    if slot not in seen:
+                        return slot
+            else:
+                slot = self._scan_bitmap(seen, a, b)
+                if slot is not None:
+                    return slot
+        return None
+
+    def reset(self, level, lo, hi):
+        """Забыть показанные вопросы в диапазоне, чтобы начать новый круг"""
+        seen = self.levels.get(level)
+        if seen is None:
+            return
+        if isinstance(seen, set):
+            self.levels[level] = {slot for slot in seen if not lo <= slot < hi}
+            return
+
+        slot = lo
+        while slot < hi and slot & 7:
+            seen[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+            slot += 1
+        full_end = hi & ~7
+        if slot < full_end:
+            seen[slot >> 3:full_end >> 3] = bytes((full_end - slot) >> 3)
+            slot = full_end
+        while slot < hi:
+            seen[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+            slot += 1
+
+    @staticmethod
+    def _to_bitmap(slots, level_size):
+        bitmap = bytearray((level_size + 7) >> 3)
+        for slot in slots:
+            bitmap[slot >> 3] |= 1 << (slot & 7)
+        return bitmap
+
+    @staticmethod
+    def _scan_bitmap(bitmap, lo, hi):
+        """Поиск нулевого бита в [lo, hi) по байтам, не равным 0xFF"""
+        pos = lo >> 3
+        end = (hi + 7) >> 3
+        while pos < end:
+            match = _NOT_FULL_BYTE.search(bitmap, pos, end)
+            if match is None:
+                return None
+            byte_index = match.start()
+            byte = bitmap[byte_index]
+            for bit in range(8):
+                slot = (byte_index << 3) | bit
+                if lo <= slot < hi and not byte & (1 << bit):
+                    return slot
+            pos = byte_index + 1
+        return None
+
+
+class PlayerHistory:
+    """Показанные вопросы игроков одного сервера
+
+    Хранит не больше max_players историй: при переполнении забывается
+    игрок, который дольше всех не начинал игру. Обращения под блокировкой,
+    поэтому у игрока не появится двух историй из разных потоков.
+    """
+
+    def __init__(self, max_players=MAX_PLAYERS):
+        self.max_players = max_players
+        self.players = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.players)
+
+    def seen_for(self, player_id):
+        """Показанные вопросы игрока, создаются при первом обращении"""
+        with self._lock:
+            seen = self.players.get(player_id)
+            if seen is None:
+                seen = self.players[player_id] = SeenQuestions()
+                while len(self.players) > self.max_players:
+                    self.players.popitem(last=False)
+            else:
+                self.players.move_to_end(player_id)
+            return seen
+
+    def forget_player(self, player_id):
+        """Удалить историю игрока"""
+        with self._lock:
+            self.players.pop(player_id, None)
+
+
+class QuestionSelector:
+    """Корзины вопросов по уровню и сложности со случайным выбором за O(1)
+
+    После построения не меняется: история игроков живет в SeenQuestions
+    и PlayerHistory, генератор передает вызывающий.
+    """
+
+    def __init__(self, questions):
+        self.questions = questions
+
+        order = getattr(questions, 'group_order', None)
+        groups = getattr(questions, 'groups', None)
+        if order is None or groups is None:
+            order, groups = build_groups(questions.levels,
+                                         questions.difficulty_codes)
+        self.order = order
+
+        # Группы одного уровня идут подряд, поэтому номер вопроса внутри
+        # уровня — это смещение от начала уровня в self.order
+        self.level_ranges = {}
+        self.difficulty_ranges = {}
+        for (level, code), (start, end) in sorted(groups.items()):
+            level_start, level_end = self.level_ranges.get(level, (start, end))
+            self.level_ranges[level] = (min(level_start, start),
+                                        max(level_end, end))
+            difficulty = questions.difficulties[code]
+            self.difficulty_ranges[(level, difficulty)] = (start, end)
+
+    def get_levels(self):
+        """Уровни, для которых есть вопросы"""
+        return sorted(self.level_ranges)
+
+    def level_size(self, level, difficulty=None):
+        """Количество вопросов уровня (и сложности)"""
+        start, end = self._range(level, difficulty)
+        return end - start
+
+    def _range(self, level, difficulty=None):
+        if difficulty is None:
+            return self.level_ranges.get(level, (0, 0))
+        return self.difficulty_ranges.get((level, difficulty), (0, 0))
+
+    def draw(self, level, seen=None, difficulty=None, rng=None):
+        """Случайная позиция вопроса уровня, которого игрок еще не видел"""
+        rng = rng or random
+        start, end = self._range(level, difficulty)
+        size = end - start
+        if size == 0:
+            return None
+        if seen is None:
+            return self.order[start + rng.randrange(size)]
+
+        level_start, level_end = self.level_ranges[level]
+        lo = start - level_start
+        hi = end - level_start
+
+        slot = None
+        for _ in range(DRAW_ATTEMPTS):
+            candidate = lo + rng.randrange(size)
+            if not seen.contains(level, candidate):
+                slot = candidate
+                break
+
+        if slot is None:
+            slot = seen.find_unseen(level, lo, hi, lo + rng.randrange(size))
+        if slot is None:
+            # Все вопросы корзины показаны: начинаем новый круг
+            seen.reset(level, lo, hi)
+            slot = lo + rng.randrange(size)
+
+        seen.add(level, slot, level_end - level_start)
+        return self.order[level_start + slot]
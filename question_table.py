@@ -0,0 +1,103 @@
+"""
+Колоночное хранение вопросов для больших банков
+Уровни, правильные ответы и сложность лежат в массивах, варианты ответов в общем пуле
+"""
+
+import array
+
+from game_logic import Question
+
+
+class QuestionTable:
+    """Таблица вопросов: по массиву на поле вместо объекта на вопрос"""
+
+    def __init__(self, prize_ladder=None):
+        self.prize_ladder = prize_ladder or []
+        self.ids = array.array('q')
+        self.levels = array.array('i')
+        self.correct = array.array('B')
+        self.difficulty_codes = array.array('B')
+        self.texts = []
+        # Четыре ссылки в пул вариантов на каждый вопрос
+        self.option_refs = array.array('I')
+        self.option_pool = []
+        self.difficulties = []
+
+        self._option_codes = {}
+        self._difficulty_codes = {}
+
+    @classmethod
+    def from_questions(cls, questions, prize_ladder=None):
+        """Собрать таблицу из объектов Question или словарей из JSON"""
+        table = cls(prize_ladder)
+        for question in questions:
+            if isinstance(question, dict):
+                table.append(question['id'], question['level'], question['text'],
+                             question['options'], question['correct'],
+                             question['difficulty'])
+            else:
+                table.append(question.id, question.level, question.text,
+                             question.options, question.correct,
+                             question.difficulty)
+        return table
+
+    @classmethod
+    def from_bank(cls, bank):
+        """Загрузить все вопросы банка (QuestionBank или кэша) в таблицу"""
+        return cls.from_questions(bank, bank.prize_ladder)
+
+    def append(self, question_id, level, text, options, correct, difficulty):
+        """Добавить вопрос в конец таблицы"""
+        if len(options) != 4:
+            raise ValueError(
+                "У вопроса {} должно быть 4 варианта ответа".format(question_id)
+            )
+
+        code = self._difficulty_codes.get(difficulty)
+        if code is None:
+            code = self._difficulty_codes[difficulty] = len(self.difficulties)
+            self.difficulties.append(difficulty)
+
+        for option in options:
+            ref = self._option_codes.get(option)
+            if ref is None:
+                ref = self._option_codes[option] = len(self.option_pool)
+                self.option_pool.append(option)
+            self.option_refs.append(ref)
+
+        self.ids.append(question_id)
+        self.levels.append(level)
+        self.correct.append(correct)
+        self.difficulty_codes.append(code)
+        self.texts.append(text)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self.ids)
+        if not 0 <= position < len(self.ids):
+            raise IndexError("Нет вопроса с позицией {}".format(position))
+        return Question(
+            self.ids[position],
+            self.levels[position],
+            self.texts[position],
+            self.get_options(position),
+            self.correct[position],
+            self.difficulties[self.difficulty_codes[position]]
+        )
+
+    def __iter__(self):
+        for position in range(len(self.ids)):
+            yield self[position]
+
+    def get_options(self, position):
+        """Варианты ответа вопроса без создания объекта Question"""
+        start = position * 4
+        pool = self.option_pool
+        return tuple(pool[ref] for ref in self.option_refs[start:start + 4])
+
+    def is_correct(self, position, answer_index):
+        """Проверка ответа прямо по колонке правильных ответов"""
+        return answer_index == self.correct[position]
@@ -0,0 +1,57 @@
+"""
+Нормализация текста вопросов: пробелы, регистр, ё и простая основа
+русских слов для сравнения и поиска
+"""
+
+import functools
+import re
+import unicodedata
+
+
+# Окончания, которые отрезаются от слова (сначала длинные)
+ENDINGS = tuple(sorted((
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ость', 'ов', 'ев',
+    'ей', 'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ой', 'ий', 'ый', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ых', 'их', 'ую', 'юю', 'а', 'я', 'о', 'е', 'ы',
+    'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+# Основа не короче MIN_STEM букв и не длиннее MAX_STEM
+MIN_STEM = 3
+MAX_STEM = 6
+
+_NON_WORD = re.compile(r'[\W_]+')
+# Самое раннее начало окончания — самое длинное подходящее окончание
+_ENDING = re.compile(r'(.{%d,}?)(?:%s)$' % (MIN_STEM, '|'.join(ENDINGS)))
+
+
+def normalize_text(text):
+    """Текст в NFC без лишних пробелов, как он будет показан игроку"""
+    if not unicodedata.is_normalized('NFC', text):
+        text = unicodedata.normalize('NFC', text)
+    return ' '.join(text.split())
+
+
+def match_key(text):
+    """Форма текста для сравнения: без регистра, ё как е, без пунктуации"""
+    return _NON_WORD.sub(' ', text.casefold().replace('ё', 'е')).strip()
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def stem(word):
+    """Основа слова из match_key: без окончания и обрезанная до MAX_STEM
+
+    "континентов" и "континент" -> "контин", "Земле" и "Земля" -> "земл".
+    Числа остаются целиком.
+    """
+    if word.isdigit():
+        return word
+    match = _ENDING.match(word)
+    if match is not None:
+        word = match.group(1)
+    return word[:MAX_STEM]
+
+
+def stems(text, min_length=1):
+    """Основы слов текста; слова короче min_length букв (предлоги) пропускаются"""
+    return [stem(word) for word in match_key(text).split()
+            if len(word) >= min_length or word.isdigit()]
@@ -0,0 +1,596 @@
+"""
+Проверка банка вопросов (questions.json) целиком до запуска игры
+
+Проверяются схема каждого вопроса (поля и их типы, 4 непустых варианта,
+correct в 0–3, известная сложность), уникальность id, призовая лестница
+(уровни и суммы строго растут) и ее соответствие вопросам: у каждого
+уровня лестницы есть вопросы, у каждого вопроса — уровень из лестницы.
+
+Файл открывается через mmap; границы вопросов находятся векторным
+проходом по байтам (кавычки, скобки и глубина вложенности в NumPy), и
+куски по CHUNK_QUESTIONS вопросов разбирают и проверяют процессы-
+исполнители: столбцы полей проверяются целиком, а не по одному вопросу.
+
+Отчет — JSON: число ошибок по кодам, вопросов на уровень и первые
+ошибки с кодом, номером вопроса в файле и id. Код возврата 1, если
+есть ошибки.
+
+Запуск: python question_validator.py questions.json [--output report.json]
+"""
+
+import argparse
+import collections
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import sys
+import time
+from itertools import chain, repeat
+
+import numpy as np
+
+from question_common import DIFFICULTIES, MAX_PENDING_PER_WORKER
+
+
+CHUNK_QUESTIONS = 50000
+# Байт на один векторный проход при поиске границ вопросов
+BLOCK_BYTES = 1 << 24
+MAX_ERRORS = 1000
+FIELDS = ('id', 'level', 'text', 'options', 'correct', 'difficulty')
+
+# Скобки JSON: 1 — открывающая, 2 — закрывающая
+_BRACKETS = np.zeros(256, np.uint8)
+_BRACKETS[[ord('{'), ord('[')]] = 1
+_BRACKETS[[ord('}'), ord(']')]] = 2
+# byte & _BRACKET_MASK == _BRACKET_BITS для всех четырех скобок и еще
+# четырех байт (Y _ y DEL): сравнение целого блока вместо таблицы
+_BRACKET_MASK = 0xD9
+_BRACKET_BITS = 0x59
+_QUOTE = ord('"')
+_BACKSLASH = ord('\\')
+_WHITESPACE = b' \t\r\n'
+# Строки и знаки, по которым кусок делится на вопросы, если он не JSON
+_ITEM_TOKENS = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{},]', re.S)
+
+
+class BankStructureError(ValueError):
+    """Файл нельзя разбить на вопросы: это не объект JSON с массивом questions"""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def question_spans(buf, questions_per_chunk=CHUNK_QUESTIONS,
+                   block_bytes=BLOCK_BYTES):
+    """Отрезки (начало, конец) байт массива questions по questions_per_chunk
+    вопросов; последним возвращается отрезок самого массива со скобками
+
+    buf — массив uint8 всего файла. Кавычки, экранированные обратной
+    косой чертой, и скобки внутри строк не учитываются.
+    """
+    in_string = 0       # конец предыдущего блока внутри строки
+    depth = 0
+    array_start = None  # позиция '[' массива questions
+    chunk_start = None
+    in_chunk = 0        # вопросов в текущем куске
+
+    for offset in range(0, len(buf), block_bytes):
+        block = buf[offset:offset + block_bytes]
+        positions = np.flatnonzero(block & _BRACKET_MASK == _BRACKET_BITS)
+        kinds = _BRACKETS[block[positions]]
+        positions = positions[kinds != 0]
+        kinds = kinds[kinds != 0]
+
+        # Четность кавычек перед каждой скобкой: xor по отрезкам между
+        # скобками, без списка всех кавычек
+        quotes = (block == _QUOTE).view(np.uint8)
+        parity = np.bitwise_xor.accumulate(np.bitwise_xor.reduceat(
+            quotes, np.concatenate(([0], positions))))
+        parity ^= in_string
+        # Кавычка после нечетного числа '\\' — часть строки и четность
+        # не меняет
+        escaped = []
+        start = max(offset - 1, 0)
+        for position in (np.flatnonzero(buf[start:offset + len(block)] ==
+                                        _BACKSLASH) + start + 1).tolist():
+            if offset <= position < offset + len(block) and \
+                    buf[position] == _QUOTE:
+                run = 1
+                while position - run - 1 >= 0 and \
+                        buf[position - run - 1] == _BACKSLASH:
+                    run += 1
+                if run & 1:
+                    escaped.append(position - offset)
+        if escaped:
+            parity[:-1] ^= (np.searchsorted(escaped, positions) & 1).astype(np.uint8)
+            parity[-1] ^= len(escaped) & 1
+        in_string = int(parity[-1])
+
+        outside = parity[:-1] == 0
+        positions = positions[outside] + offset
+        kinds = kinds[outside]
+        after = depth + np.cumsum(np.where(kinds == 1, 1, -1))
+        if len(after):
+            if after.min() < 0:
+                raise BankStructureError("лишняя закрывающая скобка",
+                                         int(positions[np.argmax(after < 0)]))
+            depth = int(after[-1])
+        chars = buf[positions]
+
+        # Начало и конец массивов верхнего уровня; вопросы кончаются '}'
+        # на глубине 2, пока открыт массив questions
+        edges = np.flatnonzero(((chars == ord('[')) & (after == 2)) |
+                               ((chars == ord(']')) & (after == 1)))
+        ends = np.flatnonzero((chars == ord('}')) & (after == 2))
+        cursor = 0
+        for edge in edges.tolist() + [len(positions)]:
+            if array_start is not None:
+                question_ends = positions[ends[(ends >= cursor) & (ends < edge)]]
+                need = questions_per_chunk - in_chunk
+                cuts = question_ends[need - 1::questions_per_chunk] + 1
+                for cut in cuts.tolist():
+                    yield chunk_start, cut
+                    chunk_start = cut
+                if len(cuts):
+                    in_chunk = len(question_ends) - need - \
+                        (len(cuts) - 1) * questions_per_chunk
+                else:
+                    in_chunk += len(question_ends)
+            if edge == len(positions):
+                break
+            position = int(positions[edge])
+            if chars[edge] == ord('['):
+                # Ключ — последняя строка перед '['
+                window = buf[max(position - 4096, 0):position]
+                quotes = np.flatnonzero(window == _QUOTE)
+                key = window[quotes[-2] + 1:quotes[-1]].tobytes() \
+                    if len(quotes) >= 2 else None
+                if key == b'questions' and array_start is None:
+                    array_start = chunk_start = position + 1
+                    in_chunk = 0
+            elif array_start is not None and chunk_start is not None:
+                yield chunk_start, position
+                yield array_start - 1, position + 1
+                return
+            cursor = edge + 1
+
+    if depth or in_string:
+        raise BankStructureError("файл оборван: не закрыты скобки или строка",
+                                 len(buf))
+    raise BankStructureError("нет массива questions", 0)
+
+
+# Файлы, открытые процессом-исполнителем: путь -> (файл, mmap)
+_maps = {}
+
+
+def _file_map(path):
+    opened = _maps.get(path)
+    if opened is None:
+        f = open(path, 'rb')
+        opened = _maps[path] = (f, mmap.mmap(f.fileno(), 0,
+                                             access=mmap.ACCESS_READ))
+    return opened[1]
+
+
+def _int_column(values):
+    """Столбец целых как int64 и маска значений, которые не целые"""
+    if set(map(type, values)) <= {int}:
+        try:
+            return np.array(values, np.int64), np.zeros(len(values), bool)
+        except OverflowError:
+            pass
+    bad = np.array([type(value) is not int or not -2 ** 63 <= value < 2 ** 63
+                    for value in values], bool)
+    column = np.array([0 if wrong else value
+                       for value, wrong in zip(values, bad.tolist())], np.int64)
+    return column, bad
+
+
+def _strings(values):
+    """Маски столбца строк: значение не строка (None не в счет) и строка пустая"""
+    count = len(values)
+    if set(map(type, values)) <= {str}:
+        not_string = np.zeros(count, bool)
+    else:
+        not_string = np.array([type(value) is not str and value is not None
+                               for value in values], bool)
+        values = [value if type(value) is str else '-' for value in values]
+    blank = np.fromiter(map(len, values), np.int64, count) == 0
+    blank |= np.fromiter(map(str.isspace, values), bool, count)
+    return not_string, blank
+
+
+def check_chunk(task):
+    """Разобрать и проверить кусок в процессе-исполнителе
+
+    Возвращает число вопросов, id и уровни (int64, у неверных значений —
+    маска), число ошибок по кодам и первые max_errors ошибок как
+    (номер в куске, id или None, код, сообщение, смещение или None).
+    Если кусок не JSON, вопросы разбираются по одному: у неразобранных
+    ошибка 'json' со смещением в байтах, остальные проверяются как обычно.
+    """
+    path, start, end, max_errors = task
+    raw = _file_map(path)[start:end]
+    body = raw.lstrip(_WHITESPACE)
+    skipped = len(raw) - len(body)
+    if body.startswith(b','):
+        body = body[1:]
+        skipped += 1
+    offsets = {}
+    try:
+        items = json.loads(b'[' + body + b']')
+    except json.JSONDecodeError:
+        items, offsets = _parse_items(body, start + skipped)
+
+    count = len(items)
+    counts = collections.Counter()
+    errors = []
+    # Неразобранные вопросы: у них только ошибка 'json'
+    malformed = np.zeros(count, bool)
+    if offsets:
+        malformed[list(offsets)] = True
+        items = [{} if i in offsets else item for i, item in enumerate(items)]
+
+    def report(mask, code, message):
+        indices = np.flatnonzero(np.asarray(mask, bool) & ~malformed)
+        if len(indices):
+            counts[code] += len(indices)
+            for i in indices[:max_errors - len(errors)].tolist():
+                errors.append((i, code, message))
+
+    if set(map(type, items)) != {dict} and count:
+        not_object = np.array([type(item) is not dict for item in items], bool)
+        report(not_object, 'not_object', "вопрос не объект")
+        items = [item if type(item) is dict else {} for item in items]
+    else:
+        not_object = np.zeros(count, bool)
+
+    columns = {}
+    for field in FIELDS:
+        column = columns[field] = list(map(dict.get, items, repeat(field)))
+        if None in column:
+            missing = np.array([value is None for value in column], bool)
+            report(missing & ~not_object, 'missing_field',
+                   "нет поля {}".format(field))
+
+    ids, bad_ids = _int_column(columns['id'])
+    levels, bad_levels = _int_column(columns['level'])
+    correct, bad_correct = _int_column(columns['correct'])
+    for field, bad in (('id', bad_ids), ('level', bad_levels),
+                       ('correct', bad_correct)):
+        if bad.any():
+            present = np.array([value is not None for value in columns[field]],
+                               bool)
+            report(bad & present, 'type', "{}: ожидается целое число".format(field))
+    report(~bad_correct & ((correct < 0) | (correct > 3)),
+           'correct_range', "correct вне 0–3")
+
+    not_string, blank = _strings(columns['text'])
+    report(not_string, 'type', "text: ожидается строка")
+    report(blank & ~not_string, 'empty_text', "пустой текст вопроса")
+
+    options = columns['options']
+    if set(map(type, options)) <= {list}:
+        option_counts = np.fromiter(map(len, options), np.int64, count)
+    else:
+        option_counts = np.array([len(value) if type(value) is list else
+                                  -1 if value is not None else -2
+                                  for value in options], np.int64)
+        report(option_counts == -1, 'type', "options: ожидается список")
+        options = [value if type(value) is list else [] for value in options]
+    report((option_counts >= 0) & (option_counts != 4), 'options_count',
+           "должно быть 4 варианта ответа")
+    full = np.flatnonzero(option_counts == 4)
+    if len(full) < count:
+        options = [options[i] for i in full.tolist()]
+    flat = list(chain.from_iterable(options))
+    not_string, blank = _strings(flat)
+    wrong = np.zeros(count, bool)
+    wrong[full] = not_string.reshape(-1, 4).any(axis=1)
+    report(wrong, 'type', "options: ожидаются строки")
+    empty = np.zeros(count, bool)
+    empty[full] = blank.reshape(-1, 4).any(axis=1)
+    report(empty & ~wrong, 'empty_option', "пустой вариант ответа")
+    # Повторы вариантов: шесть попарных сравнений столбцов
+    table = np.array(flat, object).reshape(-1, 4)
+    same = np.zeros(len(table), bool)
+    for a, b in ((0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)):
+        same |= (table[:, a] == table[:, b]).astype(bool)
+    repeated = np.zeros(count, bool)
+    repeated[full] = same
+    report(repeated & ~wrong & ~empty, 'duplicate_options',
+           "одинаковые варианты ответа")
+
+    difficulty = columns['difficulty']
+    # Сначала типы: список или объект в difficulty нельзя положить в set
+    if not set(map(type, difficulty)) <= {str, type(None)}:
+        report([value is not None and type(value) is not str
+                for value in difficulty], 'type', "difficulty: ожидается строка")
+        difficulty = [value if type(value) is str else None
+                      for value in difficulty]
+    if not set(difficulty) <= set(DIFFICULTIES) | {None}:
+        report([value is not None and value not in DIFFICULTIES
+                for value in difficulty],
+               'difficulty', "сложность не из {}".format(', '.join(DIFFICULTIES)))
+
+    for i, (offset, message) in offsets.items():
+        counts['json'] += 1
+        if len(errors) < max_errors:
+            errors.append((i, 'json', message))
+    errors = [(i, columns['id'][i] if type(columns['id'][i]) is int else None,
+               code, message, offsets[i][0] if code == 'json' else None)
+              for i, code, message in sorted(errors)]
+    return count, ids, bad_ids, levels, bad_levels, dict(counts), errors
+
+
+def _parse_items(body, offset):
+    """Разобрать вопросы куска по одному
+
+    Вопросы разделяются запятыми вне строк и скобок. Возвращает список
+    вопросов (None вместо неразобранных) и {номер: (смещение в файле,
+    сообщение)} для неразобранных.
+    """
+    bounds = [0]
+    depth = 0
+    for match in _ITEM_TOKENS.finditer(body):
+        token = match.group()
+        if token in (b'{', b'['):
+            depth += 1
+        elif token in (b'}', b']'):
+            depth -= 1
+        elif token == b',' and depth == 0:
+            bounds.append(match.end())
+    bounds.append(len(body) + 1)
+
+    items = []
+    failures = {}
+    for i, (item_start, item_end) in enumerate(zip(bounds, bounds[1:])):
+        raw = body[item_start:item_end - 1]
+        try:
+            items.append(json.loads(raw))
+        except json.JSONDecodeError as e:
+            items.append(None)
+            # e.pos — в символах, смещение нужно в байтах файла
+            failures[i] = (offset + item_start +
+                           len(e.doc[:e.pos].encode('utf-8')),
+                           "JSON: {}".format(e.msg))
+    return items, failures
+
+
+def check_ladder(prize_ladder):
+    """Ошибки призовой лестницы: список (код, номер ступени или None, сообщение)"""
+    if not isinstance(prize_ladder, list) or not prize_ladder:
+        return [('ladder_schema', None, "prize_ladder должен быть непустым списком")]
+    errors = []
+    for i, prize in enumerate(prize_ladder):
+        if not isinstance(prize, dict):
+            errors.append(('ladder_schema', i, "ступень не объект"))
+            continue
+        if type(prize.get('level')) is not int:
+            errors.append(('ladder_schema', i, "level: ожидается целое число"))
+        amount = prize.get('amount')
+        if type(amount) not in (int, float) or amount < 0:
+            errors.append(('ladder_schema', i,
+                           "amount: ожидается неотрицательное число"))
+        if type(prize.get('safe_haven')) is not bool:
+            errors.append(('ladder_schema', i, "safe_haven: ожидается true/false"))
+    if errors:
+        return errors
+
+    for field, code in (('level', 'ladder_levels'), ('amount', 'ladder_amounts')):
+        values = np.array([prize[field] for prize in prize_ladder])
+        for i in np.flatnonzero(np.diff(values) <= 0).tolist():
+            errors.append((code, i + 1, "{} не больше, чем на ступени {}".format(
+                field, i)))
+    return errors
+
+
+def _other_fields(buf, array_span):
+    """Поля верхнего уровня, кроме questions (массив заменяется на [])"""
+    start, end = array_span
+    text = buf[:start].tobytes() + b'[]' + buf[end:].tobytes()
+    other = json.loads(text)
+    del other['questions']
+    return other
+
+
+def validate_bank(questions_file, workers=None, max_errors=MAX_ERRORS,
+                  questions_per_chunk=CHUNK_QUESTIONS):
+    """Проверить банк, вернуть отчет (словарь, готовый для json.dump)"""
+    started = time.perf_counter()
+    counts = collections.Counter()
+    errors = []
+    report = {'file': questions_file, 'ok': False, 'questions': 0,
+              'counts': counts, 'levels': {}, 'errors': errors}
+
+    def add_error(code, message, **where):
+        counts[code] += 1
+        if len(errors) < max_errors:
+            errors.append(dict(code=code, message=message, **where))
+
+    with open(questions_file, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            add_error('structure', "пустой файл", offset=0)
+            return _finish(report, started)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        failure = None
+        try:
+            results = _check_file(questions_file, mm, workers, max_errors,
+                                  questions_per_chunk)
+        except BankStructureError as e:
+            failure = dict(offset=e.offset,
+                           line=mm[:e.offset].count(b'\n') + 1,
+                           message=str(e))
+        except json.JSONDecodeError as e:
+            failure = dict(message="JSON: {}".format(e.msg))
+        if failure is None:
+            for error in results[6]:
+                if error.get('offset') is not None:
+                    error['line'] = mm[:error['offset']].count(b'\n') + 1
+        # Виды на mmap уже освобождены: закрыть можно только после except
+        mm.close()
+    if failure is not None:
+        add_error('structure', **failure)
+        return _finish(report, started)
+
+    total, ids, bad_ids, levels, bad_levels, chunk_counts, chunk_errors, \
+        other = results
+    report['questions'] = total
+    counts.update(chunk_counts)
+    errors.extend(chunk_errors[:max_errors - len(errors)])
+
+    # id: повторы среди целых id, номер первого вопроса с тем же id
+    positions = np.flatnonzero(~bad_ids)
+    order = np.argsort(ids[positions], kind='stable')
+    sorted_ids = ids[positions][order]
+    if len(sorted_ids) > 1:
+        same_id = np.concatenate(([False], sorted_ids[1:] == sorted_ids[:-1]))
+        group_start = np.maximum.accumulate(
+            np.where(same_id, 0, np.arange(len(sorted_ids))))
+        for i, first in zip(np.flatnonzero(same_id)[:max_errors].tolist(),
+                            group_start[same_id][:max_errors].tolist()):
+            add_error('duplicate_id', "id уже у вопроса {}".format(
+                int(positions[order[first]])), index=int(positions[order[i]]),
+                id=int(sorted_ids[i]))
+        if same_id.sum() > max_errors:
+            counts['duplicate_id'] += int(same_id.sum()) - max_errors
+
+    prize_ladder = other.get('prize_ladder')
+    ladder_errors = check_ladder(prize_ladder)
+    for code, step, message in ladder_errors:
+        add_error(code, message, ladder_index=step)
+    if not any(code == 'ladder_schema' for code, _, _ in ladder_errors):
+        ladder_levels = np.unique([prize['level'] for prize in prize_ladder])
+        valid = np.flatnonzero(~bad_levels)
+        place = np.searchsorted(ladder_levels, levels[valid])
+        place[place == len(ladder_levels)] = 0
+        known = ladder_levels[place] == levels[valid]
+        outside = valid[~known]
+        if len(outside):
+            counts['level_not_in_ladder'] += len(outside)
+        for i in outside[:max_errors - len(errors)].tolist():
+            errors.append({'code': 'level_not_in_ladder',
+                           'message': "уровня {} нет в призовой лестнице".format(
+                               int(levels[i])),
+                           'index': i, 'id': None if bad_ids[i] else int(ids[i])})
+        per_level = np.bincount(place[known], minlength=len(ladder_levels))
+        report['levels'] = {str(level): int(count) for level, count in
+                            zip(ladder_levels.tolist(), per_level.tolist())}
+        # Неразобранный вопрос мог быть единственным на уровне: пустые
+        # уровни при ошибках JSON не считаются
+        for level, count in zip(ladder_levels.tolist(), per_level.tolist()):
+            if not count and not counts['json']:
+                add_error('level_empty', "нет вопросов уровня {}".format(level),
+                          level=level)
+
+    return _finish(report, started)
+
+
+def _check_file(questions_file, mm, workers, max_errors, questions_per_chunk):
+    """Вопросы файла через исполнителей и поля верхнего уровня"""
+    buf = np.frombuffer(mm, np.uint8)
+    results = _check_questions(questions_file, buf, workers, max_errors,
+                               questions_per_chunk)
+    return results[:-1] + (_other_fields(buf, results[-1]),)
+
+
+def _finish(report, started):
+    report['ok'] = not report['counts']
+    report['error_count'] = sum(report['counts'].values())
+    report['counts'] = dict(sorted(report['counts'].items()))
+    report['truncated'] = report['error_count'] > len(report['errors'])
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def _check_questions(questions_file, buf, workers, max_errors,
+                     questions_per_chunk):
+    """Проверить куски вопросов в процессах-исполнителях
+
+    Возвращает число вопросов, id и уровни всего файла с масками неверных
+    значений, число ошибок по кодам, ошибки с номером вопроса в файле и
+    отрезок массива questions.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = 0
+    ids, bad_ids, levels, bad_levels = [], [], [], []
+    counts = collections.Counter()
+    errors = []
+    spans = question_spans(buf, questions_per_chunk)
+
+    def collect(result):
+        nonlocal total
+        count, chunk_ids, chunk_bad_ids, chunk_levels, chunk_bad_levels, \
+            chunk_counts, chunk_errors = result
+        counts.update(chunk_counts)
+        for i, question_id, code, message, offset in chunk_errors:
+            if len(errors) >= max_errors:
+                break
+            error = {'code': code, 'message': message,
+                     'index': total + i, 'id': question_id}
+            if offset is not None:
+                error['offset'] = offset
+            errors.append(error)
+        if count:
+            ids.append(chunk_ids)
+            bad_ids.append(chunk_bad_ids)
+            levels.append(chunk_levels)
+            bad_levels.append(chunk_bad_levels)
+        total += count
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        array_span = None
+        previous = None
+        # Последний отрезок — весь массив, его не проверяем
+        for span in spans:
+            if previous is not None:
+                pending.append(pool.apply_async(
+                    check_chunk, ((questions_file, *previous, max_errors),)))
+            previous = span
+            while len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                collect(pending.popleft().get())
+        array_span = previous
+        while pending:
+            collect(pending.popleft().get())
+
+    def join(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype)
+
+    return (total, join(ids, np.int64), join(bad_ids, bool),
+            join(levels, np.int64), join(bad_levels, bool), counts, errors,
+            array_span)
+
+
+def main():
+    """Точка входа проверки"""
+    parser = argparse.ArgumentParser(
+        description="Проверка банка вопросов, отчет в JSON")
+    parser.add_argument('questions', nargs='?', default='questions.json')
+    parser.add_argument('-o', '--output', help="файл отчета (по умолчанию stdout)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-errors', type=int, default=MAX_ERRORS,
+                        help="сколько ошибок перечислить в отчете")
+    parser.add_argument('--chunk-questions', type=int, default=CHUNK_QUESTIONS)
+    args = parser.parse_args()
+
+    report = validate_bank(args.questions, args.workers, args.max_errors,
+                           args.chunk_questions)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print("{}: {} вопросов, ошибок {}".format(
+            args.questions, report['questions'], report['error_count']))
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == "__main__":
+    main()
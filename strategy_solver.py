@@ -0,0 +1,270 @@
+"""
+Точное решение игры: стратегия с максимальным ожидаемым выигрышем
+
+Состояние — номер вопроса и оставшиеся подсказки (как флаги hint_*_used
+в GameState). Игрок либо знает ответ (вероятность из модели точности),
+либо берет подсказки по одной, решая после исхода каждой, брать ли
+следующую, и в конце отвечает самым вероятным вариантом или забирает
+деньги. Значения считаются динамическим программированием от последнего
+вопроса к первому, а внутри вопроса — по наборам взятых подсказок.
+
+Запуск: python strategy_solver.py --accuracy 0.95 0.4
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import time
+
+import numpy as np
+
+from game_logic import (AUDIENCE_CORRECT_PERCENT, AUDIENCE_MIN_PERCENT,
+                        FRIEND_ACCURACY)
+from game_simulator import HINTS, ladder_amounts, linear_accuracy
+
+
+ALL_HINTS = (1 << len(HINTS)) - 1
+
+
+def hints_mask(game):
+    """Маска оставшихся подсказок GameState (бит i — подсказка HINTS[i])"""
+    used = (game.hint_5050_used, game.hint_call_used, game.hint_audience_used)
+    return sum(1 << i for i, is_used in enumerate(used) if not is_used)
+
+
+def mask_hints(mask):
+    """Названия подсказок из маски"""
+    return tuple(hint for i, hint in enumerate(HINTS) if mask >> i & 1)
+
+
+def _likelihoods(hint, friend_accuracy, audience_percent):
+    """Вероятности исходов подсказки при правильном варианте c: (исходы, 4)"""
+    if hint == '5050':
+        # Исход — пара оставшихся вариантов
+        pairs = list(itertools.combinations(range(4), 2))
+        return np.array([[1 / 3 if c in pair else 0.0 for c in range(4)]
+                         for pair in pairs])
+    if hint == 'call':
+        table = np.full((4, 4), (1 - friend_accuracy) / 3)
+        np.fill_diagonal(table, friend_accuracy)
+        return table
+
+    # Зал: перебор всех раскладок процентов как в use_hint_audience
+    low, high = audience_percent
+    outcomes = {}
+    for c in range(4):
+        wrong = [i for i in range(4) if i != c]
+        for correct_percent in range(low, high + 1):
+            remaining = 100 - correct_percent
+            first_range = range(AUDIENCE_MIN_PERCENT,
+                                remaining - 2 * AUDIENCE_MIN_PERCENT + 1)
+            for first in first_range:
+                second_range = range(AUDIENCE_MIN_PERCENT,
+                                     remaining - first - AUDIENCE_MIN_PERCENT + 1)
+                probability = 1 / ((high - low + 1) * len(first_range)
+                                   * len(second_range))
+                for second in second_range:
+                    votes = [0] * 4
+                    votes[c] = correct_percent
+                    votes[wrong[0]] = first
+                    votes[wrong[1]] = second
+                    votes[wrong[2]] = remaining - first - second
+                    row = outcomes.setdefault(tuple(votes), [0.0] * 4)
+                    row[c] += probability
+    return np.array(list(outcomes.values()))
+
+
+@functools.lru_cache(maxsize=None)
+def hint_tables(friend_accuracy=FRIEND_ACCURACY,
+                audience_percent=AUDIENCE_CORRECT_PERCENT):
+    """Вероятности исходов каждой подсказки, как в _likelihoods
+
+    Исходы с пропорциональными строками ведут к одному и тому же мнению
+    игрока о вариантах, поэтому складываются в один: у зала так из
+    десятков тысяч раскладок остается около полутора тысяч.
+    """
+    tables = []
+    for hint in HINTS:
+        table = _likelihoods(hint, friend_accuracy, audience_percent)
+        shape = np.round(table / table.sum(axis=1, keepdims=True), 12)
+        _, groups = np.unique(shape, axis=0, return_inverse=True)
+        merged = np.zeros((groups.max() + 1, 4))
+        np.add.at(merged, groups.ravel(), table)
+        tables.append(merged)
+    return tuple(tables)
+
+
+def _subset_joints(tables, prior):
+    """Совместные вероятности исходов и правильного варианта для наборов
+
+    Для набора подсказок used (маска) — массив с осью исходов на каждую
+    подсказку набора (в порядке HINTS) и последней осью варианта.
+    """
+    joints = {}
+    for used in range(ALL_HINTS + 1):
+        joint = np.asarray(prior, np.float64) / np.sum(prior)
+        for i, table in enumerate(tables):
+            if used >> i & 1:
+                joint = joint[..., None, :] * table
+        joints[used] = joint
+    return joints
+
+
+class StrategySolver:
+    """Оптимальная стратегия для призовой лестницы и модели точности игрока
+
+    Номера вопросов считаются с 0, как current_level в GameState.
+    Подсказки — последовательные решения: игрок, не знающий ответа, берет
+    одну подсказку, смотрит на ее исход и только потом решает, брать ли
+    следующую, отвечать или забрать деньги.
+    """
+
+    def __init__(self, prize_ladder, accuracy=0.75, safe_haven_levels=None,
+                 friend_accuracy=FRIEND_ACCURACY,
+                 audience_percent=AUDIENCE_CORRECT_PERCENT):
+        self.amounts, self.current, self.safe_before = ladder_amounts(
+            prize_ladder, safe_haven_levels
+        )
+        self.levels = len(self.amounts)
+        self.accuracy = np.broadcast_to(
+            np.asarray(accuracy, np.float64), (self.levels,)
+        )
+        self.tables = hint_tables(friend_accuracy, audience_percent)
+        # Для игрока, не знающего ответа, варианты априори равновероятны:
+        # по каждому набору подсказок — вероятность исходов и лучшего варианта
+        self.uniform = self._outcomes(np.ones(4))
+        self.values = None
+        self.policy = None
+
+    def _outcomes(self, prior):
+        return {used: (joint.sum(axis=-1), joint.max(axis=-1))
+                for used, joint in _subset_joints(self.tables, prior).items()}
+
+    def _question(self, level, mask, outcomes, after):
+        """Лучшее решение на вопросе для игрока, не знающего ответа
+
+        Динамика по наборам уже взятых подсказок, от полных к пустому.
+        Значения хранятся умноженными на вероятность исходов: тогда
+        ожидание после подсказки — просто сумма по оси ее исходов.
+        Возвращает (ожидаемый выигрыш, первая подсказка или None).
+        """
+        current = float(self.current[level])
+        safe = float(self.safe_before[level])
+        weighted = {}
+        first = None
+        for used in sorted((used for used in range(mask + 1)
+                            if used & mask == used),
+                           key=lambda used: -bin(used).count('1')):
+            mass, best = outcomes[used]
+            value = np.maximum(best * (after[mask & ~used] - safe) + mass * safe,
+                               mass * current)
+            for i in range(len(HINTS)):
+                if mask >> i & 1 and not used >> i & 1:
+                    # Ось исходов подсказки i среди подсказок набора
+                    axis = bin(used & ((1 << i) - 1)).count('1')
+                    more = weighted[used | 1 << i].sum(axis=axis)
+                    # Подсказка, которая ничего не меняет, не берется
+                    if used == 0 and more > value * (1 + 1e-9):
+                        first = HINTS[i]
+                    value = np.maximum(value, more)
+            weighted[used] = value
+        return float(weighted[0]), first
+
+    def solve(self):
+        """Посчитать ожидаемый выигрыш и решения для всех состояний"""
+        values = np.empty((self.levels + 1, ALL_HINTS + 1))
+        values[self.levels] = self.amounts[-1]
+        policy = [[None] * (ALL_HINTS + 1) for _ in range(self.levels)]
+
+        for level in range(self.levels - 1, -1, -1):
+            after = values[level + 1]
+            knows = self.accuracy[level]
+            for mask in range(ALL_HINTS + 1):
+                unsure_value, first = self._question(level, mask, self.uniform,
+                                                     after)
+                values[level, mask] = (knows * after[mask]
+                                       + (1 - knows) * unsure_value)
+                policy[level][mask] = {
+                    'hint': first,
+                    'answer_threshold': self._threshold(level, after[mask]),
+                }
+
+        self.values = values
+        self.policy = policy
+        return self
+
+    def _threshold(self, level, after):
+        """Шанс правильного ответа, с которого отвечать выгоднее, чем уйти"""
+        current = float(self.current[level])
+        safe = float(self.safe_before[level])
+        threshold = (current - safe) / (after - safe) if after > safe else 0.0
+        return min(float(threshold), 1.0)
+
+    def expected_value(self, level=0, mask=ALL_HINTS):
+        """Ожидаемый выигрыш из состояния при оптимальной игре"""
+        if self.values is None:
+            self.solve()
+        return float(self.values[level, mask])
+
+    def best_action(self, level, mask=ALL_HINTS, likelihood=None):
+        """Решение для игрока, не знающего ответа: следующая подсказка
+        (или None — больше не брать) и порог ответа
+
+        likelihood — вероятности уже увиденных исходов подсказок этого
+        вопроса для каждого варианта (произведение строк _likelihoods);
+        без него решение для начала вопроса.
+        """
+        if self.policy is None:
+            self.solve()
+        if likelihood is None:
+            return self.policy[level][mask]
+        after = self.values[level + 1]
+        _, first = self._question(level, mask, self._outcomes(likelihood),
+                                  after)
+        return {'hint': first,
+                'answer_threshold': self._threshold(level, after[mask])}
+
+    def advise(self, game, likelihood=None):
+        """Решение для текущего вопроса GameState"""
+        return self.best_action(game.current_level, hints_mask(game), likelihood)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Оптимальная стратегия игры")
+    parser.add_argument('--ladder', default='questions.json',
+                        help="JSON с полем prize_ladder")
+    parser.add_argument('--accuracy', type=float, nargs='+', default=[0.95, 0.4],
+                        help="одно число, начало и конец линейной модели "
+                             "или значение для каждого вопроса")
+    parser.add_argument('--safe-havens', type=int, nargs='*',
+                        help="номера несгораемых вопросов вместо заданных в файле")
+    parser.add_argument('--friend-accuracy', type=float, default=FRIEND_ACCURACY)
+    args = parser.parse_args()
+
+    with open(args.ladder, 'r', encoding='utf-8') as f:
+        prize_ladder = json.load(f)['prize_ladder']
+    accuracy = args.accuracy
+    if len(accuracy) == 2 and len(prize_ladder) != 2:
+        accuracy = linear_accuracy(accuracy[0], accuracy[1], len(prize_ladder))
+
+    started = time.perf_counter()
+    solver = StrategySolver(prize_ladder, accuracy,
+                            safe_haven_levels=args.safe_havens,
+                            friend_accuracy=args.friend_accuracy).solve()
+    elapsed = time.perf_counter() - started
+
+    print("Уровней: {}, решено за {:.1f} мс".format(len(prize_ladder),
+                                                   elapsed * 1000))
+    print("Ожидаемый выигрыш при оптимальной игре: {:,.0f}".format(
+        solver.expected_value()))
+    print("\nВопрос  Сумма       Ожидание   Первая подсказка, если не знает  Порог")
+    for level, prize in enumerate(prize_ladder):
+        action = solver.best_action(level)
+        print("{:>6}  {:>10,}  {:>10,.0f}   {:<31}  {:.2f}".format(
+            prize['level'], prize['amount'], solver.expected_value(level),
+            action['hint'] or "-", action['answer_threshold']))
+
+
+if __name__ == "__main__":
+    main()
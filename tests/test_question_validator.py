@@ -0,0 +1,60 @@
+"""
+Отчет question_validator для пустых и поврежденных банков
+"""
+
+import json
+
+from question_validator import validate_bank
+
+
+LADDER = [
+    {'level': 1, 'amount': 100, 'safe_haven': False},
+    {'level': 2, 'amount': 200, 'safe_haven': True},
+]
+
+
+def write_bank(tmp_path, questions):
+    path = tmp_path / 'questions.json'
+    path.write_text(json.dumps({'questions': questions, 'prize_ladder': LADDER},
+                               ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def question(question_id, level):
+    return {'id': question_id, 'level': level, 'text': 'Вопрос?',
+            'options': ['a', 'b', 'c', 'd'], 'correct': 0,
+            'difficulty': 'easy'}
+
+
+def test_empty_bank(tmp_path):
+    report = validate_bank(write_bank(tmp_path, []), workers=1)
+
+    assert report['questions'] == 0
+    assert not report['ok']
+    assert report['counts'] == {'level_empty': 2}
+
+
+def test_all_ids_invalid(tmp_path):
+    questions = [question('a', 1), question(None, 2), question(1.5, 1)]
+    report = validate_bank(write_bank(tmp_path, questions), workers=1)
+
+    assert report['questions'] == 3
+    assert 'duplicate_id' not in report['counts']
+    assert report['counts']['type'] == 2
+    assert report['counts']['missing_field'] == 1
+    assert report['levels'] == {'1': 2, '2': 1}
+
+
+def test_malformed_question_keeps_rest_of_chunk(tmp_path):
+    path = write_bank(tmp_path, [question(i, 1 + i % 2) for i in range(10)])
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text.replace('"id": 3,', '"id": 3,,', 1))
+
+    report = validate_bank(path, workers=1, questions_per_chunk=4)
+
+    assert report['questions'] == 10
+    assert report['counts'] == {'json': 1}
+    assert report['errors'][0]['index'] == 3
+    assert report['levels'] == {'1': 5, '2': 4}
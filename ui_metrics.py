@@ -0,0 +1,122 @@
+"""
+Замеры отзывчивости интерфейса: задержки цикла событий Tk
+"""
+
+import collections
+import logging
+import time
+
+
+logger = logging.getLogger('millionaire.ui')
+
+
+class StallMonitor:
+    """Измеряет, насколько цикл событий опаздывает с обработкой after()
+
+    Пока идет замер, каждые interval_ms планируется служебный вызов;
+    всё его опоздание сверх interval_ms считается простоем цикла событий.
+    """
+
+    def __init__(self, root, interval_ms=16, history_size=1000):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.history = collections.deque(maxlen=history_size)
+        self._label = None
+        self._job = None
+        self._started = 0.0
+        self._expected = 0.0
+        self._max_stall = 0.0
+        self._total_stall = 0.0
+
+    def begin(self, label):
+        """Начать замер"""
+        if self._label is not None:
+            self.end()
+        self._label = label
+        self._started = time.perf_counter()
+        self._max_stall = 0.0
+        self._total_stall = 0.0
+        self._schedule()
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.interval_ms / 1000
+        self._job = self.root.after(self.interval_ms, self._tick)
+
+    def _record_stall(self):
+        stall = max(time.perf_counter() - self._expected, 0.0)
+        self._max_stall = max(self._max_stall, stall)
+        self._total_stall += stall
+
+    def _tick(self):
+        self._record_stall()
+        self._schedule()
+
+    def end(self):
+        """Закончить замер и вернуть отчет"""
+        if self._label is None:
+            return None
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        # Опоздание незавершенного тика тоже считается
+        self._record_stall()
+
+        report = {
+            'label': self._label,
+            'duration_ms': (time.perf_counter() - self._started) * 1000,
+            'max_stall_ms': self._max_stall * 1000,
+            'total_stall_ms': self._total_stall * 1000,
+        }
+        self._label = None
+        self.history.append(report)
+        logger.info("%s: %.0f мс, простой цикла событий max %.1f мс, всего %.1f мс",
+                    report['label'], report['duration_ms'],
+                    report['max_stall_ms'], report['total_stall_ms'])
+        return report
+
+
+class TimeToVisible:
+    """Время от запроса показа окна до его появления на экране (<Map>)"""
+
+    def __init__(self, history_size=1000):
+        self.history = collections.deque(maxlen=history_size)
+        self._pending = {}
+
+    def attach(self, window, key):
+        """Следить за появлением окна, показ которого помечается ключом key"""
+        window.bind("<Map>", lambda event: self._on_map(event, window, key),
+                    add="+")
+
+    def start(self, key, label):
+        """Отметить момент запроса показа окна"""
+        self._pending[key] = (label, time.perf_counter())
+
+    def _on_map(self, event, window, key):
+        # <Map> дочерних виджетов тоже приходит в привязку окна
+        if event.widget is not window or key not in self._pending:
+            return
+        label, started = self._pending.pop(key)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.history.append({'label': label, 'visible_ms': elapsed_ms})
+        logger.info("%s: окно видно через %.1f мс", label, elapsed_ms)
+
+
+class StartupTimer:
+    """Отметки времени запуска приложения от старта процесса"""
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.marks = {}
+
+    def mark(self, name):
+        """Запомнить первое наступление события name"""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.started
+
+    def report(self):
+        """Отметки в миллисекундах"""
+        report = {name: elapsed * 1000 for name, elapsed in self.marks.items()}
+        logger.info("Запуск: %s", ", ".join(
+            "{} {:.0f} мс".format(name, ms) for name, ms in report.items()
+        ))
+        return report